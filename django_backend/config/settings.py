@@ -14,6 +14,7 @@ DEBUG = os.getenv('DEBUG', 'False') == 'True'
 ALLOWED_HOSTS = ['*']
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -59,6 +60,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+# Served by gunicorn with uvicorn workers (daphne only backs runserver), so
+# progress streams (async views) don't hold a worker
+ASGI_APPLICATION = 'config.asgi.application'
 
 DATABASES = {
     'default': {
@@ -67,17 +71,18 @@ DATABASES = {
     }
 }
 
-# For production, use PostgreSQL:
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': os.getenv('DB_NAME', 'product_importer'),
-#         'USER': os.getenv('DB_USER', 'product_user'),
-#         'PASSWORD': os.getenv('DB_PASSWORD', 'product_password'),
-#         'HOST': os.getenv('DB_HOST', 'localhost'),
-#         'PORT': os.getenv('DB_PORT', '5432'),
-#     }
-# }
+# For production, use PostgreSQL (DB_ENGINE=postgresql):
+if os.getenv('DB_ENGINE') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'product_importer'),
+            'USER': os.getenv('DB_USER', 'product_user'),
+            'PASSWORD': os.getenv('DB_PASSWORD', 'product_password'),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+        }
+    }
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -116,6 +121,27 @@ CORS_ALLOWED_ORIGINS = [
     'http://127.0.0.1:8000',
 ]
 
+# Cache: shared by the web and worker processes (import progress, SKU index,
+# webhook circuit state). Uses Redis when REDIS_URL is set, otherwise a
+# file-based cache that works for a single host only: when the web and worker
+# processes run on different hosts, REDIS_URL must be set or live progress
+# only advances at the workers' checkpoints.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+        }
+    }
+
 # Celery Configuration
 # Use database broker for development (no Redis needed)
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'sqla+sqlite:///db.sqlite3')
@@ -128,14 +154,176 @@ CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
 CELERY_TASK_SOFT_TIME_LIMIT = 25 * 60  # 25 minutes
 
+# Webhook delivery runs on its own queue so slow receivers never occupy the
+# workers that run imports. Workers must consume both queues (-Q celery,webhooks)
+# and one of them must run beat (-B) for the periodic outbox sweep.
+CELERY_TASK_ROUTES = {
+    'importer.tasks.dispatch_webhook_outbox': {'queue': 'webhooks'},
+    'importer.tasks.purge_webhook_outbox': {'queue': 'webhooks'},
+    'importer.tasks.trigger_webhook': {'queue': 'webhooks'},
+}
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-webhook-outbox': {
+        'task': 'importer.tasks.dispatch_webhook_outbox',
+        'schedule': 10.0,
+    },
+    'purge-webhook-outbox': {
+        'task': 'importer.tasks.purge_webhook_outbox',
+        'schedule': 60 * 60,
+    },
+    'refresh-product-stats': {
+        'task': 'importer.tasks.refresh_product_stats',
+        'schedule': float(os.getenv('PRODUCT_STATS_REFRESH_INTERVAL', 60)),
+    },
+}
+
 # For production with Redis:
 # CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 # CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
 
-# CSV Processing
-CSV_CHUNK_SIZE = 1000
+# CSV Processing: imports write CSV_CHUNK_SIZE rows per transaction to start
+# with; with IMPORT_ADAPTIVE_BATCHING each following chunk is resized to take
+# about IMPORT_BATCH_TARGET_SECONDS and hold at most IMPORT_BATCH_MAX_BYTES of
+# CSV, within [IMPORT_MIN_CHUNK_SIZE, IMPORT_MAX_CHUNK_SIZE] and the
+# database's bind parameter limit.
+CSV_CHUNK_SIZE = int(os.getenv('CSV_CHUNK_SIZE', 1000))
+IMPORT_ADAPTIVE_BATCHING = os.getenv('IMPORT_ADAPTIVE_BATCHING', 'True') == 'True'
+IMPORT_MIN_CHUNK_SIZE = 100
+IMPORT_MAX_CHUNK_SIZE = int(os.getenv('IMPORT_MAX_CHUNK_SIZE', 20000))
+IMPORT_BATCH_TARGET_SECONDS = float(os.getenv('IMPORT_BATCH_TARGET_SECONDS', 1.0))
+IMPORT_BATCH_MAX_BYTES = 8 * 1024 * 1024
 MAX_FILE_SIZE = 500 * 1024 * 1024  # 500 MB
 
+# CSV parser for serial imports: 'python' (csv module) or 'arrow' (pyarrow's
+# block-wise parser with vectorized normalization, needs pyarrow). NDJSON,
+# Parquet and Arrow uploads always use pyarrow.
+IMPORT_CSV_READER = os.getenv('IMPORT_CSV_READER', 'python')
+
+# Rejected rows are counted on the ImportJob and kept for download; only the
+# first IMPORT_REJECTS_LOG_FIRST of an import, then every
+# IMPORT_REJECTS_LOG_EVERY-th, are logged.
+IMPORT_REJECTS_LOG_FIRST = int(os.getenv('IMPORT_REJECTS_LOG_FIRST', 10))
+IMPORT_REJECTS_LOG_EVERY = int(os.getenv('IMPORT_REJECTS_LOG_EVERY', 1000))
+
+# Import previews: rows are compared with existing products
+# IMPORT_PREVIEW_BATCH_SIZE at a time, IMPORT_PREVIEW_SAMPLE_SIZE diffs are
+# kept per action, and a preview can be confirmed without reparsing the file
+# for IMPORT_PREVIEW_TTL seconds.
+IMPORT_PREVIEW_BATCH_SIZE = int(os.getenv('IMPORT_PREVIEW_BATCH_SIZE', 5000))
+IMPORT_PREVIEW_SAMPLE_SIZE = int(os.getenv('IMPORT_PREVIEW_SAMPLE_SIZE', 20))
+IMPORT_PREVIEW_TTL = int(os.getenv('IMPORT_PREVIEW_TTL', 60 * 60))
+
+# Bulk product API: maximum items per POST/PATCH/DELETE /api/products/bulk/
+PRODUCT_BULK_MAX_ITEMS = int(os.getenv('PRODUCT_BULK_MAX_ITEMS', 1000))
+
+# Dashboard statistics are cached and recomputed by the refresh-product-stats
+# beat entry; they expire after PRODUCT_STATS_TTL seconds if beat is not running.
+PRODUCT_STATS_TTL = 10 * 60  # seconds
+
+# Mass deletion runs as a background DeleteJob in primary-key ordered batches.
+# With PRODUCT_DELETE_ALLOW_TRUNCATE, deleting every product on PostgreSQL
+# uses TRUNCATE instead.
+PRODUCT_DELETE_BATCH_SIZE = int(os.getenv('PRODUCT_DELETE_BATCH_SIZE', 5000))
+PRODUCT_DELETE_ALLOW_TRUNCATE = os.getenv('PRODUCT_DELETE_ALLOW_TRUNCATE', 'False') == 'True'
+
+# Product export: rows fetched per database round trip while streaming
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+# Import write backend: 'orm' (any database) or 'copy' (PostgreSQL COPY into a
+# staging table, falls back to 'orm' elsewhere). Can be overridden per job.
+IMPORT_BACKEND = os.getenv('IMPORT_BACKEND', 'orm')
+
+# Parallel imports: files of at least IMPORT_PARALLEL_MIN_SIZE bytes are split
+# into ~IMPORT_PARALLEL_CHUNK_SIZE byte ranges parsed by separate workers, then
+# written by IMPORT_PARALLEL_PARTITIONS workers (one per SKU partition).
+# Set IMPORT_PARALLEL_MIN_SIZE to 0 to always import serially.
+IMPORT_PARALLEL_MIN_SIZE = int(os.getenv('IMPORT_PARALLEL_MIN_SIZE', 64 * 1024 * 1024))
+IMPORT_PARALLEL_CHUNK_SIZE = int(os.getenv('IMPORT_PARALLEL_CHUNK_SIZE', 16 * 1024 * 1024))
+IMPORT_PARALLEL_PARTITIONS = int(os.getenv('IMPORT_PARALLEL_PARTITIONS', 4))
+
+# Import progress: workers publish counters to the cache after every chunk.
+# Partitions of a parallel import add them to the ImportJob row every
+# IMPORT_PROGRESS_CHECKPOINT_INTERVAL seconds; serial imports record them with
+# each chunk's resume checkpoint.
+# The SSE progress stream checks the cache every IMPORT_PROGRESS_STREAM_INTERVAL
+# seconds and closes after IMPORT_PROGRESS_STREAM_TIMEOUT (clients reconnect).
+# A job with no published progress is read from its row, which is cached for
+# IMPORT_PROGRESS_FALLBACK_TTL seconds (about one poll) so it never goes stale.
+IMPORT_PROGRESS_CHECKPOINT_INTERVAL = int(os.getenv('IMPORT_PROGRESS_CHECKPOINT_INTERVAL', 5))
+IMPORT_PROGRESS_TTL = 24 * 60 * 60  # seconds
+IMPORT_PROGRESS_FALLBACK_TTL = 1  # seconds
+IMPORT_PROGRESS_STREAM_INTERVAL = 0.5  # seconds
+IMPORT_PROGRESS_STREAM_TIMEOUT = 5 * 60  # seconds
+
+# Resumable imports: a serial import stopped by the soft time limit is retried
+# from its last checkpoint up to IMPORT_MAX_RESUMES times. Jobs left in
+# 'processing' for longer than IMPORT_STALE_AFTER seconds (e.g. a worker was
+# killed) can be resumed through the API.
+IMPORT_MAX_RESUMES = int(os.getenv('IMPORT_MAX_RESUMES', 5))
+IMPORT_STALE_AFTER = CELERY_TASK_TIME_LIMIT
+
+# Upload staging: uploads are spooled here and import tasks receive only the
+# stored file name, so the web and worker processes must see the same files.
+# Point IMPORT_STAGING_ROOT at a volume shared by the web and worker containers,
+# or set IMPORT_STAGING_BUCKET to stage in S3-compatible object storage
+# (credentials from the usual AWS_* variables). Where services share no disk
+# and no bucket is set, IMPORT_STAGING_SHARED=False makes uploads fail up front
+# instead of leaving the import to fail on the worker.
+IMPORT_STAGING_ROOT = os.getenv('IMPORT_STAGING_ROOT', str(BASE_DIR / 'staging'))
+IMPORT_STAGING_BUCKET = os.getenv('IMPORT_STAGING_BUCKET')
+IMPORT_STAGING_SHARED = os.getenv('IMPORT_STAGING_SHARED', 'True') == 'True'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'imports': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {
+            'location': IMPORT_STAGING_ROOT,
+        },
+    },
+}
+if IMPORT_STAGING_BUCKET:
+    STORAGES['imports'] = {
+        'BACKEND': 'storages.backends.s3.S3Storage',
+        'OPTIONS': {
+            'bucket_name': IMPORT_STAGING_BUCKET,
+            'endpoint_url': os.getenv('IMPORT_STAGING_ENDPOINT_URL') or None,
+            'location': 'imports',
+            'file_overwrite': False,
+        },
+    }
+
+# Webhooks: bulk events (e.g. one import chunk) are delivered in batched POSTs
+WEBHOOK_BATCH_MAX_ITEMS = int(os.getenv('WEBHOOK_BATCH_MAX_ITEMS', 500))
+WEBHOOK_BATCH_MAX_BYTES = int(os.getenv('WEBHOOK_BATCH_MAX_BYTES', 256 * 1024))
+
+# Webhook delivery: requests to all subscribers are sent concurrently over
+# pooled keep-alive connections, at most WEBHOOK_DELIVERY_PER_HOST at a time
+# per host, and a delivery run never takes longer than WEBHOOK_DELIVERY_DEADLINE.
+WEBHOOK_DELIVERY_MAX_WORKERS = int(os.getenv('WEBHOOK_DELIVERY_MAX_WORKERS', 16))
+WEBHOOK_DELIVERY_PER_HOST = int(os.getenv('WEBHOOK_DELIVERY_PER_HOST', 4))
+WEBHOOK_DELIVERY_TIMEOUT = 10  # seconds per request
+WEBHOOK_DELIVERY_DEADLINE = int(os.getenv('WEBHOOK_DELIVERY_DEADLINE', 30))
+
+# Webhook outbox: events are stored with the product change and delivered by
+# dispatch_webhook_outbox. Failed deliveries are retried with exponential
+# backoff and dead-lettered after WEBHOOK_MAX_ATTEMPTS. A webhook failing
+# WEBHOOK_CIRCUIT_FAILURE_THRESHOLD times in a row is paused for
+# WEBHOOK_CIRCUIT_COOLDOWN seconds.
+WEBHOOK_OUTBOX_BATCH_SIZE = int(os.getenv('WEBHOOK_OUTBOX_BATCH_SIZE', 100))
+WEBHOOK_OUTBOX_DISPATCH_TIME = 60  # seconds per dispatcher run
+WEBHOOK_OUTBOX_RETENTION_DAYS = int(os.getenv('WEBHOOK_OUTBOX_RETENTION_DAYS', 7))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', 8))
+WEBHOOK_RETRY_BASE_DELAY = 30  # seconds
+WEBHOOK_RETRY_MAX_DELAY = 6 * 60 * 60  # seconds
+WEBHOOK_CIRCUIT_FAILURE_THRESHOLD = 5
+WEBHOOK_CIRCUIT_COOLDOWN = 5 * 60  # seconds
+
 # Logging
 LOGGING = {
     'version': 1,
@@ -4,13 +4,15 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from importer.views import (
-    ProductViewSet, ImportJobViewSet, WebhookViewSet,
-    UploadCSVView, ImportProgressView, TestWebhookView
+    ProductViewSet, ImportJobViewSet, DeleteJobViewSet, WebhookViewSet,
+    ProductExportView, UploadCSVView, ImportProgressView, ImportProgressStreamView, ImportMetricsView,
+    TestWebhookView
 )
 
 router = DefaultRouter()
 router.register(r'products', ProductViewSet, basename='product')
 router.register(r'import-jobs', ImportJobViewSet, basename='import-job')
+router.register(r'delete-jobs', DeleteJobViewSet, basename='delete-job')
 router.register(r'webhooks', WebhookViewSet, basename='webhook')
 
 urlpatterns = [
@@ -20,9 +22,12 @@ urlpatterns = [
     path('', include('importer.urls')),
     
     # REST API Routes
+    path('api/products/export/', ProductExportView.as_view(), name='product-export'),
     path('api/', include(router.urls)),
     path('api/import/upload/', UploadCSVView.as_view(), name='upload-csv'),
+    path('api/import/metrics/', ImportMetricsView.as_view(), name='import-metrics'),
     path('api/import/progress/<str:job_id>/', ImportProgressView.as_view(), name='import-progress'),
+    path('api/import/progress/<str:job_id>/stream/', ImportProgressStreamView.as_view(), name='import-progress-stream'),
     path('api/webhooks/<str:pk>/test/', TestWebhookView.as_view(), name='test-webhook'),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -1,6 +1,7 @@
 """Django admin configuration."""
 from django.contrib import admin
-from .models import Product, ImportJob, Webhook, WebhookLog
+from django.utils import timezone
+from .models import Product, ImportJob, DeleteJob, Webhook, WebhookLog, WebhookOutbox
 
 
 @admin.register(Product)
@@ -21,13 +22,33 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(ImportJob)
 class ImportJobAdmin(admin.ModelAdmin):
     """Import job admin."""
-    list_display = ['filename', 'status', 'total_records', 'processed_records', 'created_at']
+    list_display = ['filename', 'status', 'backend', 'total_records', 'processed_records', 'rejected_records',
+                    'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['filename']
     readonly_fields = ['id', 'created_at', 'updated_at']
     fieldsets = (
-        ('Job Info', {'fields': ('id', 'filename', 'status')}),
-        ('Progress', {'fields': ('total_records', 'processed_records', 'created_records', 'updated_records')}),
+        ('Job Info', {'fields': ('id', 'filename', 'staged_file', 'backend', 'status')}),
+        ('Progress', {'fields': ('total_records', 'processed_records', 'created_records', 'updated_records',
+                                  'unchanged_records')}),
+        ('Rejects', {'fields': ('rejected_records', 'rejects')}),
+        ('Checkpoint', {'fields': ('checkpoint_offset', 'checkpoint_rows')}),
+        ('Preview', {'fields': ('preview',)}),
+        ('Metrics', {'fields': ('metrics',)}),
+        ('Error', {'fields': ('error_message',)}),
+        ('Timestamps', {'fields': ('created_at', 'updated_at')}),
+    )
+
+
+@admin.register(DeleteJob)
+class DeleteJobAdmin(admin.ModelAdmin):
+    """Delete job admin."""
+    list_display = ['id', 'status', 'total_records', 'deleted_records', 'truncated', 'created_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['id', 'created_at', 'updated_at']
+    fieldsets = (
+        ('Job Info', {'fields': ('id', 'filters', 'status', 'truncated')}),
+        ('Progress', {'fields': ('total_records', 'deleted_records')}),
         ('Error', {'fields': ('error_message',)}),
         ('Timestamps', {'fields': ('created_at', 'updated_at')}),
     )
@@ -60,3 +81,27 @@ class WebhookLogAdmin(admin.ModelAdmin):
         ('Error', {'fields': ('error_message',)}),
         ('Timestamp', {'fields': ('created_at',)}),
     )
+
+
+@admin.register(WebhookOutbox)
+class WebhookOutboxAdmin(admin.ModelAdmin):
+    """Webhook outbox admin."""
+    list_display = ['webhook', 'event_type', 'status', 'attempts', 'next_attempt_at', 'created_at']
+    list_filter = ['status', 'event_type', 'created_at']
+    search_fields = ['webhook__url']
+    readonly_fields = ['id', 'created_at', 'delivered_at']
+    actions = ['retry_deliveries']
+    fieldsets = (
+        ('Event Info', {'fields': ('id', 'webhook', 'event_type', 'payload')}),
+        ('Delivery', {'fields': ('status', 'attempts', 'next_attempt_at', 'delivered_at')}),
+        ('Error', {'fields': ('last_error',)}),
+        ('Timestamp', {'fields': ('created_at',)}),
+    )
+
+    @admin.action(description='Retry selected deliveries')
+    def retry_deliveries(self, request, queryset):
+        """Requeue dead or pending deliveries for immediate delivery."""
+        count = queryset.exclude(status='delivered').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'{count} deliveries queued for retry')
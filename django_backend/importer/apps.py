@@ -6,3 +6,7 @@ class ImporterConfig(AppConfig):
     """Importer app config."""
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'importer'
+
+    def ready(self):
+        """Connect signal handlers."""
+        from . import signals  # noqa: F401
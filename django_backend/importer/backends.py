@@ -0,0 +1,159 @@
+"""Write backends for product imports.
+
+A backend takes a chunk of normalized rows and writes it to the ``Product``
+table, returning an ``UpsertResult``. The ORM backend works on every database;
+the COPY backend streams rows into a PostgreSQL staging table and merges them
+in one statement.
+"""
+import csv
+import io
+import logging
+import uuid
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .fingerprint import fingerprint
+from .metrics import stage
+from .models import Product
+from .sku_index import invalidate_sku_index, load_sku_index, save_sku_index
+from .upsert import UpsertResult, dedupe_rows, upsert_products
+
+logger = logging.getLogger(__name__)
+
+STAGING_TABLE = 'importer_product_staging'
+
+
+class ORMImportBackend:
+    """Batched ORM upserts (bulk_update + bulk_create)."""
+    name = 'orm'
+
+    def __init__(self, sku_index=None):
+        self.sku_index = sku_index
+        self.created_count = 0
+
+    def write_batch(self, rows):
+        """Upsert a chunk of rows."""
+        result = upsert_products(rows, sku_index=self.sku_index)
+        self.created_count += result.created_count
+        return result
+
+    def finish(self):
+        """
+        Persist SKUs added to the index for the next import, or drop the
+        cached index when products were created without one.
+        """
+        if not self.created_count:
+            return
+        if self.sku_index is not None:
+            save_sku_index(self.sku_index)
+        else:
+            invalidate_sku_index()
+
+
+class PostgresCopyImportBackend:
+    """
+    COPY-based backend for PostgreSQL.
+
+    Each chunk is streamed into a temporary staging table with
+    ``COPY FROM STDIN`` and merged into the product table with a single
+    ``INSERT ... ON CONFLICT (sku) DO UPDATE`` that reports, per row, whether
+    it was inserted or updated. Products whose fingerprint already matches
+    are left alone by the update's ``WHERE`` clause.
+    """
+    name = 'copy'
+
+    def __init__(self):
+        self.created_count = 0
+
+    def write_batch(self, rows):
+        """Copy a chunk of rows into staging and merge it."""
+        by_sku = dedupe_rows(rows)
+        if not by_sku:
+            return UpsertResult()
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in by_sku.values():
+            writer.writerow([
+                uuid.uuid4(), row['sku'], row['name'], row['description'],
+                '' if row['price'] is None else row['price'], row['quantity'], fingerprint(row),
+            ])
+        buffer.seek(0)
+
+        now = timezone.now()
+        with stage('copy_merge', rows=len(by_sku)), transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(self._create_staging_sql())
+            cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} (id, sku, name, description, price, quantity, fingerprint) "
+                f"FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (name, description))",
+                buffer,
+            )
+            cursor.execute(self._merge_sql(), [now, now])
+            merged = cursor.fetchall()
+
+        result = UpsertResult(unchanged_count=len(by_sku) - len(merged))
+        for product_id, sku, inserted in merged:
+            product = Product(id=product_id, sku=sku)
+            (result.created if inserted else result.updated).append(product)
+        self.created_count += result.created_count
+        return result
+
+    def finish(self):
+        """Drop the cached SKU index if the import created products."""
+        if self.created_count:
+            invalidate_sku_index()
+
+    def _create_staging_sql(self):
+        return (
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} ("
+            "id uuid, sku varchar(255), name varchar(255), description text, "
+            "price double precision, quantity integer, fingerprint varchar(32)"
+            ") ON COMMIT DELETE ROWS"
+        )
+
+    def _merge_sql(self):
+        table = connection.ops.quote_name(Product._meta.db_table)
+        return (
+            f"INSERT INTO {table} "
+            "(id, sku, name, description, price, quantity, fingerprint, active, created_at, updated_at) "
+            "SELECT id, sku, name, description, price, quantity, fingerprint, true, %s, %s "
+            f"FROM {STAGING_TABLE} "
+            "ON CONFLICT (sku) DO UPDATE SET "
+            "name = EXCLUDED.name, description = EXCLUDED.description, "
+            "price = EXCLUDED.price, quantity = EXCLUDED.quantity, "
+            "fingerprint = EXCLUDED.fingerprint, updated_at = EXCLUDED.updated_at "
+            f"WHERE {table}.fingerprint IS DISTINCT FROM EXCLUDED.fingerprint "
+            "RETURNING id, sku, (xmax = 0) AS inserted"
+        )
+
+
+IMPORT_BACKENDS = {
+    ORMImportBackend.name: ORMImportBackend,
+    PostgresCopyImportBackend.name: PostgresCopyImportBackend,
+}
+
+
+def get_import_backend(name=None, use_sku_index=False):
+    """
+    Return the import backend for a job.
+
+    Args:
+        name: Backend name; defaults to ``settings.IMPORT_BACKEND``
+        use_sku_index: Give the ORM backend the cached SKU index so lookups
+            are skipped for SKUs that are certainly new
+
+    The COPY backend needs PostgreSQL; on other databases the ORM backend is
+    used instead.
+    """
+    name = name or settings.IMPORT_BACKEND
+    if name not in IMPORT_BACKENDS:
+        raise ValueError(f"Unknown import backend: {name}")
+
+    if name == PostgresCopyImportBackend.name and connection.vendor != 'postgresql':
+        logger.info(f"COPY import backend needs PostgreSQL, using ORM backend on {connection.vendor}")
+        name = ORMImportBackend.name
+
+    if use_sku_index and name == ORMImportBackend.name:
+        return ORMImportBackend(sku_index=load_sku_index())
+    return IMPORT_BACKENDS[name]()
@@ -0,0 +1,105 @@
+"""Adaptive batch sizing for imports.
+
+Each import chunk is one transaction: a SKU lookup, ``bulk_update``,
+``bulk_create``, the webhook outbox rows and the checkpoint. Small chunks
+pay that fixed overhead too often; very large ones hold locks for long,
+checkpoint rarely and use a lot of memory, and some statements (notably
+``bulk_update``'s ``CASE`` expressions) get slower per row as they grow.
+
+``AdaptiveBatchSizer`` starts at ``CSV_CHUNK_SIZE`` and hill-climbs on
+measured throughput: after every chunk it keeps growing (or shrinking) the
+next one while rows/second improves and turns around when it drops. A chunk
+is never sized to take longer than ``IMPORT_BATCH_TARGET_SECONDS`` at the
+measured per-row cost, to hold more than ``IMPORT_BATCH_MAX_BYTES`` of CSV,
+or to exceed the database's bind parameter limit for the SKU lookup.
+"""
+import sqlite3
+from django.conf import settings
+from django.db import connection
+
+# PostgreSQL's wire protocol counts bind parameters in 16 bits
+POSTGRES_MAX_PARAMS = 65535
+SMOOTHING = 0.3
+STEP = 1.5
+# Throughput drops smaller than this are treated as noise
+TOLERANCE = 0.05
+
+
+def max_batch_rows(conn=connection):
+    """
+    Most rows a chunk may hold for its ``sku IN (...)`` lookup to run as
+    one statement on ``conn``.
+
+    SQLite's limit is compiled in (999 before 3.32, 32766 after, often
+    more); it is read from the connection when Python exposes it, else
+    Django's conservative value is used.
+    """
+    if conn.vendor == 'sqlite':
+        conn.ensure_connection()
+        getlimit = getattr(conn.connection, 'getlimit', None)
+        if getlimit is not None:
+            return getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    if conn.vendor == 'postgresql':
+        return POSTGRES_MAX_PARAMS
+    return conn.features.max_query_params or POSTGRES_MAX_PARAMS
+
+
+class AdaptiveBatchSizer:
+    """
+    Size import chunks from measured write latency and row width.
+
+    Usage:
+        sizer = AdaptiveBatchSizer()
+        for batch in source.batches(sizer):
+            started = time.perf_counter()
+            write(batch)
+            sizer.record(len(batch), time.perf_counter() - started, batch_bytes)
+
+    ``size`` changes by a factor of ``STEP`` per chunk, and stays fixed at
+    ``CSV_CHUNK_SIZE`` when ``IMPORT_ADAPTIVE_BATCHING`` is off.
+    """
+
+    def __init__(self, initial=None, minimum=None, maximum=None, target_seconds=None, max_bytes=None):
+        self.adaptive = settings.IMPORT_ADAPTIVE_BATCHING
+        self.maximum = min(maximum or settings.IMPORT_MAX_CHUNK_SIZE, max_batch_rows())
+        self.minimum = min(minimum or settings.IMPORT_MIN_CHUNK_SIZE, self.maximum)
+        self.target_seconds = target_seconds or settings.IMPORT_BATCH_TARGET_SECONDS
+        self.max_bytes = max_bytes or settings.IMPORT_BATCH_MAX_BYTES
+        self.seconds_per_row = None
+        self.bytes_per_row = None
+        self.throughput = None
+        self.direction = 1
+        self.size = self._clamp(initial or settings.CSV_CHUNK_SIZE)
+
+    def _clamp(self, size):
+        return max(self.minimum, min(self.maximum, int(size)))
+
+    def _smooth(self, average, value):
+        if average is None:
+            return value
+        return average + SMOOTHING * (value - average)
+
+    def record(self, rows, seconds, nbytes=None):
+        """Account for a written chunk and size the next one."""
+        if not self.adaptive or rows <= 0:
+            return
+        seconds = max(seconds, 1e-9)
+        throughput = rows / seconds
+        self.seconds_per_row = self._smooth(self.seconds_per_row, seconds / rows)
+        if nbytes:
+            self.bytes_per_row = self._smooth(self.bytes_per_row, nbytes / rows)
+
+        if self.throughput is not None and throughput < self.throughput * (1 - TOLERANCE):
+            self.direction = -self.direction
+        self.throughput = throughput
+
+        ceiling = self.target_seconds / self.seconds_per_row
+        if self.bytes_per_row:
+            ceiling = min(ceiling, self.max_bytes / self.bytes_per_row)
+        size = self.size * STEP ** self.direction
+        if size >= ceiling or size >= self.maximum:
+            size = min(size, ceiling)
+            self.direction = -1
+        elif size <= self.minimum:
+            self.direction = 1
+        self.size = self._clamp(size)
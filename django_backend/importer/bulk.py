@@ -0,0 +1,218 @@
+"""Bulk product writes for the API.
+
+Each bulk request validates every item up front without touching the
+database, then resolves all referenced products with one query and applies
+the changes with set-based writes (``bulk_create``/``bulk_update``/one
+``DELETE``) in a single transaction. Webhook events are queued as batches
+in the same transaction.
+
+Validation errors are returned per item and nothing is written unless
+every item is valid.
+"""
+import uuid
+from dataclasses import dataclass, field
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .fingerprint import product_fingerprint
+from .models import Product
+from .outbox import enqueue_event_batch, enqueue_product_events
+from .serializers import BulkProductSerializer
+from .sku_index import invalidate_sku_index
+from .stats import record_product_changes, record_upsert
+from .upsert import UPSERT_FIELDS, upsert_products
+from .webhooks import product_event
+
+BULK_DEFAULTS = {'description': '', 'price': None, 'quantity': 0, 'active': True}
+BULK_UPSERT_FIELDS = [*UPSERT_FIELDS, 'active']
+
+
+@dataclass
+class BulkResult:
+    """Outcome of a bulk request: per-item results or per-item errors."""
+    results: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    def add_error(self, index, errors):
+        self.errors.append({'index': index, 'errors': errors})
+
+    def counts(self):
+        """Number of items per result status."""
+        counts = {}
+        for item in self.results:
+            counts[item['status']] = counts.get(item['status'], 0) + 1
+        return counts
+
+
+def _item_result(index, status, product):
+    return {'index': index, 'status': status, 'id': str(product.id), 'sku': product.sku}
+
+
+def _lookup_key(item):
+    """
+    The product an item refers to: ``('id', UUID)`` or ``('sku', SKU)``.
+
+    Raises:
+        ValueError: if the item has neither a valid ``id`` nor a ``sku``
+    """
+    if not isinstance(item, dict):
+        raise ValueError('Expected an object')
+    if item.get('id'):
+        try:
+            return 'id', uuid.UUID(str(item['id']))
+        except ValueError:
+            raise ValueError(f"Invalid id: {item['id']}")
+    sku = item.get('sku')
+    if isinstance(sku, str) and sku.strip():
+        return 'sku', sku.strip().upper()
+    raise ValueError('An id or sku is required')
+
+
+def _resolve(keys):
+    """Fetch the products referenced by lookup keys in one query."""
+    ids = [value for kind, value in keys if kind == 'id']
+    skus = [value for kind, value in keys if kind == 'sku']
+    products = Product.objects.filter(Q(id__in=ids) | Q(sku__in=skus))
+    found = {}
+    for product in products:
+        found[('id', product.id)] = product
+        found[('sku', product.sku)] = product
+    return found
+
+
+def bulk_upsert_products(items):
+    """
+    Create or update products by SKU.
+
+    Items are full product representations; fields left out get their
+    defaults. A SKU may appear only once per request.
+    """
+    result = BulkResult()
+    rows = []
+    seen = set()
+    for index, item in enumerate(items):
+        serializer = BulkProductSerializer(data=item)
+        if not serializer.is_valid():
+            result.add_error(index, serializer.errors)
+            continue
+        row = {**BULK_DEFAULTS, **serializer.validated_data}
+        if row['sku'] in seen:
+            result.add_error(index, {'sku': ['Duplicate SKU in request']})
+            continue
+        seen.add(row['sku'])
+        rows.append(row)
+    if result.errors:
+        return result
+
+    # Items are reported as created or updated, and 'active' is not
+    # fingerprinted, so every item is written
+    with transaction.atomic():
+        upserted = upsert_products(rows, fields=BULK_UPSERT_FIELDS, skip_unchanged=False)
+        enqueue_product_events(upserted)
+        record_upsert(upserted)
+
+    if upserted.created:
+        invalidate_sku_index()
+    statuses = {}
+    for product in upserted.created:
+        statuses[product.sku] = ('created', product)
+    for product in upserted.updated:
+        statuses[product.sku] = ('updated', product)
+    result.results = [
+        _item_result(index, *statuses[row['sku']])
+        for index, row in enumerate(rows)
+    ]
+    return result
+
+
+def bulk_update_products(items):
+    """
+    Partially update existing products.
+
+    Each item names its product by ``id`` (which allows changing the SKU)
+    or by ``sku`` and holds only the fields to change.
+    """
+    result = BulkResult()
+    changes = []
+    for index, item in enumerate(items):
+        try:
+            key = _lookup_key(item)
+        except ValueError as e:
+            result.add_error(index, {'non_field_errors': [str(e)]})
+            continue
+        data = {name: value for name, value in item.items() if name != 'id'}
+        if key[0] == 'sku':
+            data.pop('sku', None)
+        serializer = BulkProductSerializer(data=data, partial=True)
+        if not serializer.is_valid():
+            result.add_error(index, serializer.errors)
+            continue
+        changes.append((index, key, serializer.validated_data))
+    if result.errors:
+        return result
+
+    with transaction.atomic():
+        found = _resolve([key for _, key, _ in changes])
+        products = {}
+        fields = set()
+        now = timezone.now()
+        for index, key, data in changes:
+            product = found.get(key)
+            if product is None:
+                result.add_error(index, {'non_field_errors': ['Product not found']})
+                continue
+            if product.id in products:
+                result.add_error(index, {'non_field_errors': ['Product appears more than once in request']})
+                continue
+            for name, value in data.items():
+                setattr(product, name, value)
+            product.fingerprint = product_fingerprint(product)
+            product.updated_at = now
+            fields.update(data)
+            products[product.id] = product
+            result.results.append(_item_result(index, 'updated', product))
+        if result.errors:
+            result.results = []
+            return result
+
+        Product.objects.bulk_update(products.values(), [*sorted(fields), 'fingerprint', 'updated_at'])
+        enqueue_event_batch('product_updated', [product_event(product) for product in products.values()])
+    return result
+
+
+def bulk_delete_products(items):
+    """
+    Delete products named by ``id`` or ``sku``.
+
+    Products that do not exist are reported as ``not_found``; deletes are
+    idempotent, so this is not an error.
+    """
+    result = BulkResult()
+    keys = []
+    for index, item in enumerate(items):
+        try:
+            keys.append((index, _lookup_key(item)))
+        except ValueError as e:
+            result.add_error(index, {'non_field_errors': [str(e)]})
+    if result.errors:
+        return result
+
+    with transaction.atomic():
+        found = _resolve([key for _, key in keys])
+        deleted = {}
+        for index, (kind, value) in keys:
+            product = found.get((kind, value))
+            if product is None:
+                result.results.append({'index': index, 'status': 'not_found', kind: str(value)})
+                continue
+            deleted[product.id] = product
+            result.results.append(_item_result(index, 'deleted', product))
+
+        if deleted:
+            Product.objects.filter(id__in=list(deleted)).delete()
+            record_product_changes(
+                deleted=len(deleted),
+                deleted_active=sum(1 for product in deleted.values() if product.active)
+            )
+            enqueue_event_batch('product_deleted', [product_event(product) for product in deleted.values()])
+    return result
@@ -0,0 +1,166 @@
+"""Compressed uploads.
+
+CSV and NDJSON uploads may be compressed as ``.gz`` or ``.zst``, and a
+``.zip`` holding a single CSV is accepted too. The staged file is kept compressed and
+decompressed as a stream while it is imported, so it is never inflated in
+memory or on disk. ``MAX_FILE_SIZE`` applies to the decompressed data: an
+import that reads past it fails.
+
+Compressed files cannot be split into byte ranges, so they are always
+imported serially. Zstandard support needs the optional ``zstandard``
+package.
+"""
+import gzip
+import io
+import zipfile
+from contextlib import contextmanager
+from django.conf import settings
+from .storage import open_staged
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+UPLOAD_CODECS = {
+    '.gz': 'gzip',
+    '.zst': 'zstd',
+    '.zip': 'zip',
+}
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+def upload_codec(filename):
+    """
+    Compression codec of an upload, from its file name.
+
+    Returns:
+        None for uncompressed files, else 'gzip', 'zstd' or 'zip'
+
+    Raises:
+        ValueError: if the codec's package is not installed
+    """
+    name = filename.lower()
+    for suffix, codec in UPLOAD_CODECS.items():
+        if name.endswith(suffix):
+            if codec == 'zstd' and zstandard is None:
+                raise ValueError('Zstandard uploads need the zstandard package')
+            return codec
+    return None
+
+
+class DecompressedStream(io.RawIOBase):
+    """
+    Read-only binary stream over decompressed data.
+
+    Raises ValueError once more than ``limit`` bytes have been read.
+    ``progress`` is the fraction of the compressed file consumed, since the
+    decompressed size is not known up front. Seeking is only supported
+    forwards (by decompressing and discarding) and to the start.
+    """
+
+    def __init__(self, stream, source, limit):
+        self.stream = stream
+        self.source = source
+        self.limit = limit
+        self.position = 0
+        self.source_size = source.size if hasattr(source, 'size') else None
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        self._advance(len(data))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readline(self, size=-1):
+        line = self.stream.readline(size)
+        self._advance(len(line))
+        return line
+
+    def _advance(self, count):
+        self.position += count
+        if self.limit and self.position > self.limit:
+            raise ValueError(f'Decompressed file is larger than {self.limit} bytes')
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation('Compressed streams can only seek forwards')
+        if offset < self.position:
+            if offset != 0 or not hasattr(self.stream, 'seek'):
+                raise io.UnsupportedOperation('Compressed streams can only seek forwards')
+            self.stream.seek(0)
+            self.position = 0
+        while self.position < offset:
+            chunk = self.stream.read(min(offset - self.position, READ_BUFFER_SIZE))
+            if not chunk:
+                break
+            self._advance(len(chunk))
+        return self.position
+
+    @property
+    def progress(self):
+        """Fraction of the compressed source consumed (0.0 - 1.0)."""
+        if not self.source_size:
+            return 0.0
+        return min(self.source.tell() / self.source_size, 1.0)
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            super().close()
+
+
+def decompress(raw, codec, limit=None):
+    """
+    Wrap a compressed binary stream for streaming decompression.
+
+    Raises:
+        ValueError: if a zip archive does not hold exactly one file, or
+            its declared size exceeds ``limit``
+    """
+    if codec == 'gzip':
+        stream = gzip.GzipFile(fileobj=raw, mode='rb')
+    elif codec == 'zstd':
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_size=READ_BUFFER_SIZE)
+        stream = io.BufferedReader(reader, buffer_size=READ_BUFFER_SIZE)
+    elif codec == 'zip':
+        archive = zipfile.ZipFile(raw)
+        entries = [info for info in archive.infolist() if not info.is_dir()]
+        if len(entries) != 1:
+            raise ValueError('ZIP archive must contain exactly one CSV file')
+        if limit and entries[0].file_size > limit:
+            raise ValueError(f'Decompressed file is larger than {limit} bytes')
+        stream = archive.open(entries[0])
+    else:
+        raise ValueError(f'Unknown compression: {codec}')
+    return DecompressedStream(stream, raw, limit)
+
+
+@contextmanager
+def open_import_stream(staged_file, filename=None):
+    """
+    Open a staged upload for import, decompressing it if needed.
+
+    Args:
+        staged_file: Name of the file in staging storage
+        filename: Original file name; defaults to the staged name
+    """
+    codec = upload_codec(filename or staged_file)
+    with open_staged(staged_file) as raw:
+        if codec is None:
+            yield raw
+            return
+        stream = decompress(raw, codec, settings.MAX_FILE_SIZE)
+        try:
+            yield stream
+        finally:
+            stream.close()
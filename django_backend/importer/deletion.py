@@ -0,0 +1,119 @@
+"""Background mass deletion of products.
+
+A ``DeleteJob`` deletes the products matching its filters in primary-key
+ordered batches of ``PRODUCT_DELETE_BATCH_SIZE``, clamped to the number of
+query parameters the database accepts. Each batch is one short
+``DELETE ... WHERE id IN (...)`` transaction that also records the job's
+progress, so locks are held briefly, memory stays flat and a restarted job
+simply continues with what is left. Deleting everything on PostgreSQL uses
+``TRUNCATE`` instead when ``PRODUCT_DELETE_ALLOW_TRUNCATE`` is set.
+
+Subscribers get one ``product_deleted`` summary event per job rather than
+one event per product.
+"""
+import logging
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .batching import max_batch_rows
+from .models import DeleteJob, Product
+from .outbox import enqueue_event
+from .search import FILTER_PARAMS, filter_products
+from .sku_index import invalidate_sku_index
+from .stats import refresh_stats
+
+logger = logging.getLogger(__name__)
+
+
+def clean_filters(params):
+    """Product list filters present in ``params``."""
+    return {name: params[name] for name in FILTER_PARAMS if params.get(name)}
+
+
+def deletion_queryset(filters):
+    """Products matched by a delete job's filters, in primary key order."""
+    return filter_products(Product.objects.all(), filters).order_by('id')
+
+
+def can_truncate(filters):
+    """True if a job with ``filters`` may empty the table with TRUNCATE."""
+    return not filters and settings.PRODUCT_DELETE_ALLOW_TRUNCATE and connection.vendor == 'postgresql'
+
+
+def delete_batch(job_id, queryset, after=None):
+    """
+    Delete the next batch of products after primary key ``after``.
+
+    Returns:
+        (number deleted, last primary key in the batch)
+    """
+    if after is not None:
+        queryset = queryset.filter(id__gt=after)
+    size = min(settings.PRODUCT_DELETE_BATCH_SIZE, max_batch_rows())
+    ids = list(queryset.values_list('id', flat=True)[:size])
+    if not ids:
+        return 0, None
+
+    with transaction.atomic():
+        deleted, _ = Product.objects.filter(id__in=ids).delete()
+        DeleteJob.objects.filter(id=job_id).update(
+            deleted_records=F('deleted_records') + deleted,
+            updated_at=timezone.now()
+        )
+    return deleted, ids[-1]
+
+
+def truncate_products(job_id):
+    """Empty the product table in one statement (PostgreSQL only)."""
+    with transaction.atomic():
+        deleted = Product.objects.count()
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE TABLE {Product._meta.db_table}')
+        DeleteJob.objects.filter(id=job_id).update(
+            deleted_records=F('deleted_records') + deleted,
+            truncated=True,
+            updated_at=timezone.now()
+        )
+    return deleted
+
+
+def run_delete_job(job):
+    """
+    Delete the products matched by ``job`` and queue the summary event.
+
+    Returns:
+        number of products deleted by this run
+    """
+    DeleteJob.objects.filter(id=job.id).update(status='processing', updated_at=timezone.now())
+    queryset = deletion_queryset(job.filters)
+    if not job.total_records:
+        job.total_records = queryset.count()
+        DeleteJob.objects.filter(id=job.id).update(total_records=job.total_records)
+
+    if can_truncate(job.filters):
+        deleted = truncate_products(job.id)
+    else:
+        deleted = 0
+        after = None
+        while True:
+            count, after = delete_batch(job.id, queryset, after)
+            if after is None:
+                break
+            deleted += count
+
+    job.refresh_from_db()
+    with transaction.atomic():
+        DeleteJob.objects.filter(id=job.id).update(status='completed', updated_at=timezone.now())
+        enqueue_event('product_deleted', {
+            'delete_job_id': str(job.id),
+            'filters': job.filters,
+            'count': job.deleted_records,
+            'truncated': job.truncated,
+        })
+
+    if job.deleted_records:
+        invalidate_sku_index()
+        refresh_stats()
+    logger.info(f"Delete job {job.id} completed: {job.deleted_records} products deleted")
+    return deleted
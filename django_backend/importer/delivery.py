@@ -0,0 +1,120 @@
+"""Concurrent webhook delivery.
+
+Requests are sent from a bounded thread pool through one keep-alive
+``requests.Session`` per host, with a per-host concurrency limit and a
+deadline shared by every request of a delivery run. Results are returned to
+the caller, which writes the ``WebhookLog`` rows from its own thread.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+_sessions = {}
+_semaphores = {}
+_lock = threading.Lock()
+
+
+@dataclass
+class Delivery:
+    """One POST of a JSON body to one webhook."""
+    webhook: object
+    event_type: str
+    body: dict
+
+
+@dataclass
+class DeliveryResult:
+    """Outcome of a Delivery."""
+    delivery: Delivery
+    status_code: int = None
+    response_time_ms: float = None
+    error_message: str = None
+
+    @property
+    def ok(self):
+        return self.error_message is None
+
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+def get_session(url):
+    """Return the pooled session for a URL's host, creating it on first use."""
+    key = _host_key(url)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            per_host = settings.WEBHOOK_DELIVERY_PER_HOST
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=per_host)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[key] = session
+            _semaphores[key] = threading.BoundedSemaphore(per_host)
+        return session
+
+
+def _send(delivery, deadline):
+    url = delivery.webhook.url
+    session = get_session(url)
+    semaphore = _semaphores[_host_key(url)]
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0 or not semaphore.acquire(timeout=remaining):
+        return DeliveryResult(delivery, error_message='Delivery deadline exceeded')
+
+    try:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return DeliveryResult(delivery, error_message='Delivery deadline exceeded')
+
+        start_time = time.time()
+        response = session.post(
+            url,
+            json=delivery.body,
+            timeout=min(settings.WEBHOOK_DELIVERY_TIMEOUT, remaining)
+        )
+        result = DeliveryResult(
+            delivery,
+            status_code=response.status_code,
+            response_time_ms=(time.time() - start_time) * 1000
+        )
+        if response.status_code >= 400:
+            result.error_message = response.text[:500]
+        return result
+    except Exception as e:
+        return DeliveryResult(delivery, error_message=str(e)[:500])
+    finally:
+        semaphore.release()
+
+
+def deliver(deliveries, deadline_seconds=None):
+    """
+    Send deliveries concurrently.
+
+    Args:
+        deliveries: List of Delivery
+        deadline_seconds: Time budget for the whole run; defaults to
+            ``WEBHOOK_DELIVERY_DEADLINE``. Requests not started in time are
+            reported as failed.
+
+    Returns:
+        List of DeliveryResult, in the same order as ``deliveries``
+    """
+    if not deliveries:
+        return []
+
+    if deadline_seconds is None:
+        deadline_seconds = settings.WEBHOOK_DELIVERY_DEADLINE
+    deadline = time.monotonic() + deadline_seconds
+
+    workers = min(settings.WEBHOOK_DELIVERY_MAX_WORKERS, len(deliveries))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda delivery: _send(delivery, deadline), deliveries))
@@ -0,0 +1,104 @@
+"""Streaming product export.
+
+Rows are read with ``values_list(...).iterator()`` (a server-side cursor on
+PostgreSQL) and formatted without model instances or serializers, then
+yielded in blocks of about ``EXPORT_BLOCK_SIZE`` bytes. Memory stays flat
+for any catalog size and the first block is sent as soon as the first
+chunk of rows has been read; under ASGI the view hands the blocks over one
+by one through ``streaming.aiter_blocks``.
+"""
+import csv
+import io
+import json
+import zlib
+from django.conf import settings
+
+EXPORT_FIELDS = ['sku', 'name', 'description', 'price', 'quantity', 'active', 'created_at', 'updated_at']
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+EXPORT_BLOCK_SIZE = 64 * 1024
+
+
+def iter_export_rows(queryset):
+    """Yield product rows as tuples in EXPORT_FIELDS order."""
+    return queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def _drain(buffer):
+    """Return the buffered text and empty the buffer."""
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def iter_csv(rows):
+    """
+    Format rows as CSV text blocks.
+
+    The header and column order match the import format, so an export can
+    be imported again as-is.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for sku, name, description, price, quantity, active, created_at, updated_at in rows:
+        writer.writerow((
+            sku,
+            name,
+            description or '',
+            '' if price is None else price,
+            quantity,
+            'true' if active else 'false',
+            created_at.isoformat(),
+            updated_at.isoformat(),
+        ))
+        if buffer.tell() >= EXPORT_BLOCK_SIZE:
+            yield _drain(buffer)
+    yield _drain(buffer)
+
+
+def iter_ndjson(rows):
+    """Format rows as newline-delimited JSON text blocks."""
+    buffer = io.StringIO()
+    for sku, name, description, price, quantity, active, created_at, updated_at in rows:
+        buffer.write(json.dumps({
+            'sku': sku,
+            'name': name,
+            'description': description,
+            'price': price,
+            'quantity': quantity,
+            'active': active,
+            'created_at': created_at.isoformat(),
+            'updated_at': updated_at.isoformat(),
+        }))
+        buffer.write('\n')
+        if buffer.tell() >= EXPORT_BLOCK_SIZE:
+            yield _drain(buffer)
+    yield _drain(buffer)
+
+
+def gzip_stream(blocks):
+    """Compress a stream of text blocks into gzip bytes."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for block in blocks:
+        data = compressor.compress(block.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(queryset, export_format='csv', compress=False):
+    """
+    Stream a product queryset in ``export_format``.
+
+    Returns:
+        iterator of str blocks, or of bytes when ``compress`` is set
+    """
+    formatter = iter_ndjson if export_format == 'ndjson' else iter_csv
+    blocks = formatter(iter_export_rows(queryset))
+    if compress:
+        return gzip_stream(blocks)
+    return blocks
@@ -0,0 +1,91 @@
+"""Import file formats.
+
+An upload's format is taken from its file name: CSV (``.csv``), NDJSON
+(``.ndjson``, ``.jsonl``), Parquet (``.parquet``) or Arrow IPC
+(``.arrow``, ``.feather``). CSV and NDJSON may also be compressed (see
+``compression.py``); Parquet and Arrow files compress internally and are
+read with random access, so they must be uploaded as is.
+
+CSV is parsed by ``pipeline.CSVImportStream`` unless ``IMPORT_CSV_READER``
+is ``'arrow'``; the other formats always use the vectorized readers in
+``columnar.py`` and need pyarrow.
+"""
+from django.conf import settings
+from .columnar import (
+    pa, ArrowCSVImportStream, ArrowIPCImportStream, NDJSONImportStream, ParquetImportStream
+)
+from .compression import upload_codec
+from .parallel import read_header
+from .pipeline import CSVImportStream
+
+IMPORT_FORMATS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+}
+COMPRESSIBLE_FORMATS = {'csv', 'ndjson'}
+ARROW_READERS = {
+    'csv': ArrowCSVImportStream,
+    'ndjson': NDJSONImportStream,
+    'parquet': ParquetImportStream,
+    'arrow': ArrowIPCImportStream,
+}
+
+
+def upload_format(filename):
+    """
+    Format and compression codec of an upload, from its file name.
+
+    Returns:
+        (format, codec): format is 'csv', 'ndjson', 'parquet' or 'arrow';
+        codec as returned by ``compression.upload_codec``
+
+    Raises:
+        ValueError: if the file type is not supported or needs a package
+            that is not installed
+    """
+    codec = upload_codec(filename)
+    name = filename.lower()
+    if codec == 'zip':
+        return 'csv', codec
+    if codec is not None:
+        name = name.rsplit('.', 1)[0]
+
+    import_format = next(
+        (fmt for suffix, fmt in IMPORT_FORMATS.items() if name.endswith(suffix)), None
+    )
+    if import_format is None:
+        raise ValueError(
+            'File must be CSV, NDJSON, Parquet or Arrow (.csv, .ndjson, .jsonl, .parquet, '
+            '.arrow, .feather); CSV and NDJSON may be .gz, .zst or .zip compressed'
+        )
+    if codec is not None and import_format not in COMPRESSIBLE_FORMATS:
+        raise ValueError('Parquet and Arrow files must not be compressed')
+    if import_format != 'csv' and pa is None:
+        raise ValueError(f'{import_format.capitalize()} uploads need the pyarrow package')
+    return import_format, codec
+
+
+def open_import_source(stream, filename, offset=0, rows_read=0, rejects=None):
+    """
+    Reader for an upload, resumed after ``rows_read`` records if given.
+
+    ``offset`` is the byte offset checkpointed with ``rows_read``; only the
+    ``csv`` reader can seek to it, the others skip records instead. Invalid
+    rows are reported to ``rejects`` (a ``rejects.RejectLog``).
+
+    Returns:
+        An ``ImportSource``
+    """
+    import_format, _ = upload_format(filename)
+    if import_format == 'csv' and settings.IMPORT_CSV_READER != 'arrow':
+        if not offset:
+            return CSVImportStream(stream, rejects=rejects)
+        fieldnames, _ = read_header(stream)
+        return CSVImportStream(
+            stream, fieldnames=fieldnames, start=offset, rows_read=rows_read, rejects=rejects
+        )
+    return ARROW_READERS[import_format](stream, rows_read=rows_read, rejects=rejects)
@@ -65,8 +65,8 @@ class CSVUploadForm(forms.Form):
     file = forms.FileField(
         widget=forms.FileInput(attrs={
             'class': 'form-control',
-            'accept': '.csv',
+            'accept': '.csv,.ndjson,.jsonl,.parquet,.arrow,.feather,.gz,.zst,.zip',
             'required': True
         }),
-        help_text='Upload a CSV file with columns: sku, name, description, price, quantity'
+        help_text='Upload a CSV, NDJSON, Parquet or Arrow file (CSV and NDJSON optionally .gz, .zst or .zip) with columns: sku, name, description, price, quantity'
     )
@@ -0,0 +1,345 @@
+"""Measure CSV import throughput on a synthetic catalog."""
+import argparse
+import gzip
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import zipfile
+from collections import Counter
+from unittest.mock import patch
+import django
+from celery.app.task import Task
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from config.celery import app as celery_app
+from importer.columnar import pa
+from importer.compression import zstandard
+from importer.formats import upload_format
+from importer.models import ImportJob, Product
+from importer.sku_index import invalidate_sku_index
+from importer.storage import delete_staged, get_staging_storage
+from importer.synthetic import generate_catalog, synthetic_sku
+from importer.tasks import import_csv_task
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_PREFIX = 'BENCHIMP'
+FORMAT_SUFFIXES = {'csv': '.csv', 'ndjson': '.ndjson', 'parquet': '.parquet', 'arrow': '.arrow'}
+CODEC_SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst', 'zip': '.zip'}
+
+
+def convert(path, import_format, directory):
+    """
+    Re-encode a generated CSV file in another import format.
+
+    Column types are inferred by pyarrow, so malformed rows keep price or
+    quantity as strings.
+
+    Returns:
+        Path of the converted file, written to ``directory``
+    """
+    if import_format == 'csv':
+        return path
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    table = pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(
+        column_types={'sku': pa.string(), 'name': pa.string(), 'description': pa.string()},
+        null_values=[''],
+    ))
+    converted = os.path.join(directory, 'catalog' + FORMAT_SUFFIXES[import_format])
+    if import_format == 'ndjson':
+        with open(converted, 'wb') as f:
+            for batch in table.to_batches():
+                for row in batch.to_pylist():
+                    f.write(json.dumps(row).encode() + b'\n')
+    elif import_format == 'parquet':
+        pq.write_table(table, converted)
+    else:
+        with pa.OSFile(converted, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return converted
+
+
+def compress(path, codec, directory):
+    """
+    Compress an upload file the way a client would.
+
+    Returns:
+        Path of the compressed file, written to ``directory``
+    """
+    if codec == 'none':
+        return path
+    compressed = os.path.join(directory, 'upload' + CODEC_SUFFIXES[codec])
+    if codec == 'zip':
+        with zipfile.ZipFile(compressed, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.write(path, 'benchmark.csv')
+        return compressed
+    with open(path, 'rb') as source, open(compressed, 'wb') as target:
+        if codec == 'gzip':
+            with gzip.GzipFile(fileobj=target, mode='wb', compresslevel=6) as stream:
+                shutil.copyfileobj(source, stream)
+        else:
+            zstandard.ZstdCompressor().copy_stream(source, target)
+    return compressed
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB, if available."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def import_in_subprocess(job_id, mode, csv_reader=None):
+    """
+    Run ``run_import`` in a fresh interpreter (``benchmark_import --job``).
+
+    The catalog is generated and staged by this process, so its peak RSS
+    says nothing about the import; the child's covers only Django and the
+    import itself.
+    """
+    command = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_import',
+               '--job', str(job_id), '--mode', mode]
+    if csv_reader:
+        command += ['--csv-reader', csv_reader]
+    process = subprocess.run(command, capture_output=True, text=True)
+    if process.returncode:
+        raise CommandError(process.stderr.strip().splitlines()[-1] if process.stderr.strip()
+                           else f'import process exited with code {process.returncode}')
+    return json.loads(process.stdout)
+
+
+def run_import(job_id, mode, csv_reader=None):
+    """Run the import in this process, counting queries and task messages."""
+    job = ImportJob.objects.get(id=job_id)
+    queries = 0
+    messages = Counter()
+
+    def count_query(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    # Tasks run eagerly, so every task execution stands for one message
+    # a worker setup would publish to the broker
+    apply = Task.apply
+
+    def count_message(task, *args, **kwargs):
+        messages[task.name] += 1
+        return apply(task, *args, **kwargs)
+
+    overrides = {}
+    if mode == 'serial':
+        overrides['IMPORT_PARALLEL_MIN_SIZE'] = 0
+    elif mode == 'parallel':
+        overrides['IMPORT_PARALLEL_MIN_SIZE'] = 1
+    if csv_reader:
+        overrides['IMPORT_CSV_READER'] = csv_reader
+
+    celery_app.conf.task_always_eager = True
+    celery_app.conf.task_eager_propagates = True
+    rss_before = peak_rss_mb()
+    with override_settings(**overrides), patch.object(Task, 'apply', count_message), \
+            connection.execute_wrapper(count_query):
+        min_size = settings.IMPORT_PARALLEL_MIN_SIZE
+        parallel = (bool(min_size) and upload_format(job.filename) == ('csv', None)
+                    and get_staging_storage().size(job.staged_file) >= min_size)
+        started = time.perf_counter()
+        import_csv_task.delay(job.staged_file, job.filename, str(job.id))
+        elapsed = time.perf_counter() - started
+        csv_reader = csv_reader or settings.IMPORT_CSV_READER
+
+    job.refresh_from_db()
+    if job.status != 'completed':
+        raise CommandError(f'Import ended as {job.status}: {job.error_message}')
+
+    rss_after = peak_rss_mb()
+    return {
+        'timestamp': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'backend': job.backend or settings.IMPORT_BACKEND,
+        'mode': 'parallel' if parallel else 'serial',
+        'csv_reader': csv_reader,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(job.processed_records / elapsed, 1) if elapsed else None,
+        'processed': job.processed_records,
+        'created': job.created_records,
+        'updated': job.updated_records,
+        'unchanged': job.unchanged_records,
+        'rejected': job.rejected_records,
+        'queries': queries,
+        'messages': sum(messages.values()),
+        'messages_by_task': dict(messages),
+        'peak_rss_mb': rss_after and round(rss_after, 1),
+        'peak_rss_growth_mb': rss_after and round(rss_after - rss_before, 1),
+        'stages': job.metrics,
+    }
+
+
+class Command(BaseCommand):
+    """Run import_csv_task eagerly on a generated CSV and report its cost."""
+    help = 'Benchmark CSV imports on a synthetic catalog (adds and removes BENCHIMP products)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows in the generated CSV')
+        parser.add_argument('--existing-ratio', type=float, default=0.0,
+                            help='Fraction of rows updating an existing product')
+        parser.add_argument('--description-length', type=int, default=60)
+        parser.add_argument('--malformed-rate', type=float, default=0.0,
+                            help='Fraction of rows the import must reject')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--backend', choices=[name for name, _ in ImportJob.BACKEND_CHOICES], default='')
+        parser.add_argument('--format', choices=list(FORMAT_SUFFIXES), default='csv',
+                            help='Upload the catalog in this file format')
+        parser.add_argument('--codec', choices=list(CODEC_SUFFIXES), default='none',
+                            help='Upload the catalog compressed with this codec')
+        parser.add_argument('--csv-reader', choices=['python', 'arrow'],
+                            help='Override IMPORT_CSV_READER')
+        parser.add_argument('--mode', choices=['auto', 'serial', 'parallel'], default='auto',
+                            help='Force the serial or parallel import path')
+        parser.add_argument('--sync', action='store_true',
+                            help='Import the catalog once before measuring, so the measured run '
+                                 're-imports unchanged rows')
+        parser.add_argument('--output', help='Write the result as JSON to this file')
+        parser.add_argument('--baseline', help='Compare against a JSON result from an earlier run')
+        parser.add_argument('--keep', action='store_true', help='Keep the imported products afterwards')
+        # Set by import_in_subprocess: import a staged job, print the result
+        parser.add_argument('--job', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['job']:
+            self.stdout.write(json.dumps(run_import(options['job'], options['mode'], options['csv_reader'])))
+            return
+
+        if Product.objects.filter(sku__startswith=f'{BENCH_PREFIX}-').exists():
+            raise CommandError(f'{BENCH_PREFIX} products left from an earlier run; delete them first')
+
+        import_format, codec = options['format'], options['codec']
+        filename = 'benchmark' + (
+            CODEC_SUFFIXES[codec] if codec == 'zip' else FORMAT_SUFFIXES[import_format] + CODEC_SUFFIXES[codec]
+        )
+        if codec == 'zip' and import_format != 'csv':
+            raise CommandError('--codec zip only applies to CSV')
+        try:
+            upload_format(filename)
+        except ValueError as e:
+            raise CommandError(e)
+
+        # The catalog is streamed to disk and staged from there, never held
+        # in memory as a whole
+        with tempfile.TemporaryDirectory() as directory:
+            catalog = os.path.join(directory, 'catalog.csv')
+            with open(catalog, 'w', newline='', encoding='utf-8') as f:
+                summary = generate_catalog(
+                    f, options['rows'],
+                    existing_ratio=options['existing_ratio'],
+                    description_length=options['description_length'],
+                    malformed_rate=options['malformed_rate'],
+                    seed=options['seed'],
+                    sku_prefix=BENCH_PREFIX,
+                )
+            data = convert(catalog, import_format, directory)
+            upload = compress(data, codec, directory)
+            data_bytes, upload_bytes = os.path.getsize(data), os.path.getsize(upload)
+            self.stdout.write(
+                f'{connection.vendor}: {summary.rows} rows ({summary.existing} existing, '
+                f'{summary.malformed} malformed), {data_bytes / 1024 / 1024:.1f} MiB of {import_format}'
+                + (f', {upload_bytes / 1024 / 1024:.1f} MiB as {codec}' if codec != 'none' else '')
+            )
+
+            self.create_existing(summary.existing)
+            jobs = [self.create_job(filename, upload, options['backend']) for _ in range(2 if options['sync'] else 1)]
+
+        # Each import runs in its own process, so connections opened here
+        # must not be shared with it
+        connection.close()
+        try:
+            for job in jobs:
+                result = import_in_subprocess(job.id, options['mode'], options['csv_reader'])
+        finally:
+            for job in jobs:
+                delete_staged(job.staged_file)
+            if not options['keep']:
+                Product.objects.filter(sku__startswith=f'{BENCH_PREFIX}-').delete()
+                ImportJob.objects.filter(id__in=[job.id for job in jobs]).delete()
+                invalidate_sku_index()
+
+        result.update({
+            'rows': summary.rows,
+            'existing_ratio': options['existing_ratio'],
+            'description_length': options['description_length'],
+            'malformed_rate': options['malformed_rate'],
+            'seed': options['seed'],
+            'sync': options['sync'],
+            'format': import_format,
+            'codec': codec,
+            'data_mb': round(data_bytes / 1024 / 1024, 2),
+            'upload_mb': round(upload_bytes / 1024 / 1024, 2),
+        })
+        self.report(result)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, indent=2)
+            self.stdout.write(f'  result written to {options["output"]}')
+        if options['baseline']:
+            self.compare(result, options['baseline'])
+
+    def create_job(self, filename, upload, backend):
+        """Stage a copy of the upload file for a new import job."""
+        job_id = str(uuid.uuid4())
+        with open(upload, 'rb') as f:
+            staged_file = get_staging_storage().save(f'{job_id}/{filename}', File(f))
+        return ImportJob.objects.create(
+            id=job_id, filename=filename, staged_file=staged_file, backend=backend, status='pending'
+        )
+
+    def create_existing(self, count, batch_size=10000):
+        """Create the products the catalog's existing rows update."""
+        for start in range(0, count, batch_size):
+            Product.objects.bulk_create([
+                Product(sku=synthetic_sku(BENCH_PREFIX, i), name='Existing')
+                for i in range(start, min(start + batch_size, count))
+            ], batch_size=batch_size)
+        invalidate_sku_index()
+
+    def report(self, result):
+        self.stdout.write(
+            f"  {result['processed']} imported ({result['created']} created, {result['updated']} updated, "
+            f"{result['unchanged']} unchanged, {result['rejected']} rejected) in {result['elapsed_seconds']:.2f}s: "
+            f"{result['rows_per_second']} rows/s"
+        )
+        self.stdout.write(f"  queries: {result['queries']}, task messages: {result['messages']} "
+                          f"{result['messages_by_task']}")
+        if result['peak_rss_mb'] is not None:
+            self.stdout.write(f"  peak RSS of the import process: {result['peak_rss_mb']} MiB "
+                              f"(+{result['peak_rss_growth_mb']} MiB during the import)")
+
+    def compare(self, result, path):
+        """Print the change in each metric relative to a baseline result."""
+        with open(path) as f:
+            baseline = json.load(f)
+        if (baseline.get('database'), baseline.get('rows')) != (result['database'], result['rows']):
+            self.stdout.write(self.style.WARNING('  baseline used a different database or row count'))
+        for metric in ('rows_per_second', 'queries', 'messages', 'peak_rss_mb'):
+            before, after = baseline.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            self.stdout.write(f'  {metric}: {before} -> {after} ({(after - before) / before:+.1%})')
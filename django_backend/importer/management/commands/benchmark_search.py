@@ -0,0 +1,85 @@
+"""Compare indexed product search against LIKE scans on synthetic products."""
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from importer.models import Product
+from importer.search import search_field, search_products
+
+BENCH_PREFIX = 'BENCH'
+WORDS = ['Widget', 'Gadget', 'Sprocket', 'Flange', 'Bracket', 'Hinge', 'Spindle', 'Gasket']
+
+
+class Command(BaseCommand):
+    """Benchmark substring filters with and without the search index."""
+    help = 'Benchmark indexed product search against LIKE scans (adds and removes BENCH products)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000000, help='Number of synthetic products')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic products afterwards')
+
+    def handle(self, *args, **options):
+        count = options['products']
+        self.stdout.write(f'{connection.vendor}: inserting {count} products...')
+        started = time.perf_counter()
+        self.create_products(count)
+        self.stdout.write(f'  insert (including index upkeep): {time.perf_counter() - started:.1f}s')
+
+        try:
+            probes = [
+                ('sku', f'{count // 2:09d}'[-7:]),
+                ('name', 'Sprocket 4242'),
+                ('name', 'nonexistent'),
+            ]
+            for field, term in probes:
+                scan = self.time_query(
+                    lambda: list(Product.objects.filter(**{f'{field}__icontains': term})[:20]),
+                    options['repeat'], indexed=False
+                )
+                indexed = self.time_query(
+                    lambda: list(search_field(Product.objects.all(), field, term)[:20]),
+                    options['repeat']
+                )
+                self.stdout.write(
+                    f'  {field}={term!r}: LIKE scan {scan * 1000:8.1f} ms, indexed {indexed * 1000:8.1f} ms'
+                )
+
+            ranked = self.time_query(
+                lambda: list(search_products(Product.objects.all(), 'Sprocket 42')[:20]),
+                options['repeat']
+            )
+            self.stdout.write(f"  q='Sprocket 42' (ranked): {ranked * 1000:8.1f} ms")
+        finally:
+            if not options['keep']:
+                Product.objects.filter(sku__startswith=f'{BENCH_PREFIX}-').delete()
+
+    def create_products(self, count, batch_size=10000):
+        now = timezone.now()
+        for start in range(0, count, batch_size):
+            Product.objects.bulk_create([
+                Product(
+                    id=uuid.uuid4(),
+                    sku=f'{BENCH_PREFIX}-{i:09d}',
+                    name=f'{WORDS[i % len(WORDS)]} {i}',
+                    description=f'Synthetic product {i}',
+                    created_at=now,
+                    updated_at=now,
+                )
+                for i in range(start, min(start + batch_size, count))
+            ], batch_size=batch_size)
+
+    def time_query(self, run, repeat, indexed=True):
+        """Best time of ``repeat`` runs; with ``indexed=False`` the index is bypassed."""
+        best = None
+        for _ in range(repeat):
+            with transaction.atomic():
+                if not indexed and connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute('SET LOCAL enable_bitmapscan = off')
+                started = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
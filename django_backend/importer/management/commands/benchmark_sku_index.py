@@ -0,0 +1,54 @@
+"""Compare memory and lookup latency of the SKU index against a Python set."""
+import sys
+import time
+from django.core.management.base import BaseCommand
+from importer.sku_index import SKUBloomFilter, SKU_INDEX_ERROR_RATE
+
+
+class Command(BaseCommand):
+    """Benchmark SKU membership structures on synthetic SKUs."""
+    help = 'Benchmark the Bloom filter SKU index against a Python set of SKUs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skus', type=int, default=1000000, help='Number of indexed SKUs')
+        parser.add_argument('--lookups', type=int, default=100000, help='Number of lookups to time')
+        parser.add_argument('--error-rate', type=float, default=SKU_INDEX_ERROR_RATE)
+
+    def handle(self, *args, **options):
+        count = options['skus']
+        lookups = options['lookups']
+        skus = [f'SKU{i:010d}' for i in range(count)]
+        # Half the probes are indexed SKUs, half are new ones
+        probes = [f'SKU{i:010d}' for i in range(count - lookups // 2, count + lookups // 2)]
+
+        started = time.perf_counter()
+        sku_set = set(sku.lower() for sku in skus)
+        set_build = time.perf_counter() - started
+        set_bytes = sys.getsizeof(sku_set) + sum(sys.getsizeof(sku) for sku in sku_set)
+
+        started = time.perf_counter()
+        sku_filter = SKUBloomFilter(count, options['error_rate'])
+        for sku in skus:
+            sku_filter.add(sku)
+        filter_build = time.perf_counter() - started
+        filter_bytes = sys.getsizeof(sku_filter.bits)
+
+        started = time.perf_counter()
+        set_hits = sum(1 for sku in probes if sku.lower() in sku_set)
+        set_lookup = (time.perf_counter() - started) / len(probes)
+
+        started = time.perf_counter()
+        filter_hits = sum(1 for sku in probes if sku in sku_filter)
+        filter_lookup = (time.perf_counter() - started) / len(probes)
+
+        false_positives = filter_hits - set_hits
+        self.stdout.write(f'{count} SKUs, {len(probes)} lookups ({set_hits} present)')
+        self.stdout.write(
+            f'  set:   {set_bytes / 1024 / 1024:8.1f} MiB, build {set_build:6.2f}s, '
+            f'{set_lookup * 1e9:7.0f} ns/lookup'
+        )
+        self.stdout.write(
+            f'  bloom: {filter_bytes / 1024 / 1024:8.1f} MiB, build {filter_build:6.2f}s, '
+            f'{filter_lookup * 1e9:7.0f} ns/lookup, '
+            f'{false_positives} false positives ({false_positives / max(len(probes) - set_hits, 1):.2%})'
+        )
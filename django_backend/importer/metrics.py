@@ -0,0 +1,148 @@
+"""Per-stage import instrumentation.
+
+An import runs inside ``record_stages(recorder)`` and its hot path wraps
+each stage in ``stage(name, rows)``, which adds the stage's wall time, row
+count and database query count to the active recorder (and does nothing
+when no recorder is active, e.g. for API writes). Stages may nest; a
+parent's time and queries include those of its children, e.g. ``write``
+includes ``sku_lookup``, ``bulk_update`` and ``bulk_create``. Parallel
+imports record ``split`` (parse and spill a byte range) and ``spill_read``
+instead of ``parse``.
+
+The recorded stages are saved on ``ImportJob.metrics`` with every
+checkpoint and exported in the Prometheus text format by
+``prometheus_metrics``.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import connection, transaction
+from django.db.models import Count
+from .models import ImportJob
+
+STAGE_FIELDS = ['seconds', 'calls', 'rows', 'queries']
+
+_recorder = ContextVar('import_stage_recorder', default=None)
+
+
+class StageRecorder:
+    """Cumulative wall time, calls, rows and queries per stage."""
+
+    def __init__(self, stages=None):
+        self.stages = {}
+        self.merge(stages or {})
+
+    def add(self, name, seconds=0.0, calls=1, rows=0, queries=0):
+        totals = self.stages.setdefault(name, dict.fromkeys(STAGE_FIELDS, 0))
+        totals['seconds'] += seconds
+        totals['calls'] += calls
+        totals['rows'] += rows
+        totals['queries'] += queries
+
+    def merge(self, stages):
+        """Add stages recorded elsewhere (a resumed run or another worker)."""
+        for name, totals in stages.items():
+            self.add(name, **{field: totals.get(field, 0) for field in STAGE_FIELDS})
+
+    def as_dict(self):
+        return {
+            name: {**totals, 'seconds': round(totals['seconds'], 6)}
+            for name, totals in self.stages.items()
+        }
+
+
+@contextmanager
+def record_stages(recorder):
+    """Record every ``stage`` run in this context into ``recorder``."""
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+@contextmanager
+def stage(name, rows=0):
+    """Time a stage of the active import, if any."""
+    recorder = _recorder.get()
+    if recorder is None:
+        yield
+        return
+
+    queries = 0
+
+    def count_query(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(count_query):
+            yield
+    finally:
+        recorder.add(name, time.perf_counter() - started, rows=rows, queries=queries)
+
+
+def timed_batches(batches, name='parse'):
+    """Iterate ``batches``, timing the production of each one as ``name``."""
+    iterator = iter(batches)
+    while True:
+        recorder = _recorder.get()
+        started = time.perf_counter()
+        try:
+            batch = next(iterator)
+        except StopIteration:
+            return
+        if recorder is not None:
+            recorder.add(name, time.perf_counter() - started, rows=len(batch))
+        yield batch
+
+
+def merge_job_metrics(job_id, stages):
+    """Add stages recorded by one worker of a parallel import to its job."""
+    if not stages:
+        return
+    with transaction.atomic():
+        job = ImportJob.objects.select_for_update().only('id', 'metrics').get(id=job_id)
+        recorder = StageRecorder(job.metrics)
+        recorder.merge(stages)
+        ImportJob.objects.filter(id=job_id).update(metrics=recorder.as_dict())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_metrics(jobs):
+    """
+    Render import metrics in the Prometheus text exposition format.
+
+    Stage totals are summed over ``jobs``; job counts cover every import.
+    """
+    totals = StageRecorder()
+    for metrics in jobs.exclude(metrics={}).values_list('metrics', flat=True).iterator():
+        totals.merge(metrics)
+
+    lines = [
+        '# HELP importer_import_jobs Import jobs by status.',
+        '# TYPE importer_import_jobs gauge',
+    ]
+    for row in ImportJob.objects.order_by().values('status').annotate(count=Count('id')):
+        lines.append(f'importer_import_jobs{{status="{_escape(row["status"])}"}} {row["count"]}')
+
+    descriptions = {
+        'seconds': 'Wall time spent in each import stage.',
+        'calls': 'Times each import stage ran.',
+        'rows': 'Rows handled by each import stage.',
+        'queries': 'Database queries issued by each import stage.',
+    }
+    stages = sorted(totals.stages.items())
+    for field in STAGE_FIELDS:
+        metric = f'importer_import_stage_{field}_total'
+        lines.append(f'# HELP {metric} {descriptions[field]}')
+        lines.append(f'# TYPE {metric} counter')
+        for name, values in stages:
+            value = round(values[field], 6) if field == 'seconds' else values[field]
+            lines.append(f'{metric}{{stage="{_escape(name)}"}} {value}')
+    return '\n'.join(lines) + '\n'
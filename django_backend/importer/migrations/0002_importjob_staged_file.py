@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-17 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='staged_file',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-17 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importer', '0002_importjob_staged_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='backend',
+            field=models.CharField(blank=True, choices=[('orm', 'ORM'), ('copy', 'PostgreSQL COPY')], default='', max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.8 on 2026-10-17 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importer', '0004_webhookoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='checkpoint_offset',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='checkpoint_rows',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-17 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importer', '0005_importjob_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at', '-id'], name='importer_pr_created_id_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='importer_pr_created_bc1001_idx',
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+INDEXES = {
+    'importer_pr_sku_trgm': 'sku',
+    'importer_pr_name_trgm': 'name',
+    'importer_pr_desc_trgm': 'description',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Trigram GIN indexes serving UPPER(column) LIKE '%...%' on PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON importer_product USING gin (UPPER({column}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    """
+    Substring search indexes.
+
+    PostgreSQL gets trigram GIN indexes here (built concurrently, hence not
+    atomic). The SQLite FTS5 index is installed after every migrate by
+    ``importer.search.install_sqlite_search``.
+    """
+    atomic = False
+
+    dependencies = [
+        ('importer', '0006_product_keyset_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
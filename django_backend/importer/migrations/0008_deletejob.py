@@ -0,0 +1,31 @@
+# Generated by Django 4.2.8 on 2026-10-17 04:47
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importer', '0007_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeleteJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filters', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=50)),
+                ('total_records', models.IntegerField(default=0)),
+                ('deleted_records', models.IntegerField(default=0)),
+                ('truncated', models.BooleanField(default=False)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
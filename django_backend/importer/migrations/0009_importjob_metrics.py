@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-17 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importer', '0008_deletejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='metrics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.8 on 2026-10-17 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importer', '0009_importjob_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='rejected_records',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rejects',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
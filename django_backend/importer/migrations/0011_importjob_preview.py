@@ -0,0 +1,23 @@
+# Generated by Django 4.2.8 on 2026-10-17 05:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importer', '0010_importjob_rejects'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='preview',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed'), ('previewed', 'Previewed')], default='pending', max_length=50),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+FTS_TABLE = 'importer_product_fts'
+FTS_KEY_TABLE = 'importer_product_fts_key'
+
+
+def drop_sqlite_search(apps, schema_editor):
+    """Drop the SQLite search index, table and triggers alike."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for trigger in ('ai', 'ad', 'au'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_KEY_TABLE}')
+
+
+class Migration(migrations.Migration):
+    """
+    Key the SQLite search index by product id.
+
+    The external-content FTS5 table joined products on their implicit
+    rowid, which VACUUM renumbers. It is dropped here and rebuilt after
+    migrate by ``importer.search.install_sqlite_search`` as a contentful
+    table keyed through ``importer_product_fts_key``.
+    """
+
+    dependencies = [
+        ('importer', '0012_product_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sqlite_search, drop_sqlite_search),
+    ]
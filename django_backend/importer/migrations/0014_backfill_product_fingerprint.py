@@ -0,0 +1,42 @@
+from django.db import migrations
+from importer.fingerprint import FINGERPRINT_FIELDS, fingerprint
+
+BATCH_SIZE = 2000
+
+
+def backfill_fingerprints(apps, schema_editor):
+    """Fingerprint the products saved before 0012, in primary key order."""
+    Product = apps.get_model('importer', 'Product')
+    pending = Product.objects.filter(fingerprint='').order_by('id').only('id', *FINGERPRINT_FIELDS)
+    last_id = None
+    while True:
+        batch = pending if last_id is None else pending.filter(id__gt=last_id)
+        products = list(batch[:BATCH_SIZE])
+        if not products:
+            return
+        for product in products:
+            product.fingerprint = fingerprint({name: getattr(product, name) for name in FINGERPRINT_FIELDS})
+        Product.objects.bulk_update(products, ['fingerprint'])
+        last_id = products[-1].id
+
+
+class Migration(migrations.Migration):
+    """
+    Fingerprint existing products.
+
+    Without it, the first import after 0012 would write every product it
+    covers (and send a ``product_updated`` webhook for each). The migration
+    is not atomic: each batch commits on its own, so a large catalog isn't
+    updated in one long transaction and an interrupted run picks up where
+    it stopped.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('importer', '0013_product_search_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 """Django models for product importer."""
 import uuid
 from django.db import models
+from django.utils import timezone
 from django.core.validators import URLValidator
+from .fingerprint import product_fingerprint
 
 
 class Product(models.Model):
@@ -13,6 +15,8 @@ class Product(models.Model):
     price = models.FloatField(blank=True, null=True)
     quantity = models.IntegerField(default=0)
     active = models.BooleanField(default=True, db_index=True)
+    # Hash of name, description, price and quantity, see fingerprint.py
+    fingerprint = models.CharField(max_length=32, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -21,15 +25,20 @@ class Product(models.Model):
         indexes = [
             models.Index(fields=['sku']),
             models.Index(fields=['active']),
-            models.Index(fields=['-created_at']),
+            # Keyset pagination order; also serves plain -created_at scans
+            models.Index(fields=['-created_at', '-id'], name='importer_pr_created_id_idx'),
         ]
 
     def __str__(self):
         return f"{self.sku} - {self.name}"
 
     def save(self, *args, **kwargs):
-        """Override save to ensure SKU is uppercase."""
+        """Override save to ensure SKU is uppercase and the fingerprint current."""
         self.sku = self.sku.upper()
+        self.fingerprint = product_fingerprint(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'fingerprint'}
         super().save(*args, **kwargs)
 
 
@@ -40,15 +49,37 @@ class ImportJob(models.Model):
         ('processing', 'Processing'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
+        # Dry run finished, waiting to be confirmed (see preview.py)
+        ('previewed', 'Previewed'),
+    ]
+    BACKEND_CHOICES = [
+        ('orm', 'ORM'),
+        ('copy', 'PostgreSQL COPY'),
     ]
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     filename = models.CharField(max_length=255)
+    staged_file = models.CharField(max_length=500, blank=True, default='')
+    backend = models.CharField(max_length=20, choices=BACKEND_CHOICES, blank=True, default='')
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='pending')
     total_records = models.IntegerField(default=0)
     processed_records = models.IntegerField(default=0)
     created_records = models.IntegerField(default=0)
     updated_records = models.IntegerField(default=0)
+    # Rows matching their product's fingerprint, which were not written
+    unchanged_records = models.IntegerField(default=0)
+    rejected_records = models.IntegerField(default=0)
+    # Rejected rows by reason: {reason: count}; the rows are kept in staging
+    # storage, see rejects.py
+    rejects = models.JSONField(default=dict, blank=True)
+    # Resume point: committed together with each imported chunk
+    checkpoint_offset = models.BigIntegerField(default=0)
+    checkpoint_rows = models.IntegerField(default=0)
+    # Per-stage timings: {stage: {seconds, calls, rows, queries}}, see metrics.py
+    metrics = models.JSONField(default=dict, blank=True)
+    # Dry-run result for jobs uploaded as a preview ({} until it is done,
+    # None for plain imports), see preview.py
+    preview = models.JSONField(null=True, blank=True)
     error_message = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -63,6 +94,28 @@ class ImportJob(models.Model):
         return f"{self.filename} - {self.status}"
 
 
+class DeleteJob(models.Model):
+    """Background deletion of all products, or of those matching ``filters``."""
+    STATUS_CHOICES = [choice for choice in ImportJob.STATUS_CHOICES if choice[0] != 'previewed']
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Product list filters (sku, name, active, q); empty deletes everything
+    filters = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='pending')
+    total_records = models.IntegerField(default=0)
+    deleted_records = models.IntegerField(default=0)
+    truncated = models.BooleanField(default=False)
+    error_message = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Delete {self.filters or 'all'} - {self.status}"
+
+
 class Webhook(models.Model):
     """Webhook configuration."""
     EVENT_TYPES = [
@@ -105,3 +158,37 @@ class WebhookLog(models.Model):
 
     def __str__(self):
         return f"{self.event_type} - {self.status_code or 'Error'}"
+
+
+class WebhookOutbox(models.Model):
+    """
+    Webhook delivery waiting to be sent (transactional outbox).
+
+    Rows are written in the same transaction as the product change that
+    caused them and drained by the ``dispatch_webhook_outbox`` task.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('delivered', 'Delivered'),
+        ('dead', 'Dead'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    webhook = models.ForeignKey(Webhook, on_delete=models.CASCADE, related_name='outbox')
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} - {self.status}"
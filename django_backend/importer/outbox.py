@@ -0,0 +1,192 @@
+"""Transactional webhook outbox.
+
+Product writes call ``enqueue_event``/``enqueue_event_batch`` inside their
+database transaction, which stores one ``WebhookOutbox`` row per subscribed
+webhook and POST body. After commit a dispatcher run is requested; the
+dispatcher (also run periodically by Celery beat) claims due rows in batches,
+delivers them concurrently, and retries failures with exponential backoff
+until they are delivered or dead-lettered. Endpoints that keep failing are
+skipped for a while by a per-webhook circuit breaker.
+"""
+import logging
+import random
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .delivery import Delivery, deliver
+from .models import Webhook, WebhookLog, WebhookOutbox
+from .webhooks import product_event, split_event_batches
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_KICK_CACHE_KEY = 'importer:outbox-kick'
+CIRCUIT_CACHE_KEY = 'importer:webhook-circuit:{}'
+
+
+def enqueue_event(event_type, payload):
+    """
+    Queue a single event for every active webhook subscribed to it.
+
+    Must be called in the transaction that performs the change so the event
+    is stored if and only if the change is committed.
+    """
+    _enqueue(event_type, [{'event_type': event_type, 'data': payload}])
+
+
+def enqueue_event_batch(event_type, items):
+    """Queue many events of one type as batched POST bodies."""
+    bodies = [
+        {'event_type': event_type, 'count': len(batch), 'data': batch}
+        for batch in split_event_batches(
+            items, settings.WEBHOOK_BATCH_MAX_ITEMS, settings.WEBHOOK_BATCH_MAX_BYTES
+        )
+    ]
+    _enqueue(event_type, bodies)
+
+
+def enqueue_product_events(result):
+    """Queue product_created/product_updated batches for an upsert result."""
+    enqueue_event_batch('product_created', [product_event(product) for product in result.created])
+    enqueue_event_batch('product_updated', [product_event(product) for product in result.updated])
+
+
+def _enqueue(event_type, bodies):
+    if not bodies:
+        return
+    webhooks = list(Webhook.objects.filter(active=True, event_type=event_type).only('id'))
+    if not webhooks:
+        return
+
+    WebhookOutbox.objects.bulk_create([
+        WebhookOutbox(webhook=webhook, event_type=event_type, payload=body)
+        for body in bodies
+        for webhook in webhooks
+    ])
+    transaction.on_commit(request_dispatch)
+
+
+def request_dispatch():
+    """Start a dispatcher run, at most once per second."""
+    if not cache.add(DISPATCH_KICK_CACHE_KEY, True, timeout=1):
+        return
+    from .tasks import dispatch_webhook_outbox
+    try:
+        dispatch_webhook_outbox.delay()
+    except Exception as e:
+        # The rows are durable; the periodic dispatcher will pick them up
+        logger.warning(f"Could not queue webhook dispatch: {str(e)}")
+
+
+def deliver_webhooks(deliveries):
+    """Send deliveries concurrently and record a WebhookLog for each."""
+    results = deliver(deliveries)
+
+    logs = []
+    for result in results:
+        if result.status_code is None:
+            logger.error(f"Webhook trigger failed for {result.delivery.webhook.url}: {result.error_message}")
+        logs.append(WebhookLog(
+            webhook=result.delivery.webhook,
+            event_type=result.delivery.event_type,
+            status_code=result.status_code,
+            response_time_ms=result.response_time_ms,
+            error_message=result.error_message
+        ))
+    WebhookLog.objects.bulk_create(logs)
+    return results
+
+
+def backoff_delay(attempts):
+    """Exponential backoff with jitter after ``attempts`` failed attempts."""
+    delay = min(
+        settings.WEBHOOK_RETRY_BASE_DELAY * 2 ** (attempts - 1),
+        settings.WEBHOOK_RETRY_MAX_DELAY
+    )
+    return timedelta(seconds=delay * random.uniform(0.9, 1.1))
+
+
+def circuit_open_until(webhook_id):
+    """Return when a webhook's open circuit closes, or None if it is closed."""
+    state = cache.get(CIRCUIT_CACHE_KEY.format(webhook_id))
+    if state and state.get('open_until') and state['open_until'] > timezone.now():
+        return state['open_until']
+    return None
+
+
+def record_circuit_result(webhook_id, success):
+    """Track consecutive failures and open the circuit past the threshold."""
+    key = CIRCUIT_CACHE_KEY.format(webhook_id)
+    if success:
+        cache.delete(key)
+        return
+
+    state = cache.get(key) or {'failures': 0, 'open_until': None}
+    state['failures'] += 1
+    if state['failures'] >= settings.WEBHOOK_CIRCUIT_FAILURE_THRESHOLD:
+        state['open_until'] = timezone.now() + timedelta(seconds=settings.WEBHOOK_CIRCUIT_COOLDOWN)
+        state['failures'] = 0
+        logger.warning(f"Webhook {webhook_id} circuit opened until {state['open_until']}")
+    cache.set(key, state, timeout=settings.WEBHOOK_CIRCUIT_COOLDOWN * 10)
+
+
+def claim_due_entries(limit):
+    """
+    Claim up to ``limit`` due outbox rows.
+
+    Claimed rows are leased by pushing ``next_attempt_at`` past the delivery
+    deadline, so concurrent dispatchers skip them and a crashed dispatcher's
+    rows become due again once the lease expires.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=settings.WEBHOOK_DELIVERY_DEADLINE * 2)
+    with transaction.atomic():
+        entries = list(
+            WebhookOutbox.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:limit]
+        )
+        WebhookOutbox.objects.filter(id__in=[entry.id for entry in entries]).update(
+            next_attempt_at=now + lease
+        )
+    return entries
+
+
+def process_entries(entries):
+    """Deliver claimed rows and record delivered, retry or dead state."""
+    webhooks = Webhook.objects.in_bulk({entry.webhook_id for entry in entries})
+    ready = []
+    for entry in entries:
+        entry.webhook = webhooks.get(entry.webhook_id)
+        open_until = circuit_open_until(entry.webhook_id)
+        if open_until:
+            entry.next_attempt_at = open_until
+        else:
+            ready.append(entry)
+
+    results = deliver_webhooks([
+        Delivery(entry.webhook, entry.event_type, entry.payload) for entry in ready
+    ])
+
+    now = timezone.now()
+    for entry, result in zip(ready, results):
+        entry.attempts += 1
+        record_circuit_result(entry.webhook_id, result.ok)
+        if result.ok:
+            entry.status = 'delivered'
+            entry.delivered_at = now
+            entry.last_error = None
+        elif entry.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            entry.status = 'dead'
+            entry.last_error = result.error_message
+            logger.error(f"Webhook delivery {entry.id} dead-lettered after {entry.attempts} attempts")
+        else:
+            entry.next_attempt_at = now + backoff_delay(entry.attempts)
+            entry.last_error = result.error_message
+
+    WebhookOutbox.objects.bulk_update(
+        entries, ['status', 'attempts', 'next_attempt_at', 'last_error', 'delivered_at']
+    )
+    return results
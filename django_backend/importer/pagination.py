@@ -0,0 +1,187 @@
+"""Keyset (cursor) pagination for products.
+
+Pages are ordered by ``(created_at, id)`` descending and each page starts
+after the last row of the previous one, so fetching any page costs one
+index range scan instead of an ``OFFSET`` scan plus a ``COUNT(*)``. Cursors
+are opaque base64 tokens holding the boundary row and the direction.
+"""
+import base64
+import json
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from urllib.parse import urlencode
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+KEYSET_ORDERING = ('-created_at', '-id')
+
+
+def encode_cursor(product, reverse=False):
+    """Opaque cursor pointing just past ``product`` in the given direction."""
+    data = {'c': product.created_at.isoformat(), 'i': str(product.id), 'r': reverse}
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor.
+
+    Returns:
+        (created_at, id, reverse)
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data['c']), uuid.UUID(data['i']), bool(data.get('r'))
+    except (TypeError, KeyError, ValueError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+@dataclass
+class KeysetPage:
+    """One page of a keyset-paginated queryset."""
+    items: list = field(default_factory=list)
+    next_cursor: str = None
+    previous_cursor: str = None
+
+
+def keyset_page(queryset, cursor=None, page_size=20):
+    """
+    Return the page of ``queryset`` that starts at ``cursor``.
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    reverse = False
+    if cursor:
+        created_at, pk, reverse = decode_cursor(cursor)
+        if reverse:
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk),
+                created_at__gte=created_at
+            )
+        else:
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+                created_at__lte=created_at
+            )
+
+    if reverse:
+        queryset = queryset.order_by('created_at', 'id')
+    else:
+        queryset = queryset.order_by(*KEYSET_ORDERING)
+
+    items = list(queryset[:page_size + 1])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if reverse:
+        items.reverse()
+
+    # Paging backwards, the page we came from always follows this one
+    has_next = bool(cursor) if reverse else has_more
+    has_previous = has_more if reverse else bool(cursor)
+
+    page = KeysetPage(items)
+    if items and has_next:
+        page.next_cursor = encode_cursor(items[-1])
+    if items and has_previous:
+        page.previous_cursor = encode_cursor(items[0], reverse=True)
+    return page
+
+
+def estimate_count(queryset):
+    """
+    Estimate the number of rows in ``queryset``.
+
+    Uses the planner's row estimate on PostgreSQL, which costs no table
+    scan; other databases fall back to an exact count.
+    """
+    queryset = queryset.order_by()
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def keyset_query(params, cursor):
+    """Query string for a page link that keeps the current filters."""
+    query = {key: value for key, value in params.items() if key != 'cursor'}
+    if cursor:
+        query['cursor'] = cursor
+    return urlencode(query)
+
+
+class ProductPagination(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset mode.
+
+    ``?pagination=cursor`` (or any ``cursor`` parameter) switches to keyset
+    pages with ``next``/``previous`` cursor links, always ordered newest
+    first. The total is then left out unless requested with
+    ``count=exact`` or ``count=estimate``.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = (
+            request.query_params.get('pagination') == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        try:
+            self.page = keyset_page(
+                queryset,
+                request.query_params.get(self.cursor_query_param),
+                self.get_page_size(request)
+            )
+        except ValueError:
+            raise NotFound('Invalid cursor')
+
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == 'exact':
+            self.count = queryset.count()
+        elif count_mode == 'estimate':
+            self.count = estimate_count(queryset)
+        else:
+            self.count = None
+        return self.page.items
+
+    def get_cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        body = {
+            'next': self.get_cursor_link(self.page.next_cursor),
+            'previous': self.get_cursor_link(self.page.previous_cursor),
+        }
+        if self.count is not None:
+            body['count'] = self.count
+        body['results'] = data
+        return Response(body)
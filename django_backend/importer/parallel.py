@@ -0,0 +1,211 @@
+"""Helpers for splitting one staged CSV across several Celery workers.
+
+A parallel import runs in two fan-out stages:
+
+1. The staged file is cut into byte ranges that end on record boundaries.
+   Each range is parsed by its own worker, which writes the normalized rows
+   into one spill file per partition, chosen by a stable hash of the SKU.
+2. One worker per partition reads that partition's spill files in file order
+   and upserts them. Every occurrence of a SKU lands in the same partition
+   and is applied in file order, so the last row always wins.
+"""
+import csv
+import io
+import tempfile
+import zlib
+from django.core.files import File
+from .pipeline import CSVImportStream, LineReader, stream_size
+from .storage import get_staging_storage
+
+READ_BLOCK_SIZE = 1024 * 1024
+SPILL_FIELDS = ['sku', 'name', 'description', 'price', 'quantity']
+
+
+def read_header(stream):
+    """
+    Read the CSV header from the start of a stream.
+
+    Forward-only streams (see ``open_staged_range``) must not have been read
+    from yet.
+
+    Returns:
+        (fieldnames, offset) where offset is the first byte after the header
+    """
+    if stream.seekable():
+        stream.seek(0)
+    lines = LineReader(stream)
+    fieldnames = next(csv.reader(lines), None)
+    if not fieldnames:
+        raise ValueError("CSV file is empty or invalid")
+    return fieldnames, lines.offset
+
+
+def split_ranges(stream, start, chunk_bytes, block_size=READ_BLOCK_SIZE, size=None):
+    """
+    Split ``stream`` from ``start`` to EOF into record-aligned byte ranges.
+
+    A range ends at the first newline past ``chunk_bytes`` that is not inside
+    a quoted field. Quote state is tracked by quote parity, which also
+    handles escaped ``""`` quotes. A forward-only stream must already be at
+    ``start`` and needs its total ``size``.
+
+    Returns:
+        list of (start, end) byte offsets
+    """
+    end = stream_size(stream) if size is None else size
+    ranges = []
+    chunk_start = start
+    target = start + chunk_bytes
+    in_quotes = False
+    position = start
+    if stream.seekable():
+        stream.seek(start)
+
+    while target < end:
+        block = stream.read(block_size)
+        if not block:
+            break
+
+        i = 0
+        while True:
+            if position + len(block) <= target:
+                in_quotes ^= bool(block.count(b'"', i) & 1)
+                break
+
+            scan_from = max(i, target - position)
+            in_quotes ^= bool(block.count(b'"', i, scan_from) & 1)
+            i = scan_from
+
+            boundary = None
+            while boundary is None:
+                newline = block.find(b'\n', i)
+                if newline == -1:
+                    in_quotes ^= bool(block.count(b'"', i) & 1)
+                    i = len(block)
+                    break
+                in_quotes ^= bool(block.count(b'"', i, newline) & 1)
+                i = newline + 1
+                if not in_quotes:
+                    boundary = position + i
+
+            if boundary is None:
+                break
+
+            ranges.append((chunk_start, boundary))
+            chunk_start = boundary
+            target = boundary + chunk_bytes
+            if target >= end:
+                break
+
+        position += len(block)
+
+    if chunk_start < end:
+        ranges.append((chunk_start, end))
+    return ranges
+
+
+class RangeReader(io.RawIOBase):
+    """Read-only view of the next ``length`` bytes of ``stream``; closing it closes ``stream``."""
+
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.remaining = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.remaining <= 0:
+            return 0
+        data = self.stream.read(min(len(buffer), self.remaining))
+        self.remaining -= len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self.stream.close()
+        super().close()
+
+
+def open_staged_range(name, start, end):
+    """
+    Open the byte range [start, end) of a staged file for binary reading.
+
+    ``open_staged`` on S3 staging downloads the whole object before the first
+    read, once per range task; here only the range is fetched, with a ranged
+    GET. The stream is forward-only.
+    """
+    storage = get_staging_storage()
+    if hasattr(storage, 'bucket_name'):
+        key = storage._normalize_name(name)
+        raw = storage.bucket.Object(key).get(Range=f'bytes={start}-{end - 1}')['Body']
+    else:
+        raw = storage.open(name, 'rb')
+        raw.seek(start)
+    return io.BufferedReader(RangeReader(raw, end - start), READ_BLOCK_SIZE)
+
+
+def partition_for(sku, partitions):
+    """Stable partition number for a SKU (independent of PYTHONHASHSEED)."""
+    return zlib.crc32(sku.encode('utf-8')) % partitions
+
+
+def spill_name(job_id, partition, index):
+    """Staging name of the spill file for one partition of one range."""
+    return f'{job_id}/parts/{partition:03d}-{index:05d}.csv'
+
+
+def spill_rows(job_id, index, rows, partitions):
+    """
+    Write normalized rows into per-partition spill files in staging storage.
+
+    Returns:
+        Number of rows written
+    """
+    files = {}
+    writers = {}
+    count = 0
+    try:
+        for row in rows:
+            partition = partition_for(row['sku'], partitions)
+            if partition not in writers:
+                files[partition] = tempfile.TemporaryFile(mode='w+', newline='', encoding='utf-8')
+                writers[partition] = csv.DictWriter(files[partition], fieldnames=SPILL_FIELDS)
+                writers[partition].writeheader()
+            writers[partition].writerow(row)
+            count += 1
+
+        storage = get_staging_storage()
+        for partition, spill in files.items():
+            name = spill_name(job_id, partition, index)
+            if storage.exists(name):
+                storage.delete(name)
+            spill.seek(0)
+            storage.save(name, File(spill))
+    finally:
+        for spill in files.values():
+            spill.close()
+    return count
+
+
+def iter_spilled_batches(job_id, partition, range_count, size):
+    """Yield row batches of ``size`` (see ``batched``) for one partition, in original file order."""
+    storage = get_staging_storage()
+    for index in range(range_count):
+        name = spill_name(job_id, partition, index)
+        if not storage.exists(name):
+            continue
+        with storage.open(name, 'rb') as stream:
+            for batch in CSVImportStream(stream).batches(size):
+                yield [row for _, row in batch]
+
+
+def delete_spills(job_id, partitions, range_count):
+    """Remove every spill file of a parallel import."""
+    storage = get_staging_storage()
+    for partition in range(partitions):
+        for index in range(range_count):
+            name = spill_name(job_id, partition, index)
+            if storage.exists(name):
+                storage.delete(name)
@@ -0,0 +1,203 @@
+"""Streaming CSV pipeline for product imports.
+
+Each stage is a generator so a file of any size is processed with a flat
+memory profile: read lines from a binary stream -> decode -> parse ->
+normalize -> batch.
+"""
+import codecs
+import csv
+import io
+import logging
+from .rejects import RejectLog, RowRejected
+
+logger = logging.getLogger(__name__)
+
+
+class LineReader:
+    """
+    Iterate decoded lines of a binary stream while tracking the byte offset.
+
+    The underlying stream is buffered, so lines are pulled from disk in
+    bounded blocks. ``offset`` is the number of bytes consumed so far and
+    always lands on a line boundary, which makes it usable as a progress
+    estimate and as a resume point. ``offset`` starts at the stream's
+    current position.
+    """
+
+    def __init__(self, stream, encoding='utf-8-sig', offset=0):
+        self.stream = stream
+        self.offset = offset
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+
+    def __iter__(self):
+        # readline() rather than iteration: Django File objects rewind to
+        # the start when iterated, which would ignore a resume offset
+        for line in iter(self.stream.readline, b''):
+            self.offset += len(line)
+            yield self._decoder.decode(line)
+        tail = self._decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+
+def stream_size(stream):
+    """Return the total size in bytes of a seekable stream, or None."""
+    try:
+        position = stream.tell()
+        size = stream.seek(0, io.SEEK_END)
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def normalize_row(row):
+    """
+    Normalize a parsed CSV row into product field values.
+
+    Returns:
+        dict with sku, name, description, price and quantity
+
+    Raises:
+        RowRejected: if the SKU or name is missing, or price or quantity
+            cannot be parsed.
+    """
+    sku = (row.get('sku') or '').strip().upper()
+    name = (row.get('name') or '').strip()
+    if not sku:
+        raise RowRejected('missing_sku')
+    if not name:
+        raise RowRejected('missing_name')
+
+    price = row.get('price')
+    quantity = row.get('quantity')
+    try:
+        price = float(price) if price else None
+    except ValueError:
+        raise RowRejected('invalid_price', f'Invalid price: {price!r}')
+    try:
+        quantity = int(quantity) if quantity else 0
+    except ValueError:
+        raise RowRejected('invalid_quantity', f'Invalid quantity: {quantity!r}')
+    return {
+        'sku': sku,
+        'name': name,
+        'description': (row.get('description') or '').strip(),
+        'price': price,
+        'quantity': quantity,
+    }
+
+
+def iter_normalized_rows(rows, start=1, rejects=None):
+    """
+    Normalize parsed rows, reporting invalid ones to ``rejects``.
+
+    Yields:
+        (row_num, normalized_row) tuples, numbered from ``start``
+    """
+    rejects = rejects or RejectLog()
+    for row_num, row in enumerate(rows, start):
+        try:
+            normalized = normalize_row(row)
+        except RowRejected as e:
+            rejects.add(row_num, e.reason, str(e), row)
+            continue
+        except Exception as e:
+            rejects.add(row_num, 'invalid_row', str(e), row)
+            continue
+
+        yield row_num, normalized
+
+
+def batched(iterable, size):
+    """
+    Group an iterable into lists of at most ``size`` items.
+
+    ``size`` is an int or an object whose ``size`` attribute is read before
+    each batch (see ``batching.AdaptiveBatchSizer``).
+    """
+    def limit():
+        return size if isinstance(size, int) else size.size
+
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= limit():
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ImportSource:
+    """
+    Base class for readers of an uploaded product file.
+
+    Subclasses set ``stream`` and ``total_bytes`` and implement ``offset``
+    (bytes consumed) and ``rows``.
+    """
+
+    @property
+    def progress(self):
+        """
+        Fraction of the file consumed, based on the byte offset (or, for a
+        decompressed stream, on the compressed bytes read).
+        """
+        if hasattr(self.stream, 'progress'):
+            return self.stream.progress
+        if not self.total_bytes:
+            return 0.0
+        return min(self.offset / self.total_bytes, 1.0)
+
+    def estimate_total(self, processed):
+        """Extrapolate the total row count from rows processed so far."""
+        if not self.progress:
+            return processed
+        return max(processed, int(processed / self.progress))
+
+    def rows(self):
+        raise NotImplementedError
+
+    def batches(self, size):
+        """Yield lists of (row_num, normalized_row) of at most ``size`` rows (see ``batched``)."""
+        return batched(self.rows(), size)
+
+
+class CSVImportStream(ImportSource):
+    """
+    Streaming reader for an uploaded product CSV.
+
+    ``fieldnames`` is given when reading a slice of a file that does not
+    start with the header row. To resume an import, pass the byte ``start``
+    of the first unread record and the number of records already read as
+    ``rows_read``. Invalid rows are reported to ``rejects`` (a
+    ``rejects.RejectLog``).
+
+    Usage:
+        source = CSVImportStream(stream)
+        for batch in source.batches(1000):
+            ...
+        source.progress  # fraction of the file consumed (0.0 - 1.0)
+    """
+
+    def __init__(self, stream, fieldnames=None, start=0, rows_read=0, rejects=None):
+        self.stream = stream
+        self.rejects = rejects
+        self.total_bytes = stream_size(stream)
+        if start:
+            stream.seek(start)
+        self.rows_read = rows_read
+        self.lines = LineReader(stream, offset=start)
+        self.reader = csv.DictReader(self.lines, fieldnames=fieldnames)
+
+        if not self.reader.fieldnames:
+            raise ValueError("CSV file is empty or invalid")
+
+    @property
+    def offset(self):
+        """Bytes consumed from the underlying stream."""
+        return self.lines.offset
+
+    def rows(self):
+        """Yield (row_num, normalized_row) for every valid row."""
+        return iter_normalized_rows(self.reader, start=self.rows_read + 1, rejects=self.rejects)
@@ -0,0 +1,186 @@
+"""Dry-run previews of imports.
+
+A preview reads an upload once, through the same readers as an import, and
+compares each batch of rows with the products found by one ``sku IN (...)``
+lookup per batch. Nothing is written to the database: the result counts
+the rows the import would create, update, leave unchanged or reject, with
+a sample of field-level diffs. Rejected rows are kept for download as for
+an import (see ``rejects.py``).
+
+The rows that would change are saved, normalized, as a CSV next to the
+upload (``<job_id>/preview/changes.csv``), and the preview is cached under
+its job for ``IMPORT_PREVIEW_TTL`` seconds, so previews of the same file
+don't interfere. Confirming the preview imports that file instead of
+reparsing the upload, as long as the products have not changed since
+(``catalog_version``); otherwise the upload itself is imported. Only the
+SKUs of changed rows are held in memory, so previewing a file that mostly
+repeats the catalog needs little.
+"""
+import csv
+import tempfile
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.db.models import Count, Max
+from django.utils import timezone
+from .batching import max_batch_rows
+from .compression import open_import_stream
+from .formats import open_import_source
+from .models import Product
+from .parallel import SPILL_FIELDS
+from .rejects import RejectsFile
+from .storage import get_staging_storage
+from .upsert import UPSERT_FIELDS
+
+PREVIEW_CACHE_KEY = 'importer:preview:{}'
+
+
+def catalog_version():
+    """
+    Product count and latest ``updated_at``; every product write changes
+    one of them.
+    """
+    stats = Product.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+    latest = stats['latest'].isoformat() if stats['latest'] else ''
+    return f"{stats['count']}:{latest}"
+
+
+def changes_file_name(job_id):
+    return f'{job_id}/preview/changes.csv'
+
+
+def is_changes_file(name):
+    """Whether a staged file is a preview's changes rather than an upload."""
+    return name.endswith('/preview/changes.csv')
+
+
+class PreviewCounter:
+    """
+    Classify rows against existing products, batch by batch.
+
+    A row whose SKU an earlier row of the file already changed counts as an
+    update, since the import applies rows in file order.
+    """
+
+    def __init__(self, sample_size):
+        self.sample_size = sample_size
+        self.counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+        self.diffs = {'created': [], 'updated': []}
+        self.changed = set()
+        self.rows = 0
+
+    def add_batch(self, batch):
+        """
+        Count a batch of (row_num, normalized_row).
+
+        Returns:
+            the rows of the batch the import would write, in file order
+        """
+        skus = {row['sku'] for _, row in batch}
+        existing = {
+            product.sku: product
+            for product in Product.objects.filter(sku__in=skus).only('sku', *UPSERT_FIELDS)
+        }
+        changes = []
+        for row_num, row in batch:
+            self.rows += 1
+            sku = row['sku']
+            product = existing.get(sku)
+            if sku in self.changed:
+                action, diff = 'updated', {}
+            elif product is None:
+                action, diff = 'created', {name: [None, row[name]] for name in UPSERT_FIELDS}
+            else:
+                diff = {
+                    name: [getattr(product, name), row[name]]
+                    for name in UPSERT_FIELDS if getattr(product, name) != row[name]
+                }
+                action = 'updated' if diff else 'unchanged'
+
+            self.counts[action] += 1
+            if action == 'unchanged':
+                continue
+            self.changed.add(sku)
+            changes.append(row)
+            if diff and len(self.diffs[action]) < self.sample_size:
+                self.diffs[action].append({'row': row_num, 'sku': sku, 'changes': diff})
+        return changes
+
+
+def preview_import(job, staged_file, progress=None):
+    """
+    Compute and cache the preview of importing a staged upload.
+
+    Args:
+        job: ImportJob of the preview; its rejected rows are saved for it
+        staged_file: Name of the upload in staging storage
+        progress: Optional ``ProgressReporter`` updated after each batch
+
+    Returns:
+        dict with the ``total`` rows, the ``created``, ``updated``,
+        ``unchanged`` and ``rejected`` counts, ``rejects`` by reason, sampled
+        ``diffs`` per action, ``catalog_version`` and the ``changes_file`` to
+        import on confirmation
+    """
+    version = catalog_version()
+    counter = PreviewCounter(settings.IMPORT_PREVIEW_SAMPLE_SIZE)
+    batch_size = min(settings.IMPORT_PREVIEW_BATCH_SIZE, max_batch_rows())
+
+    changes = tempfile.TemporaryFile(mode='w+', newline='', encoding='utf-8')
+    try:
+        writer = csv.DictWriter(changes, fieldnames=SPILL_FIELDS)
+        writer.writeheader()
+        with open_import_stream(staged_file) as stream, RejectsFile(job.id) as rejects:
+            source = open_import_source(stream, staged_file, rejects=rejects)
+            for batch in source.batches(batch_size):
+                writer.writerows(counter.add_batch(batch))
+                if progress is not None:
+                    progress.update(
+                        total_records=source.estimate_total(counter.rows),
+                        processed_records=counter.rows,
+                        rejected_records=rejects.total
+                    )
+            rejected = rejects.commit()
+
+        storage = get_staging_storage()
+        name = changes_file_name(job.id)
+        if storage.exists(name):
+            storage.delete(name)
+        changes.seek(0)
+        name = storage.save(name, File(changes))
+    finally:
+        changes.close()
+
+    result = {
+        'total': counter.rows + sum(rejected.values()),
+        **counter.counts,
+        'rejected': sum(rejected.values()),
+        'rejects': dict(rejected),
+        'diffs': counter.diffs,
+        'catalog_version': version,
+        'changes_file': name,
+        'previewed_at': timezone.now().isoformat(),
+    }
+    cache.set(PREVIEW_CACHE_KEY.format(job.id), result, timeout=settings.IMPORT_PREVIEW_TTL)
+    return result
+
+
+def take_changes_file(job_id):
+    """
+    Claim the changes file of a job's cached preview for import.
+
+    The cache entry is dropped, since the import makes it stale; only the
+    caller whose delete removed it gets the file.
+
+    Returns:
+        Name of the changes file in staging storage, or None if the preview
+        expired or was claimed, its file is gone or the products changed since
+    """
+    key = PREVIEW_CACHE_KEY.format(job_id)
+    cached = cache.get(key)
+    if cached is None or not cache.delete(key):
+        return None
+    name = cached['changes_file']
+    if cached['catalog_version'] != catalog_version() or not get_staging_storage().exists(name):
+        return None
+    return name
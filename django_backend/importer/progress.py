@@ -0,0 +1,155 @@
+"""Import progress channel.
+
+Workers publish an import's counters to the shared cache after every chunk,
+and the progress endpoints read them from there instead of the ``ImportJob``
+row. The row itself is only written at checkpoints and when the import
+finishes, so the database is never read on a poll while the cache
+holds the job's progress.
+"""
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from .models import ImportJob
+
+PROGRESS_CACHE_KEY = 'importer:progress:{}'
+PARTITION_CACHE_KEY = 'importer:progress:{}:{}'
+COUNTER_FIELDS = ['processed_records', 'created_records', 'updated_records', 'unchanged_records']
+PROGRESS_FIELDS = ['status', 'total_records', *COUNTER_FIELDS, 'rejected_records', 'error_message']
+TERMINAL_STATUSES = {'completed', 'failed', 'previewed'}
+
+
+def job_progress(job):
+    """Progress state of an ImportJob instance."""
+    return {field: getattr(job, field) for field in PROGRESS_FIELDS}
+
+
+def publish_progress(job_id, state):
+    """Store the progress state of an import."""
+    cache.set(PROGRESS_CACHE_KEY.format(job_id), state, timeout=settings.IMPORT_PROGRESS_TTL)
+
+
+def publish_job_progress(job_id):
+    """Publish the progress state currently saved on an ImportJob."""
+    job = ImportJob.objects.filter(id=job_id).first()
+    if job is not None:
+        publish_progress(job_id, job_progress(job))
+
+
+def get_progress(job_id):
+    """
+    Return the latest progress state of an import.
+
+    Falls back to the ImportJob row when nothing has been published, and
+    caches it for ``IMPORT_PROGRESS_FALLBACK_TTL`` seconds only: a worker
+    whose updates don't reach this cache still moves the row forward at
+    its checkpoints. The counters of a parallel import are summed over its
+    partitions.
+
+    Returns:
+        dict of PROGRESS_FIELDS, or None if the job does not exist
+    """
+    key = PROGRESS_CACHE_KEY.format(job_id)
+    state = cache.get(key)
+    if state is None:
+        try:
+            job = ImportJob.objects.get(id=job_id)
+        except (ImportJob.DoesNotExist, ValidationError):
+            return None
+        state = job_progress(job)
+        cache.add(key, state, timeout=settings.IMPORT_PROGRESS_FALLBACK_TTL)
+        return state
+
+    partitions = state.pop('partitions', None)
+    if partitions and state['status'] not in TERMINAL_STATUSES:
+        parts = cache.get_many([PARTITION_CACHE_KEY.format(job_id, p) for p in range(partitions)])
+        for field in COUNTER_FIELDS:
+            state[field] = sum(part[field] for part in parts.values())
+    return state
+
+
+def progress_payload(job_id, state):
+    """API representation of a progress state."""
+    return {
+        'id': str(job_id),
+        **state,
+        'total': state['total_records'],
+        'processed': state['processed_records'],
+    }
+
+
+class ProgressReporter:
+    """
+    Report progress of a serial import.
+
+    Every ``update`` is published to the cache only; the serial import
+    persists its counters with each chunk's checkpoint, and ``finish``
+    saves the final state.
+    """
+
+    def __init__(self, job):
+        self.job = job
+
+    def update(self, **fields):
+        """Set progress fields and publish them."""
+        for field, value in fields.items():
+            setattr(self.job, field, value)
+        publish_progress(self.job.id, job_progress(self.job))
+
+    def finish(self, status, error_message=None, **fields):
+        """Save and publish the final state of the import."""
+        self.job.status = status
+        self.job.error_message = error_message
+        for field, value in fields.items():
+            setattr(self.job, field, value)
+        self.job.save()
+        publish_progress(self.job.id, job_progress(self.job))
+
+
+class PartitionProgressReporter:
+    """
+    Report progress of one partition of a parallel import.
+
+    Each partition publishes its own counters, which ``get_progress`` sums,
+    and adds them to the ImportJob row at checkpoints with ``F()`` updates.
+    """
+
+    def __init__(self, job_id, partition):
+        self.job_id = job_id
+        self.key = PARTITION_CACHE_KEY.format(job_id, partition)
+        self.counts = dict.fromkeys(COUNTER_FIELDS, 0)
+        self.flushed = dict.fromkeys(COUNTER_FIELDS, 0)
+        self.last_checkpoint = time.monotonic()
+
+    def update(self, processed, created, updated, unchanged=0):
+        """Add a written chunk to the partition's counters."""
+        self.counts['processed_records'] += processed
+        self.counts['created_records'] += created
+        self.counts['updated_records'] += updated
+        self.counts['unchanged_records'] += unchanged
+        cache.set(self.key, self.counts, timeout=settings.IMPORT_PROGRESS_TTL)
+
+        if time.monotonic() - self.last_checkpoint >= settings.IMPORT_PROGRESS_CHECKPOINT_INTERVAL:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Add counters not yet persisted to the ImportJob row."""
+        ImportJob.objects.filter(id=self.job_id).update(**{
+            field: F(field) + self.counts[field] - self.flushed[field]
+            for field in COUNTER_FIELDS
+        })
+        self.flushed = dict(self.counts)
+        self.last_checkpoint = time.monotonic()
+
+
+def start_parallel_progress(job_id, total_records, partitions, rejected_records=0):
+    """Publish the shared state of a parallel import whose partitions report separately."""
+    publish_progress(job_id, {
+        'status': 'processing',
+        'total_records': total_records,
+        **dict.fromkeys(COUNTER_FIELDS, 0),
+        'rejected_records': rejected_records,
+        'error_message': None,
+        'partitions': partitions,
+    })
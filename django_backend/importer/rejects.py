@@ -0,0 +1,242 @@
+"""Rejected import rows.
+
+Rows an import skips are reported to a ``RejectLog``, which counts them by
+reason and logs only a sample: the first ``IMPORT_REJECTS_LOG_FIRST``
+rejects, then every ``IMPORT_REJECTS_LOG_EVERY``-th, so a file with many bad
+rows neither floods the logs nor is slowed down by them.
+
+``RejectsFile`` also keeps each rejected row (row number, reason and the
+values as read) and saves them as CSV parts in staging storage next to the
+upload, ``<job_id>/rejects/<first row>.csv``. Rows wait in a temporary
+file, so memory stays flat however many are rejected. A serial import saves
+the part covering a chunk just before committing the chunk, and a resumed
+import first drops the parts past its checkpoint, so every rejected row
+ends up in exactly one part. ``iter_rejects_csv`` streams a job's parts as
+one CSV.
+"""
+import csv
+import io
+import logging
+import tempfile
+from collections import Counter
+from django.conf import settings
+from django.core.files import File
+from .storage import get_staging_storage
+
+logger = logging.getLogger(__name__)
+
+REJECT_REASONS = {
+    'missing_sku': 'Missing SKU',
+    'missing_name': 'Missing name',
+    'invalid_price': 'Invalid price',
+    'invalid_quantity': 'Invalid quantity',
+    'malformed_row': 'Wrong number of fields',
+    'invalid_row': 'Invalid row',
+}
+REJECT_FIELDS = ['row', 'reason', 'message', 'sku', 'name', 'description', 'price', 'quantity']
+VALUE_FIELDS = REJECT_FIELDS[3:]
+
+
+class RowRejected(ValueError):
+    """A row the import skips; ``reason`` is a key of ``REJECT_REASONS``."""
+
+    def __init__(self, reason, message=None):
+        super().__init__(message or REJECT_REASONS[reason])
+        self.reason = reason
+
+
+class RejectLog:
+    """Count rejected rows by reason and log a sample of them."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.total = 0
+
+    def add(self, row_num, reason, message, values=None):
+        """
+        Record a rejected row.
+
+        Args:
+            row_num: Record number in the file, or None if unknown
+            reason: Key of ``REJECT_REASONS``
+            message: Human-readable explanation
+            values: Raw field values as read, if available
+        """
+        self.total += 1
+        self.counts[reason] += 1
+        first, every = settings.IMPORT_REJECTS_LOG_FIRST, settings.IMPORT_REJECTS_LOG_EVERY
+        if self.total <= first:
+            logger.warning(f"Row {row_num}: {message}, skipping")
+        elif every and self.total % every == 0:
+            logger.warning(f"Row {row_num}: {message}, skipping ({self.total} rows rejected so far, "
+                           f"logging 1 in {every})")
+
+
+def rejects_dir(job_id):
+    return f'{job_id}/rejects'
+
+
+def range_part_name(job_id, index):
+    """Staging name of the rejects of one range of a parallel import."""
+    return f'{rejects_dir(job_id)}/range-{index:05d}.csv'
+
+
+def list_reject_parts(job_id):
+    """Names of a job's reject parts, in file order."""
+    directory = rejects_dir(job_id)
+    # Object storages have no directories to check for, only keys to list
+    try:
+        names = get_staging_storage().listdir(directory)[1]
+    except FileNotFoundError:
+        return []
+    return [f'{directory}/{name}' for name in sorted(names)]
+
+
+def delete_rejects(job_id, after_row=0):
+    """Remove a job's reject parts starting after ``after_row``."""
+    storage = get_staging_storage()
+    for name in list_reject_parts(job_id):
+        key = name.rsplit('/', 1)[1].split('.')[0]
+        if not key.isdigit() or int(key) > after_row:
+            storage.delete(name)
+
+
+def _save_part(name, file):
+    storage = get_staging_storage()
+    if storage.exists(name):
+        storage.delete(name)
+    file.seek(0)
+    storage.save(name, File(file))
+
+
+class RejectsFile(RejectLog):
+    """
+    Keep rejected rows for the job's rejects CSV as well as counting them.
+
+    Call ``commit(row)`` before committing a chunk that ends at record
+    ``row`` and ``commit()`` at the end of the file. A resumed import
+    passes its checkpoint as ``rows_read``. ``part`` names a single part
+    instead, for the ranges of a parallel import. With ``keep_saved`` the
+    parts saved earlier are all kept, e.g. those of a confirmed preview.
+    """
+
+    def __init__(self, job_id, rows_read=0, part=None, keep_saved=False):
+        super().__init__()
+        self.job_id = job_id
+        self.first_row = rows_read + 1
+        self.part = part
+        self.pending = self._temporary()
+        self.last_row = 0
+        if part is None and not keep_saved:
+            delete_rejects(job_id, after_row=rows_read)
+
+    @staticmethod
+    def _temporary():
+        file = tempfile.TemporaryFile(mode='w+', newline='', encoding='utf-8')
+        return file, csv.writer(file)
+
+    def add(self, row_num, reason, message, values=None):
+        super().add(row_num, reason, message, values)
+        values = values or {}
+        self.pending[1].writerow(
+            ['' if row_num is None else row_num, reason, message]
+            + [values.get(field) for field in VALUE_FIELDS]
+        )
+        self.last_row = max(self.last_row, row_num or 0)
+
+    def commit(self, up_to_row=None):
+        """
+        Save the rejected rows up to ``up_to_row`` (all of them by default)
+        as a part in staging storage.
+
+        Rows without a number belong to the next part saved.
+
+        Returns:
+            Counter of the saved rows by reason
+        """
+        name = self.part or f'{rejects_dir(self.job_id)}/{self.first_row:012d}.csv'
+        if up_to_row is not None:
+            self.first_row = up_to_row + 1
+
+        file, _ = self.pending
+        if file.tell() == 0:
+            return Counter()
+        if up_to_row is None or self.last_row <= up_to_row:
+            part, self.pending, self.last_row = self.pending, self._temporary(), 0
+            counts = self._count(file)
+        else:
+            part, self.pending, self.last_row = self._temporary(), self._temporary(), 0
+            counts = Counter()
+            file.seek(0)
+            for record in csv.reader(file):
+                if record[0] and int(record[0]) > up_to_row:
+                    self.pending[1].writerow(record)
+                    self.last_row = max(self.last_row, int(record[0]))
+                else:
+                    part[1].writerow(record)
+                    counts[record[1]] += 1
+            file.close()
+
+        try:
+            if counts:
+                _save_part(name, part[0])
+        finally:
+            part[0].close()
+        return counts
+
+    @staticmethod
+    def _count(file):
+        file.seek(0)
+        return Counter(record[1] for record in csv.reader(file))
+
+    def close(self):
+        self.pending[0].close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def number_range_rejects(job_id, ranges):
+    """
+    Number the rejects of a parallel import's ranges across the whole file.
+
+    Range workers number records from 1 within their range; once all have
+    finished, each range part is rewritten as a regular part, offset by the
+    records of the ranges before it.
+
+    Args:
+        ranges: (records, part_name) per range, in file order; part_name is
+            None for ranges without rejects
+    """
+    storage = get_staging_storage()
+    offset = 0
+    for records, name in ranges:
+        # A part already numbered by an earlier delivery is gone
+        if name and storage.exists(name):
+            with storage.open(name, 'rb') as stream:
+                numbered = tempfile.TemporaryFile(mode='w+', newline='', encoding='utf-8')
+                writer = csv.writer(numbered)
+                for record in csv.reader(io.TextIOWrapper(stream, encoding='utf-8', newline='')):
+                    if record[0]:
+                        record[0] = int(record[0]) + offset
+                    writer.writerow(record)
+            try:
+                _save_part(f'{rejects_dir(job_id)}/{offset + 1:012d}.csv', numbered)
+            finally:
+                numbered.close()
+            storage.delete(name)
+        offset += records
+
+
+def iter_rejects_csv(job_id, block_size=64 * 1024):
+    """Yield a job's rejects as CSV bytes, header first."""
+    header = io.StringIO()
+    csv.writer(header).writerow(REJECT_FIELDS)
+    yield header.getvalue().encode('utf-8')
+    storage = get_staging_storage()
+    for name in list_reject_parts(job_id):
+        with storage.open(name, 'rb') as stream:
+            yield from iter(lambda: stream.read(block_size), b'')
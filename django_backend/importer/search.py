@@ -0,0 +1,184 @@
+"""Indexed substring search over products.
+
+``icontains`` filters compile to ``LIKE '%term%'``, which no B-tree index
+can serve. Searches go through an index instead:
+
+- PostgreSQL: trigram GIN indexes on ``UPPER(sku)``, ``UPPER(name)`` and
+  ``UPPER(description)`` (migration 0007), which serve ``icontains``
+  directly and rank results by trigram similarity.
+- SQLite: an FTS5 table with the trigram tokenizer over the same columns,
+  kept in sync by triggers so ORM saves, bulk imports and deletes all
+  update it. Results are ranked by bm25. The FTS table holds its own copy
+  of the columns, keyed by ``importer_product_fts_key``, an INTEGER
+  PRIMARY KEY per product id: the product table's implicit rowids are
+  renumbered by VACUUM, so they can't link the two.
+
+Terms shorter than three characters cannot use a trigram index and fall
+back to ``icontains``, as does any database without these indexes.
+"""
+import logging
+from django.db import connection
+from django.db.models import Q
+from django.db.utils import OperationalError
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'importer_product_fts'
+FTS_KEY_TABLE = 'importer_product_fts_key'
+SEARCH_FIELDS = ['sku', 'name', 'description']
+MIN_TRIGRAM_LENGTH = 3
+FILTER_PARAMS = ['sku', 'name', 'active', 'q']
+
+_FTS_KEY = f"(SELECT key FROM {FTS_KEY_TABLE} WHERE product_id = {{}}.id)"
+SQLITE_TRIGGERS = {f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'}
+SQLITE_FTS_SQL = [
+    *[f"DROP TRIGGER IF EXISTS {trigger}" for trigger in sorted(SQLITE_TRIGGERS)],
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+    f"DROP TABLE IF EXISTS {FTS_KEY_TABLE}",
+    f"""CREATE TABLE {FTS_KEY_TABLE} (
+        key INTEGER PRIMARY KEY, product_id char(32) NOT NULL UNIQUE
+    )""",
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        sku, name, description, tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON importer_product BEGIN
+        INSERT INTO {FTS_KEY_TABLE}(product_id) VALUES (new.id);
+        INSERT INTO {FTS_TABLE}(rowid, sku, name, description)
+        VALUES ({_FTS_KEY.format('new')}, new.sku, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON importer_product BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = {_FTS_KEY.format('old')};
+        DELETE FROM {FTS_KEY_TABLE} WHERE product_id = old.id;
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF sku, name, description
+        ON importer_product BEGIN
+        UPDATE {FTS_TABLE} SET sku = new.sku, name = new.name, description = new.description
+        WHERE rowid = {_FTS_KEY.format('new')};
+    END""",
+    f"INSERT INTO {FTS_KEY_TABLE}(product_id) SELECT id FROM importer_product",
+    f"""INSERT INTO {FTS_TABLE}(rowid, sku, name, description)
+        SELECT k.key, p.sku, p.name, p.description
+        FROM importer_product p JOIN {FTS_KEY_TABLE} k ON k.product_id = p.id""",
+]
+
+
+def sqlite_search_installed(conn=connection):
+    """True if the FTS and key tables and all of the sync triggers exist."""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s, %s) "
+            "OR (type = 'trigger' AND tbl_name = 'importer_product')",
+            [FTS_TABLE, FTS_KEY_TABLE]
+        )
+        names = {row[0] for row in cursor.fetchall()}
+    return {FTS_TABLE, FTS_KEY_TABLE} <= names and SQLITE_TRIGGERS <= names
+
+
+def install_sqlite_search(conn=connection):
+    """
+    Create (or repair) the SQLite FTS table and its triggers.
+
+    Rebuilding the product table in a SQLite migration drops its triggers,
+    so this runs after every migrate and rebuilds the index when anything
+    is missing.
+    """
+    if conn.vendor != 'sqlite' or sqlite_search_installed(conn):
+        return False
+    try:
+        with conn.cursor() as cursor:
+            for sql in SQLITE_FTS_SQL:
+                cursor.execute(sql)
+    except OperationalError as e:
+        # SQLite built without FTS5 or older than 3.34 (no trigram tokenizer)
+        logger.warning(f"Product search index unavailable: {str(e)}")
+        return False
+    return True
+
+
+def _use_index(term):
+    if len(term) < MIN_TRIGRAM_LENGTH:
+        return False
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and sqlite_search_installed()
+
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _fts_where(match):
+    return (
+        f'"importer_product"."id" IN (SELECT product_id FROM {FTS_KEY_TABLE} WHERE key IN '
+        f'(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s))',
+        [match]
+    )
+
+
+def search_field(queryset, field, term):
+    """Filter products whose ``field`` contains ``term`` (case-insensitive)."""
+    if connection.vendor == 'sqlite' and _use_index(term):
+        where, params = _fts_where(f'{field} : {_fts_phrase(term)}')
+        return queryset.extra(where=[where], params=params)
+    # On PostgreSQL this is served by the trigram index on UPPER(field)
+    return queryset.filter(**{f'{field}__icontains': term})
+
+
+def search_products(queryset, term):
+    """
+    Filter products matching ``term`` in any search field, best match first.
+    """
+    if not _use_index(term):
+        query = Q()
+        for field in SEARCH_FIELDS:
+            query |= Q(**{f'{field}__icontains': term})
+        return queryset.filter(query).order_by('-created_at')
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+        from django.db.models.functions import Greatest
+
+        query = Q()
+        for field in SEARCH_FIELDS:
+            query |= Q(**{f'{field}__icontains': term})
+        return queryset.filter(query).annotate(
+            rank=Greatest(TrigramSimilarity('sku', term), TrigramSimilarity('name', term))
+        ).order_by('-rank', '-created_at')
+
+    # Join the FTS table so the MATCH runs once and drives the lookup
+    return queryset.extra(
+        tables=[FTS_TABLE, FTS_KEY_TABLE],
+        select={'rank': f'"{FTS_TABLE}"."rank"'},
+        where=[
+            f'"{FTS_KEY_TABLE}"."key" = "{FTS_TABLE}"."rowid"',
+            f'"{FTS_KEY_TABLE}"."product_id" = "importer_product"."id"',
+            f'"{FTS_TABLE}" MATCH %s',
+        ],
+        params=[_fts_phrase(term)],
+    ).order_by('rank', '-created_at')
+
+
+def filter_products(queryset, params):
+    """
+    Apply the product list filters shared by the API and web views.
+
+    ``sku`` and ``name`` are substring filters, ``active`` is ``true`` or
+    ``false`` and ``q`` searches every field and orders by relevance.
+    Without ``q`` the result is ordered newest first.
+    """
+    sku = params.get('sku')
+    if sku:
+        queryset = search_field(queryset, 'sku', sku.upper())
+
+    name = params.get('name')
+    if name:
+        queryset = search_field(queryset, 'name', name)
+
+    active = params.get('active')
+    if active:
+        queryset = queryset.filter(active=active.lower() == 'true')
+
+    q = (params.get('q') or '').strip()
+    if q:
+        return search_products(queryset, q)
+    return queryset.order_by('-created_at')
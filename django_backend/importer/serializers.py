@@ -1,6 +1,6 @@
 """Django REST Framework serializers."""
 from rest_framework import serializers
-from .models import Product, ImportJob, Webhook, WebhookLog
+from .models import Product, ImportJob, DeleteJob, Webhook, WebhookLog
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -11,6 +11,15 @@ class ProductSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class BulkProductSerializer(ProductSerializer):
+    """Product item of a bulk write; SKU conflicts are resolved by the bulk write itself."""
+    class Meta(ProductSerializer.Meta):
+        extra_kwargs = {'sku': {'validators': []}}
+
+    def validate_sku(self, value):
+        return value.strip().upper()
+
+
 class ImportJobSerializer(serializers.ModelSerializer):
     """Import job serializer."""
     # Alias fields for frontend compatibility
@@ -19,12 +28,22 @@ class ImportJobSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = ImportJob
-        fields = ['id', 'filename', 'status', 'total_records', 'processed_records', 
-                  'created_records', 'updated_records', 'error_message', 'created_at', 'updated_at',
-                  'total', 'processed']
+        fields = ['id', 'filename', 'status', 'backend', 'total_records', 'processed_records', 
+                  'created_records', 'updated_records', 'unchanged_records', 'rejected_records', 'rejects', 'checkpoint_rows',
+                  'metrics', 'preview', 'error_message',
+                  'created_at', 'updated_at', 'total', 'processed']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class DeleteJobSerializer(serializers.ModelSerializer):
+    """Delete job serializer."""
+    class Meta:
+        model = DeleteJob
+        fields = ['id', 'filters', 'status', 'total_records', 'deleted_records', 'truncated',
+                  'error_message', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
 class WebhookLogSerializer(serializers.ModelSerializer):
     """Webhook log serializer."""
     class Meta:
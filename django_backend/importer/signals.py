@@ -0,0 +1,29 @@
+"""Signal handlers for importer app."""
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from .models import Product, Webhook
+from .search import install_sqlite_search
+from .sku_index import invalidate_sku_index
+from .stats import invalidate_webhook_stats
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, **kwargs):
+    """Drop the cached SKU index when a product is created outside an import."""
+    if created:
+        invalidate_sku_index()
+
+
+@receiver(post_save, sender=Webhook)
+@receiver(post_delete, sender=Webhook)
+def webhook_changed(sender, **kwargs):
+    """Recount webhooks for the dashboard on the next read."""
+    invalidate_webhook_stats()
+
+
+@receiver(post_migrate)
+def install_search_index(sender, app_config, using, **kwargs):
+    """Create or repair the SQLite product search index after migrations."""
+    if app_config.name == 'importer':
+        install_sqlite_search(connections[using])
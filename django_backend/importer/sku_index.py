@@ -0,0 +1,122 @@
+"""Compact SKU membership index for imports.
+
+A Bloom filter over every product SKU lets the import skip the database
+lookup for SKUs that are certainly new. Positives may be false, so they are
+still resolved against the database. The filter is cached across imports and
+dropped whenever a product is created outside an import.
+
+Each cached filter belongs to a generation, a random token that
+``invalidate_sku_index`` replaces. An import saves its filter under the
+generation it loaded, so a save racing an invalidation lands under a key
+nobody reads instead of overwriting it.
+"""
+import hashlib
+import math
+import logging
+import uuid
+from django.core.cache import cache
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+SKU_INDEX_CACHE_KEY = 'importer:sku-index:{}'
+SKU_INDEX_GENERATION_KEY = 'importer:sku-index:generation'
+# Filters of replaced generations are never read again and expire
+SKU_INDEX_TTL = 24 * 60 * 60
+SKU_INDEX_ERROR_RATE = 0.01
+SKU_INDEX_MIN_CAPACITY = 10000
+
+
+class SKUBloomFilter:
+    """
+    Bloom filter of SKUs backed by a bytearray.
+
+    Uses ``-n ln(p) / ln(2)^2`` bits for ``n`` SKUs at false positive rate
+    ``p`` (about 1.2 MB per million SKUs at 1%), compared with tens of
+    megabytes for a Python set of the same strings.
+    """
+
+    def __init__(self, capacity, error_rate=SKU_INDEX_ERROR_RATE):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.size = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.generation = None
+
+    def _positions(self, sku):
+        digest = hashlib.blake2b(sku.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, sku):
+        """Add a SKU to the filter."""
+        for position in self._positions(sku):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, sku):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(sku)
+        )
+
+    @property
+    def saturated(self):
+        """True once more SKUs were added than the filter was sized for."""
+        return self.count > self.capacity
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+
+def build_sku_index():
+    """Build a filter from every SKU in the product table."""
+    total = Product.objects.count()
+    index = SKUBloomFilter(max(total * 2, SKU_INDEX_MIN_CAPACITY))
+    for sku in Product.objects.values_list('sku', flat=True).iterator(chunk_size=10000):
+        index.add(sku)
+    logger.info(f"Built SKU index: {index.count} SKUs, {index.nbytes} bytes")
+    return index
+
+
+def sku_index_generation():
+    """Return the current SKU index generation, starting one if needed."""
+    generation = cache.get(SKU_INDEX_GENERATION_KEY)
+    if generation is None:
+        cache.add(SKU_INDEX_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(SKU_INDEX_GENERATION_KEY)
+    return generation
+
+
+def load_sku_index():
+    """Return the cached SKU index, rebuilding it when missing or saturated."""
+    generation = sku_index_generation()
+    index = cache.get(SKU_INDEX_CACHE_KEY.format(generation))
+    if index is None or index.saturated:
+        index = build_sku_index()
+        # Products created during the build invalidate this generation
+        index.generation = generation
+        save_sku_index(index)
+    return index
+
+
+def save_sku_index(index):
+    """
+    Store the SKU index for later imports.
+
+    An index is saved under its generation, so it is dropped if the index
+    was invalidated since it was loaded. One not loaded through
+    ``load_sku_index`` takes the current generation.
+    """
+    if index.generation is None:
+        index.generation = sku_index_generation()
+    cache.set(SKU_INDEX_CACHE_KEY.format(index.generation), index, timeout=SKU_INDEX_TTL)
+
+
+def invalidate_sku_index():
+    """Start a new generation, so the next import rebuilds the index."""
+    cache.set(SKU_INDEX_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
@@ -0,0 +1,101 @@
+"""Cached dashboard statistics.
+
+Product and webhook counts are computed with one aggregate query per table
+and kept in the shared cache, so rendering the dashboard costs no table
+scan. The ``refresh_product_stats`` beat task recomputes them
+periodically, and writes that create or delete products apply their deltas
+to the cached counters when they commit, so large imports and deletions
+show up right away. Changes the deltas do not track (e.g. toggling
+``active``) are picked up by the next refresh.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import Product, Webhook
+
+STATS_CACHE_KEY = 'importer:stats:{}'
+STATS_FIELDS = ['total_products', 'active_products', 'total_webhooks']
+
+
+def compute_stats():
+    """Count products and webhooks from the database."""
+    stats = Product.objects.aggregate(
+        total_products=Count('id'),
+        active_products=Count('id', filter=Q(active=True)),
+    )
+    stats['total_webhooks'] = Webhook.objects.count()
+    return stats
+
+
+def refresh_stats():
+    """Recompute the statistics and store them in the cache."""
+    stats = compute_stats()
+    cache.set_many(
+        {STATS_CACHE_KEY.format(name): value for name, value in stats.items()},
+        timeout=settings.PRODUCT_STATS_TTL
+    )
+    cache.set(STATS_CACHE_KEY.format('refreshed_at'), timezone.now(), timeout=settings.PRODUCT_STATS_TTL)
+    return stats
+
+
+def get_stats():
+    """
+    Return the dashboard statistics, computing them on a cache miss.
+
+    Returns:
+        dict of STATS_FIELDS plus inactive_products and refreshed_at
+    """
+    keys = {STATS_CACHE_KEY.format(name): name for name in [*STATS_FIELDS, 'refreshed_at']}
+    cached = cache.get_many(keys)
+    if len(cached) == len(keys):
+        stats = {keys[key]: value for key, value in cached.items()}
+    else:
+        stats = refresh_stats()
+        stats['refreshed_at'] = timezone.now()
+    stats['inactive_products'] = max(stats['total_products'] - stats['active_products'], 0)
+    return stats
+
+
+def _apply_deltas(deltas):
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            cache.incr(STATS_CACHE_KEY.format(name), delta)
+        except ValueError:
+            # Not cached; the next read recomputes every counter
+            cache.delete(STATS_CACHE_KEY.format('refreshed_at'))
+            return
+
+
+def record_product_changes(created=0, created_active=None, deleted=0, deleted_active=None):
+    """
+    Adjust the cached product counters once the current transaction commits.
+
+    ``created_active``/``deleted_active`` default to all products being
+    active.
+    """
+    if created_active is None:
+        created_active = created
+    if deleted_active is None:
+        deleted_active = deleted
+    deltas = {
+        'total_products': created - deleted,
+        'active_products': created_active - deleted_active,
+    }
+    transaction.on_commit(lambda: _apply_deltas(deltas))
+
+
+def record_upsert(result):
+    """Count the products created by an upsert result."""
+    record_product_changes(
+        created=result.created_count,
+        created_active=sum(1 for product in result.created if product.active)
+    )
+
+
+def invalidate_webhook_stats():
+    """Drop the cached webhook count so the next read recomputes it."""
+    cache.delete(STATS_CACHE_KEY.format('total_webhooks'))
@@ -0,0 +1,65 @@
+"""Upload staging for imports.
+
+Uploads are spooled to the ``imports`` storage backend (see ``STORAGES`` in
+settings) so Celery messages only carry a short file reference instead of the
+file content. The workers must therefore see the same storage as the web
+process: a shared volume or object storage.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage, storages
+from django.utils.text import get_valid_filename
+
+
+def get_staging_storage():
+    """Return the storage backend used for staged uploads."""
+    return storages['imports']
+
+
+def check_staging_shared():
+    """
+    Fail if import workers can't read files staged here.
+
+    Raises:
+        ImproperlyConfigured: staging is on the local filesystem while
+            ``IMPORT_STAGING_SHARED`` says workers don't share it
+    """
+    if not settings.IMPORT_STAGING_SHARED and isinstance(get_staging_storage(), FileSystemStorage):
+        raise ImproperlyConfigured(
+            'Import staging is not shared with the workers: set IMPORT_STAGING_BUCKET '
+            'or mount IMPORT_STAGING_ROOT on a shared volume'
+        )
+
+
+def stage_upload(file, job_id):
+    """
+    Save an uploaded file to staging storage.
+
+    The upload is copied chunk by chunk (or moved, when Django already spooled
+    it to a temporary file), so it is never held in memory as a whole.
+
+    Args:
+        file: Uploaded file
+        job_id: Import job ID, used as the staging directory
+
+    Returns:
+        Name of the staged file within staging storage
+
+    Raises:
+        ImproperlyConfigured: see ``check_staging_shared``
+    """
+    check_staging_shared()
+    name = f'{job_id}/{get_valid_filename(file.name)}'
+    return get_staging_storage().save(name, file)
+
+
+def open_staged(name):
+    """Open a staged file for binary reading."""
+    return get_staging_storage().open(name, 'rb')
+
+
+def delete_staged(name):
+    """Remove a staged file if it still exists."""
+    storage = get_staging_storage()
+    if name and storage.exists(name):
+        storage.delete(name)
@@ -0,0 +1,32 @@
+"""Streaming responses under ASGI.
+
+Served over ASGI, Django 4.2 reads a sync ``StreamingHttpResponse``
+iterator with ``sync_to_async(list)``, so the whole body is built in memory
+before the first byte is sent. Streams of blocks made by sync code (ORM
+iterators, staged files) are wrapped in ``aiter_blocks`` instead.
+"""
+from asgiref.sync import sync_to_async
+
+_DONE = object()
+
+
+async def aiter_blocks(blocks):
+    """
+    Iterate a sync iterable from async code, one item at a time.
+
+    Each step runs through ``sync_to_async``, in the thread that serves sync
+    code, so a database cursor read by the iterator stays on its connection.
+    The iterator is closed if the client goes away.
+    """
+    iterator = iter(blocks)
+    step = sync_to_async(next)
+    try:
+        while True:
+            block = await step(iterator, _DONE)
+            if block is _DONE:
+                return
+            yield block
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
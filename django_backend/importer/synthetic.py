@@ -0,0 +1,94 @@
+"""Deterministic synthetic product catalogs for import benchmarks.
+
+The same arguments (including ``seed``) always produce the same file, so
+benchmark runs on different versions or databases import identical data.
+"""
+import csv
+import random
+from dataclasses import dataclass
+
+WORDS = [
+    'Widget', 'Gadget', 'Sprocket', 'Flange', 'Bracket', 'Hinge', 'Spindle', 'Gasket',
+    'steel', 'brass', 'compact', 'heavy-duty', 'wireless', 'modular', 'premium', 'spare',
+]
+MALFORMED_KINDS = ['missing_name', 'bad_price', 'bad_quantity']
+
+
+def synthetic_sku(prefix, index):
+    """SKU of the ``index``-th synthetic product."""
+    return f'{prefix}-{index:09d}'
+
+
+@dataclass
+class CatalogSummary:
+    """What a generated catalog contains."""
+    rows: int = 0
+    existing: int = 0
+    new: int = 0
+    malformed: int = 0
+
+    @property
+    def valid(self):
+        return self.rows - self.malformed
+
+
+def generate_catalog(stream, rows, existing_ratio=0.0, description_length=60,
+                     malformed_rate=0.0, seed=0, sku_prefix='SYN'):
+    """
+    Write a synthetic product CSV to a text stream.
+
+    Rows that reuse an existing SKU take ``synthetic_sku(sku_prefix, i)``
+    for i in ``range(summary.existing)``, so the caller can create those
+    products beforehand; new SKUs are numbered after them. Malformed rows
+    (missing name, unparsable price or quantity) are skipped by the import.
+
+    Args:
+        stream: Text stream to write to
+        rows: Number of data rows
+        existing_ratio: Fraction of rows whose SKU already exists
+        description_length: Approximate description length in characters
+        malformed_rate: Fraction of rows the import must reject
+        seed: Random seed
+
+    Returns:
+        CatalogSummary
+    """
+    rng = random.Random(seed)
+    summary = CatalogSummary(rows=rows)
+    flags = [rng.random() < existing_ratio for _ in range(rows)]
+    existing_count = sum(flags)
+    new_index = existing_count
+
+    writer = csv.writer(stream)
+    writer.writerow(['sku', 'name', 'description', 'price', 'quantity'])
+    for is_existing in flags:
+        if is_existing:
+            sku = synthetic_sku(sku_prefix, summary.existing)
+            summary.existing += 1
+        else:
+            sku = synthetic_sku(sku_prefix, new_index)
+            new_index += 1
+            summary.new += 1
+
+        words = []
+        while sum(len(word) + 1 for word in words) < description_length:
+            words.append(rng.choice(WORDS))
+        row = [
+            sku,
+            f'{rng.choice(WORDS[:8])} {rng.randrange(100000)}',
+            ' '.join(words)[:description_length],
+            f'{rng.uniform(0.5, 500):.2f}',
+            rng.randrange(1000),
+        ]
+
+        if malformed_rate and rng.random() < malformed_rate:
+            kind = rng.choice(MALFORMED_KINDS)
+            if kind == 'missing_name':
+                row[1] = ''
+            elif kind == 'bad_price':
+                row[3] = 'n/a'
+            else:
+                row[4] = 'many'
+            summary.malformed += 1
+        writer.writerow(row)
+    return summary
@@ -1,119 +1,149 @@
 """Celery tasks for async processing."""
-import csv
-import io
-import time
-import requests
 import logging
-from celery import shared_task
-from django.db.models import Q
-from .models import Product, ImportJob, Webhook, WebhookLog
+import time
+from collections import Counter
+from datetime import timedelta
+from celery import chord, shared_task
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import DeleteJob, ImportJob, Webhook, WebhookOutbox
+from .backends import get_import_backend
+from .batching import AdaptiveBatchSizer
+from .compression import open_import_stream
+from .deletion import run_delete_job
+from .formats import open_import_source, upload_format
+from .delivery import Delivery
+from .metrics import StageRecorder, merge_job_metrics, record_stages, stage, timed_batches
+from .outbox import claim_due_entries, deliver_webhooks, enqueue_product_events, process_entries
+from .pipeline import CSVImportStream
+from .parallel import (
+    read_header, split_ranges, open_staged_range, spill_rows, iter_spilled_batches, delete_spills
+)
+from .preview import is_changes_file, preview_import
+from .rejects import RejectsFile, delete_rejects, number_range_rejects, range_part_name
+from .progress import (
+    ProgressReporter, PartitionProgressReporter, publish_job_progress, start_parallel_progress
+)
+from .sku_index import invalidate_sku_index
+from .stats import record_upsert, refresh_stats
+from .storage import get_staging_storage, delete_staged
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True)
-def import_csv_task(self, file_content, filename, job_id):
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def import_csv_task(self, staged_file, filename, job_id):
     """
     Import CSV file asynchronously.
-    
+
+    The file is streamed through the import pipeline in batches, so memory
+    stays flat regardless of file size. Progress is estimated from the byte
+    offset reached in the file instead of a separate counting pass.
+    Compressed uploads are decompressed as they are read (see
+    ``compression.py``), and NDJSON, Parquet and Arrow files are read by
+    the vectorized readers in ``columnar.py`` (see ``formats.py``).
+    Uncompressed CSV files of at least ``IMPORT_PARALLEL_MIN_SIZE`` bytes
+    are handed to the parallel import tasks instead. A confirmed preview
+    imports only the rows it found to change (see ``preview.py``).
+
+    Rows that match their product's fingerprint are counted as unchanged
+    and not written (see ``fingerprint.py``).
+
+    Each chunk is committed together with a checkpoint (byte offset, rows
+    read and counters) on the job, and a rerun continues after the last
+    committed chunk: the task is retried from there when it hits the soft
+    time limit, and redelivered if its worker dies. Invalid rows are
+    counted by reason on the job and kept for download (see
+    ``rejects.py``).
+
     Args:
-        file_content: CSV file content as bytes
+        staged_file: Name of the uploaded file in staging storage; its
+            extension gives the file's format
         filename: Original filename
         job_id: Import job ID
     """
     try:
         job = ImportJob.objects.get(id=job_id)
-        job.status = 'processing'
-        job.save()
-
-        # Parse CSV
-        csv_file = io.StringIO(file_content.decode('utf-8'))
-        reader = csv.DictReader(csv_file)
+        if job.status == 'completed':
+            return {'status': 'completed'}
 
-        if not reader.fieldnames:
-            raise ValueError("CSV file is empty or invalid")
-
-        # Count total records
-        csv_file.seek(0)
-        total_records = sum(1 for _ in reader) - 1
-        job.total_records = total_records
+        job.status = 'processing'
+        job.error_message = None
         job.save()
-
-        # Reset reader
-        csv_file.seek(0)
-        reader = csv.DictReader(csv_file)
-
-        created_count = 0
-        updated_count = 0
-        processed_count = 0
-
-        # Process in chunks
-        chunk_size = 1000
-        products_to_create = []
-        rows_list = list(reader)
-        
-        # Get all existing SKUs at once (batch query) - convert to lowercase for comparison
-        existing_skus = set(
-            sku.lower() for sku in Product.objects.values_list('sku', flat=True)
+        progress = ProgressReporter(job)
+        progress.update()
+
+        # Large CSV files are fanned out across workers; compressed files
+        # cannot be split into byte ranges
+        min_size = settings.IMPORT_PARALLEL_MIN_SIZE
+        splittable = upload_format(staged_file) == ('csv', None)
+        if min_size and splittable and get_staging_storage().size(staged_file) >= min_size:
+            return dispatch_parallel_import(job, staged_file)
+
+        recorder = StageRecorder(job.metrics)
+        # A preview's changes only hold valid rows; the rows the preview
+        # rejected stay saved and counted
+        rejects = RejectsFile(
+            job_id, rows_read=job.checkpoint_rows, keep_saved=is_changes_file(staged_file)
         )
-
-        for row_num, row in enumerate(rows_list, 1):
-            try:
-                sku = row.get('sku', '').strip().upper()
-                name = row.get('name', '').strip()
-                description = row.get('description', '').strip()
-                price = float(row.get('price', 0)) if row.get('price') else None
-                quantity = int(row.get('quantity', 0)) if row.get('quantity') else 0
-
-                if not sku or not name:
-                    logger.warning(f"Row {row_num}: Missing SKU or name, skipping")
-                    continue
-
-                # Check if product exists (batch check - much faster)
-                if sku.lower() in existing_skus:
-                    # Update existing product
-                    existing = Product.objects.filter(sku__iexact=sku).first()
-                    if existing:
-                        existing.name = name
-                        existing.description = description
-                        existing.price = price
-                        existing.quantity = quantity
-                        existing.save()
-                        updated_count += 1
-                        
-                        # Trigger webhook
-                        trigger_webhook.delay('product_updated', {'product_id': str(existing.id), 'sku': existing.sku})
-                else:
-                    # Create new product
-                    product = Product(
-                        sku=sku,
-                        name=name,
-                        description=description,
-                        price=price,
-                        quantity=quantity,
-                        active=True
+        rejected = Counter(job.rejects)
+        with open_import_stream(staged_file) as stream, record_stages(recorder), rejects:
+            source = open_import_source(
+                stream, staged_file, offset=job.checkpoint_offset, rows_read=job.checkpoint_rows,
+                rejects=rejects
+            )
+            if job.checkpoint_rows:
+                logger.info(f"Resuming import {job_id} at row {job.checkpoint_rows + 1}")
+            with stage('sku_index_load'):
+                backend = get_import_backend(job.backend, use_sku_index=True)
+
+            created_count = job.created_records
+            updated_count = job.updated_records
+            unchanged_count = job.unchanged_records
+            processed_count = job.processed_records
+
+            # Process in chunks: each chunk is resolved and written set-based,
+            # sized from the measured cost of the previous ones
+            sizer = AdaptiveBatchSizer()
+            batch_start = source.offset
+
+            for batch in timed_batches(source.batches(sizer)):
+                processed_count += len(batch)
+                total_records = source.estimate_total(processed_count)
+                rejected.update(rejects.commit(batch[-1][0]))
+                checkpoint = {
+                    'checkpoint_offset': source.offset,
+                    'checkpoint_rows': batch[-1][0],
+                    'total_records': total_records,
+                    'processed_records': processed_count,
+                    'rejected_records': sum(rejected.values()),
+                    'rejects': dict(rejected),
+                    'metrics': recorder.as_dict(),
+                }
+                started = time.perf_counter()
+                result = write_import_batch(
+                    backend, [row for _, row in batch], job_id=job_id, checkpoint=checkpoint
+                )
+                sizer.record(len(batch), time.perf_counter() - started, source.offset - batch_start)
+                batch_start = source.offset
+                created_count += result.created_count
+                updated_count += result.updated_count
+                unchanged_count += result.unchanged_count
+
+                # The checkpoint already holds the counters; readers get
+                # them from the progress cache
+                with stage('progress'):
+                    progress.update(
+                        total_records=total_records,
+                        processed_records=processed_count,
+                        created_records=created_count,
+                        updated_records=updated_count,
+                        unchanged_records=unchanged_count,
+                        rejected_records=sum(rejected.values())
                     )
-                    products_to_create.append(product)
-                    created_count += 1
-
-                processed_count += 1
-
-                # Batch create
-                if len(products_to_create) >= chunk_size:
-                    Product.objects.bulk_create(products_to_create)
-                    
-                    # Trigger webhooks for created products
-                    for product in products_to_create:
-                        trigger_webhook.delay('product_created', {'product_id': str(product.id), 'sku': product.sku})
-                    
-                    products_to_create = []
-
-                # Update progress every 100 records
-                if processed_count % 100 == 0:
-                    job.processed_records = processed_count
-                    job.created_records = created_count
-                    job.updated_records = updated_count
-                    job.save()
 
                     # Update Celery task progress
                     self.update_state(
@@ -125,42 +155,339 @@ def import_csv_task(self, file_content, filename, job_id):
                         }
                     )
 
-            except Exception as e:
-                logger.error(f"Error processing row {row_num}: {str(e)}")
-                continue
+            backend.finish()
+            rejected.update(rejects.commit())
 
-        # Final batch create
-        if products_to_create:
-            Product.objects.bulk_create(products_to_create)
-            
-            # Trigger webhooks
-            for product in products_to_create:
-                trigger_webhook.delay('product_created', {'product_id': str(product.id), 'sku': product.sku})
+        delete_staged(staged_file)
 
         # Update job status
-        job.status = 'completed'
-        job.processed_records = processed_count
-        job.created_records = created_count
-        job.updated_records = updated_count
-        job.save()
+        progress.finish(
+            'completed',
+            total_records=processed_count,
+            processed_records=processed_count,
+            created_records=created_count,
+            updated_records=updated_count,
+            unchanged_records=unchanged_count,
+            rejected_records=sum(rejected.values()),
+            rejects=dict(rejected),
+            metrics=recorder.as_dict()
+        )
 
-        logger.info(f"Import completed: {created_count} created, {updated_count} updated")
+        logger.info(f"Import completed: {created_count} created, {updated_count} updated, "
+                    f"{unchanged_count} unchanged, {sum(rejected.values())} rejected")
 
         return {
             'status': 'completed',
             'created': created_count,
             'updated': updated_count,
+            'unchanged': unchanged_count,
+            'rejected': sum(rejected.values()),
             'total': processed_count
         }
 
+    except SoftTimeLimitExceeded as e:
+        if self.request.retries < settings.IMPORT_MAX_RESUMES:
+            logger.warning(f"Import {job_id} hit the time limit, resuming from its checkpoint")
+            raise self.retry(exc=e, countdown=0, max_retries=settings.IMPORT_MAX_RESUMES)
+        fail_import_job(job_id, 'Import exceeded the time limit; resume it to continue')
+        raise
+
     except Exception as e:
-        logger.error(f"Import task failed: {str(e)}")
-        job.status = 'failed'
-        job.error_message = str(e)
+        fail_import_job(job_id, e)
+        raise
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def preview_import_task(self, staged_file, filename, job_id):
+    """
+    Dry-run an import: count what it would change without writing products.
+
+    The job ends as 'previewed' with the result in ``preview`` (see
+    ``preview.py``) and waits for confirmation, which starts
+    ``import_csv_task``.
+
+    Args:
+        staged_file: Name of the uploaded file in staging storage
+        filename: Original filename
+        job_id: Import job ID
+    """
+    try:
+        job = ImportJob.objects.get(id=job_id)
+        job.status = 'processing'
+        job.error_message = None
         job.save()
+        progress = ProgressReporter(job)
+        progress.update()
+
+        result = preview_import(job, staged_file, progress)
+        progress.finish(
+            'previewed',
+            total_records=result['total'],
+            processed_records=0,
+            rejected_records=result['rejected'],
+            rejects=result['rejects'],
+            preview=result
+        )
+
+        logger.info(f"Import preview of {filename}: {result['created']} to create, "
+                    f"{result['updated']} to update, {result['unchanged']} unchanged, "
+                    f"{result['rejected']} rejected")
+        return {
+            'status': 'previewed',
+            **{key: result[key] for key in ('created', 'updated', 'unchanged', 'rejected', 'total')}
+        }
+
+    except Exception as e:
+        fail_import_job(job_id, e)
+        raise
+
+
+def write_import_batch(backend, rows, job_id=None, checkpoint=None):
+    """
+    Write a chunk of rows and queue its webhook events in one transaction.
+
+    ``checkpoint`` fields (and the chunk's created/updated/unchanged counts) are saved
+    on the import job in the same transaction, so a chunk is either fully
+    recorded or replayed from the previous checkpoint.
+    """
+    with transaction.atomic():
+        with stage('write', rows=len(rows)):
+            result = backend.write_batch(rows)
+        with stage('webhook_enqueue', rows=result.created_count + result.updated_count):
+            enqueue_product_events(result)
+        record_upsert(result)
+        if checkpoint is not None:
+            with stage('checkpoint'):
+                ImportJob.objects.filter(id=job_id).update(
+                    **checkpoint,
+                    created_records=F('created_records') + result.created_count,
+                    updated_records=F('updated_records') + result.updated_count,
+                    unchanged_records=F('unchanged_records') + result.unchanged_count,
+                    updated_at=timezone.now()
+                )
+    return result
+
+
+def fail_import_job(job_id, error):
+    """Mark an import job as failed."""
+    logger.error(f"Import task failed: {str(error)}")
+    ImportJob.objects.filter(id=job_id).update(status='failed', error_message=str(error))
+    publish_job_progress(job_id)
+
+
+def dispatch_parallel_import(job, staged_file):
+    """
+    Fan a staged CSV out across Celery workers.
+
+    The file is split into record-aligned byte ranges, one
+    ``split_range_task`` per range; once they have all finished,
+    ``import_partitions_task`` starts one writer per SKU partition. Each
+    task is far below the time limit; a resumed parallel import is
+    dispatched again from the start, which is safe because upserts are
+    idempotent.
+    """
+    job_id = str(job.id)
+    counters = {
+        'processed_records': 0, 'created_records': 0, 'updated_records': 0, 'unchanged_records': 0,
+        'metrics': {}
+    }
+    # The rows a confirmed preview rejected are kept (see import_csv_task)
+    if not is_changes_file(staged_file):
+        counters.update(rejected_records=0, rejects={})
+        delete_rejects(job_id)
+    ImportJob.objects.filter(id=job_id).update(**counters)
+    # One streamed pass over the file; each range task then fetches only its range
+    size = get_staging_storage().size(staged_file)
+    with open_staged_range(staged_file, 0, size) as stream:
+        fieldnames, header_end = read_header(stream)
+        ranges = split_ranges(stream, header_end, settings.IMPORT_PARALLEL_CHUNK_SIZE, size=size)
+
+    # Warm the shared SKU index once instead of in every partition
+    get_import_backend(job.backend, use_sku_index=True)
+
+    partitions = settings.IMPORT_PARALLEL_PARTITIONS
+    header = [
+        split_range_task.s(staged_file, job_id, fieldnames, index, start, end, partitions)
+        for index, (start, end) in enumerate(ranges)
+    ]
+    chord(header)(import_partitions_task.s(job_id, staged_file, partitions))
+
+    logger.info(f"Parallel import dispatched: {len(ranges)} ranges, {partitions} partitions")
+    return {
+        'status': 'dispatched',
+        'ranges': len(ranges),
+        'partitions': partitions
+    }
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def split_range_task(staged_file, job_id, fieldnames, index, start, end, partitions):
+    """
+    Parse one byte range of a staged CSV into per-partition spill files.
+
+    Returns:
+        dict with the number of valid rows and the rejected rows by reason
+    """
+    try:
+        recorder = StageRecorder()
+        started = time.perf_counter()
+        rejects = RejectsFile(job_id, part=range_part_name(job_id, index))
+        with open_staged_range(staged_file, start, end) as stream, rejects:
+            source = CSVImportStream(stream, fieldnames=fieldnames, rejects=rejects)
+            count = spill_rows(job_id, index, (row for _, row in source.rows()), partitions)
+            rejected = rejects.commit()
+        recorder.add('split', time.perf_counter() - started, rows=count)
+        merge_job_metrics(job_id, recorder.as_dict())
+        return {'rows': count, 'rejects': dict(rejected)}
+    except Exception as e:
+        fail_import_job(job_id, e)
+        raise
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def import_partitions_task(range_counts, job_id, staged_file, partitions):
+    """
+    Start one writer per SKU partition once every range has been split.
+
+    Safe to redeliver: the job's rejects are recomputed rather than added
+    to, and range rejects already numbered are skipped.
+    """
+    try:
+        range_count = len(range_counts)
+        total_records = sum(counts['rows'] for counts in range_counts)
+        # Only a confirmed preview's rejects predate the split
+        kept = {}
+        if is_changes_file(staged_file):
+            kept = ImportJob.objects.values_list('rejects', flat=True).get(id=job_id)
+        rejected = sum((Counter(counts['rejects']) for counts in range_counts), Counter(kept))
+        number_range_rejects(job_id, [
+            (counts['rows'] + sum(counts['rejects'].values()),
+             range_part_name(job_id, index) if counts['rejects'] else None)
+            for index, counts in enumerate(range_counts)
+        ])
+        ImportJob.objects.filter(id=job_id).update(
+            total_records=total_records, rejected_records=sum(rejected.values()), rejects=dict(rejected)
+        )
+        start_parallel_progress(job_id, total_records, partitions, sum(rejected.values()))
+
+        header = [
+            import_partition_task.s(job_id, partition, range_count)
+            for partition in range(partitions)
+        ]
+        chord(header)(finish_parallel_import_task.s(job_id, staged_file, partitions, range_count))
+    except Exception as e:
+        fail_import_job(job_id, e)
+        raise
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def import_partition_task(job_id, partition, range_count):
+    """
+    Upsert every row of one SKU partition, in original file order.
+
+    Returns:
+        dict with processed, created, updated and unchanged counts
+    """
+    try:
+        job = ImportJob.objects.get(id=job_id)
+        recorder = StageRecorder()
+        with record_stages(recorder):
+            with stage('sku_index_load'):
+                backend = get_import_backend(job.backend, use_sku_index=True)
+            progress = PartitionProgressReporter(job_id, partition)
+            counts = {'processed': 0, 'created': 0, 'updated': 0, 'unchanged': 0}
+
+            sizer = AdaptiveBatchSizer()
+            batches = iter_spilled_batches(job_id, partition, range_count, sizer)
+            for batch in timed_batches(batches, 'spill_read'):
+                started = time.perf_counter()
+                result = write_import_batch(backend, batch)
+                sizer.record(len(batch), time.perf_counter() - started)
+
+                counts['processed'] += len(batch)
+                counts['created'] += result.created_count
+                counts['updated'] += result.updated_count
+                counts['unchanged'] += result.unchanged_count
+                with stage('progress'):
+                    progress.update(
+                        len(batch), result.created_count, result.updated_count, result.unchanged_count
+                    )
+
+        merge_job_metrics(job_id, recorder.as_dict())
+        return counts
+    except Exception as e:
+        fail_import_job(job_id, e)
+        raise
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def finish_parallel_import_task(partition_counts, job_id, staged_file, partitions, range_count):
+    """Merge partition results into the import job and clean up."""
+    try:
+        created_count = sum(counts['created'] for counts in partition_counts)
+        updated_count = sum(counts['updated'] for counts in partition_counts)
+        unchanged_count = sum(counts['unchanged'] for counts in partition_counts)
+        processed_count = sum(counts['processed'] for counts in partition_counts)
+
+        ImportJob.objects.filter(id=job_id).update(
+            status='completed',
+            total_records=processed_count,
+            processed_records=processed_count,
+            created_records=created_count,
+            updated_records=updated_count,
+            unchanged_records=unchanged_count,
+        )
+        publish_job_progress(job_id)
+
+        # Partitions only updated their own copy of the SKU index
+        if created_count:
+            invalidate_sku_index()
+
+        delete_spills(job_id, partitions, range_count)
+        delete_staged(staged_file)
+
+        logger.info(f"Import completed: {created_count} created, {updated_count} updated, "
+                    f"{unchanged_count} unchanged")
+
+        return {
+            'status': 'completed',
+            'created': created_count,
+            'updated': updated_count,
+            'unchanged': unchanged_count,
+            'total': processed_count
+        }
+    except Exception as e:
+        fail_import_job(job_id, e)
+        raise
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def delete_products_task(job_id):
+    """
+    Delete the products matched by a DeleteJob in batches.
+
+    Safe to run again after a crash: it continues with whatever still
+    matches the job's filters.
+    """
+    try:
+        job = DeleteJob.objects.get(id=job_id)
+        if job.status == 'completed':
+            return {'status': 'completed', 'deleted': job.deleted_records}
+        run_delete_job(job)
+        job.refresh_from_db()
+        return {'status': 'completed', 'deleted': job.deleted_records}
+    except Exception as e:
+        logger.error(f"Delete task failed: {str(e)}")
+        DeleteJob.objects.filter(id=job_id).update(status='failed', error_message=str(e))
         raise
 
 
+@shared_task
+def refresh_product_stats():
+    """Recompute the cached dashboard statistics."""
+    return refresh_stats()
+
+
 @shared_task
 def trigger_webhook(event_type, payload):
     """
@@ -173,43 +500,42 @@ def trigger_webhook(event_type, payload):
     try:
         webhooks = Webhook.objects.filter(active=True, event_type=event_type)
 
-        for webhook in webhooks:
-            try:
-                start_time = time.time()
-
-                response = requests.post(
-                    webhook.url,
-                    json={
-                        'event_type': event_type,
-                        'data': payload
-                    },
-                    timeout=10
-                )
+        body = {
+            'event_type': event_type,
+            'data': payload
+        }
+        deliver_webhooks([Delivery(webhook, event_type, body) for webhook in webhooks])
 
-                response_time_ms = (time.time() - start_time) * 1000
+    except Exception as e:
+        logger.error(f"Error triggering webhooks: {str(e)}")
+        raise
 
-                # Log webhook delivery
-                log = WebhookLog(
-                    webhook=webhook,
-                    event_type=event_type,
-                    status_code=response.status_code,
-                    response_time_ms=response_time_ms
-                )
 
-                if response.status_code >= 400:
-                    log.error_message = response.text[:500]
+@shared_task
+def dispatch_webhook_outbox():
+    """
+    Deliver due webhook outbox entries in batches.
+
+    Runs after product writes commit and periodically via Celery beat, on
+    the dedicated ``webhooks`` queue so slow receivers never hold up imports.
 
-                log.save()
+    Returns:
+        Number of entries processed
+    """
+    processed = 0
+    deadline = time.monotonic() + settings.WEBHOOK_OUTBOX_DISPATCH_TIME
+    while time.monotonic() < deadline:
+        entries = claim_due_entries(settings.WEBHOOK_OUTBOX_BATCH_SIZE)
+        if not entries:
+            break
+        process_entries(entries)
+        processed += len(entries)
+    return processed
 
-            except Exception as e:
-                logger.error(f"Webhook trigger failed for {webhook.url}: {str(e)}")
-                log = WebhookLog(
-                    webhook=webhook,
-                    event_type=event_type,
-                    error_message=str(e)[:500]
-                )
-                log.save()
 
-    except Exception as e:
-        logger.error(f"Error triggering webhooks: {str(e)}")
-        raise
+@shared_task
+def purge_webhook_outbox():
+    """Delete delivered outbox entries past the retention period."""
+    cutoff = timezone.now() - timedelta(days=settings.WEBHOOK_OUTBOX_RETENTION_DAYS)
+    deleted, _ = WebhookOutbox.objects.filter(status='delivered', delivered_at__lt=cutoff).delete()
+    return deleted
@@ -1,8 +1,114 @@
 """Tests for importer app."""
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from importlib import import_module
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from unittest import skipUnless
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
-from .models import Product, ImportJob, Webhook
+from .models import Product, ImportJob, DeleteJob, Webhook, WebhookLog, WebhookOutbox
+from .batching import AdaptiveBatchSizer, max_batch_rows
+from .columnar import ArrowCSVImportStream, NDJSONImportStream, normalize_batch, pa
+from .compression import decompress, zstandard
+from .formats import upload_format
+from .rejects import iter_rejects_csv, list_reject_parts
+from .pipeline import CSVImportStream
+from .synthetic import generate_catalog
+from .storage import stage_upload, get_staging_storage
+from .sku_index import SKUBloomFilter, load_sku_index, save_sku_index
+from .parallel import read_header, split_ranges, open_staged_range
+from .tasks import import_csv_task, delete_products_task, dispatch_webhook_outbox, preview_import_task
+from .tasks import import_partitions_task
+from .progress import PartitionProgressReporter, ProgressReporter, get_progress, start_parallel_progress
+from .preview import take_changes_file
+from .stats import get_stats
+from .tasks import refresh_product_stats
+from .outbox import CIRCUIT_CACHE_KEY, backoff_delay, enqueue_event, enqueue_event_batch
+from .webhooks import split_event_batches
+from .delivery import Delivery, deliver
+from config.celery import app as celery_app
+from .upsert import upsert_products
+from .backends import ORMImportBackend, PostgresCopyImportBackend, get_import_backend
+
+STAGING_ROOT = tempfile.mkdtemp()
+STAGING_STORAGES = {
+    **settings.STORAGES,
+    'imports': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': STAGING_ROOT},
+    },
+}
+# Tests that clear the cache get their own, so they can't wipe a real one
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+
+def streamed_body(response):
+    """Read a streaming response, whose content may be an async iterator."""
+    if not response.is_async:
+        return b''.join(response.streaming_content)
+
+    async def read():
+        return b''.join([block async for block in response.streaming_content])
+    return async_to_sync(read)()
+
+
+class StubWebhookServer:
+    """Local HTTP server recording webhook POSTs; paths starting /slow sleep first."""
+
+    def __init__(self, delay=0.3):
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                if self.path.startswith('/slow'):
+                    time.sleep(delay)
+                stub.requests.append((self.path, body))
+                status_code = 500 if self.path.startswith('/error') else 200
+                self.send_response(status_code)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def tearDownModule():
+    """Remove staged test uploads."""
+    shutil.rmtree(STAGING_ROOT, ignore_errors=True)
 
 
 class ProductTestCase(TestCase):
@@ -72,6 +178,363 @@ class ProductTestCase(TestCase):
         self.assertEqual(response.status_code, 204)
 
 
+class ProductBulkAPITestCase(TestCase):
+    """Test cases for the bulk product endpoints."""
+
+    def setUp(self):
+        """Create an existing product and a webhook for every event."""
+        self.client = APIClient()
+        self.product = Product.objects.create(sku='BULK-1', name='Existing', quantity=1)
+        for event_type in ('product_created', 'product_updated', 'product_deleted'):
+            Webhook.objects.create(url=f'https://example.com/{event_type}', event_type=event_type)
+
+    def test_bulk_upsert(self):
+        """Test POST creates and updates in one set-based write with batched events."""
+        items = [{'sku': 'bulk-1', 'name': 'Renamed', 'quantity': 5}]
+        items += [{'sku': f'BULK-{i}', 'name': f'New {i}', 'price': 2.5} for i in range(2, 102)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/products/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated']), (100, 1))
+        self.assertEqual(response.data['results'][0]['status'], 'updated')
+        self.assertLess(len(queries), 15)
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.name, self.product.quantity), ('Renamed', 5))
+        self.assertEqual(Product.objects.count(), 101)
+        created = WebhookOutbox.objects.get(event_type='product_created')
+        self.assertEqual(created.payload['count'], 100)
+
+    def test_bulk_validation_is_all_or_nothing(self):
+        """Test invalid items are reported by index and nothing is written."""
+        items = [
+            {'sku': 'OK-1', 'name': 'Fine'},
+            {'sku': 'BAD-1', 'name': 'Bad', 'quantity': 'many'},
+            {'sku': 'ok-1', 'name': 'Duplicate'},
+        ]
+        response = self.client.post('/api/products/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertFalse(Product.objects.filter(sku='OK-1').exists())
+
+        response = self.client.post('/api/products/bulk/', {'sku': 'X'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        with override_settings(PRODUCT_BULK_MAX_ITEMS=1):
+            response = self.client.post('/api/products/bulk/', items[:2], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_patch(self):
+        """Test PATCH applies partial updates by id or SKU."""
+        other = Product.objects.create(sku='BULK-2', name='Other', active=True)
+        items = [
+            {'id': str(self.product.id), 'sku': 'BULK-1B', 'price': 9.5},
+            {'sku': 'bulk-2', 'active': False},
+        ]
+        response = self.client.patch('/api/products/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+
+        self.product.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.product.sku, self.product.price, self.product.name), ('BULK-1B', 9.5, 'Existing'))
+        self.assertFalse(other.active)
+        self.assertEqual(WebhookOutbox.objects.get(event_type='product_updated').payload['count'], 2)
+
+        response = self.client.patch('/api/products/bulk/', [{'sku': 'MISSING', 'name': 'x'}], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_delete(self):
+        """Test DELETE removes named products and reports missing ones."""
+        items = [{'sku': 'bulk-1'}, {'sku': 'GONE'}]
+        response = self.client.delete('/api/products/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['status'] for r in response.data['results']], ['deleted', 'not_found'])
+        self.assertFalse(Product.objects.exists())
+        self.assertEqual(WebhookOutbox.objects.get(event_type='product_deleted').payload['count'], 1)
+
+
+class DeleteJobTestCase(TestCase):
+    """Test cases for background product deletion."""
+
+    def setUp(self):
+        """Create products and a product_deleted webhook."""
+        self.client = APIClient()
+        Product.objects.bulk_create([
+            Product(sku=f'DEL-{i:03d}', name=f'Product {i}', active=i % 2 == 0)
+            for i in range(25)
+        ])
+        Webhook.objects.create(url='https://example.com/deleted', event_type='product_deleted')
+
+    @patch('importer.views.delete_products_task.delay')
+    def test_delete_all_starts_job(self, mock_delay):
+        """Test the endpoint returns at once and dispatches the job after commit."""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete('/api/products/delete_all/?active=false&page=2')
+        self.assertEqual(response.status_code, 202)
+        job = DeleteJob.objects.get(id=response.data['job_id'])
+        self.assertEqual(job.filters, {'active': 'false'})
+        mock_delay.assert_called_once_with(str(job.id))
+        self.assertEqual(Product.objects.count(), 25)
+
+    @override_settings(PRODUCT_DELETE_BATCH_SIZE=10)
+    def test_filtered_delete_in_batches(self):
+        """Test only matching products are deleted and one summary event is queued."""
+        job = DeleteJob.objects.create(filters={'active': 'false'})
+        result = delete_products_task(str(job.id))
+        self.assertEqual(result['deleted'], 12)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.total_records, job.deleted_records), ('completed', 12, 12))
+        self.assertFalse(Product.objects.filter(active=False).exists())
+        self.assertEqual(Product.objects.count(), 13)
+
+        event = WebhookOutbox.objects.get(event_type='product_deleted')
+        self.assertEqual(event.payload['data']['count'], 12)
+        self.assertEqual(event.payload['data']['delete_job_id'], str(job.id))
+
+    @override_settings(PRODUCT_DELETE_BATCH_SIZE=7)
+    def test_delete_everything(self):
+        """Test an unfiltered job empties the table and reports progress."""
+        job = DeleteJob.objects.create()
+        delete_products_task(str(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.deleted_records, 25)
+        self.assertFalse(Product.objects.exists())
+        response = self.client.get(f'/api/delete-jobs/{job.id}/')
+        self.assertEqual(response.data['status'], 'completed')
+
+    @override_settings(PRODUCT_DELETE_BATCH_SIZE=5000)
+    def test_batches_fit_query_parameter_limit(self):
+        """Test a batch never binds more ids than the database accepts."""
+        job = DeleteJob.objects.create()
+        with patch('importer.deletion.max_batch_rows', return_value=10), \
+                CaptureQueriesContext(connection) as queries:
+            delete_products_task(str(job.id))
+        deletes = [q['sql'] for q in queries if q['sql'].startswith('DELETE FROM "importer_product"')]
+        self.assertEqual(len(deletes), 3)
+        self.assertFalse(Product.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DashboardStatsTestCase(TestCase):
+    """Test cases for the cached dashboard statistics."""
+
+    def setUp(self):
+        """Start from an empty cache with a few products."""
+        cache.clear()
+        self.client = APIClient()
+        Product.objects.create(sku='STAT-1', name='Active')
+        Product.objects.create(sku='STAT-2', name='Inactive', active=False)
+
+    def test_dashboard_reads_cached_counts(self):
+        """Test only the first dashboard render counts products."""
+        response = self.client.get('/')
+        self.assertEqual(response.context['total_products'], 2)
+        self.assertEqual(response.context['inactive_products'], 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/')
+        self.assertEqual(response.context['active_products'], 1)
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql'].upper()])
+
+    def test_writes_apply_deltas_on_commit(self):
+        """Test bulk writes adjust the cached counters once committed."""
+        get_stats()
+        items = [{'sku': f'STAT-{i}', 'name': 'New', 'active': i % 2 == 0} for i in range(3, 7)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/products/bulk/', items, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete('/api/products/bulk/', [{'sku': 'STAT-2'}], format='json')
+
+        stats = get_stats()
+        self.assertEqual((stats['total_products'], stats['active_products']), (5, 3))
+
+    def test_refresh_corrects_drift(self):
+        """Test the periodic refresh picks up untracked changes."""
+        get_stats()
+        Product.objects.filter(sku='STAT-2').update(active=True)
+        self.assertEqual(get_stats()['active_products'], 1)
+
+        refresh_product_stats()
+        self.assertEqual(get_stats()['active_products'], 2)
+
+        Webhook.objects.create(url='https://example.com/hook', event_type='product_created')
+        self.assertEqual(get_stats()['total_webhooks'], 1)
+
+
+class ProductPaginationTestCase(TestCase):
+    """Test cases for keyset pagination of products."""
+
+    def setUp(self):
+        """Create products, some sharing a created_at timestamp."""
+        Product.objects.bulk_create([Product(sku=f'K{i:02d}', name=f'Item {i}') for i in range(25)])
+        tied = Product.objects.order_by('sku')[:10].values_list('id', flat=True)
+        Product.objects.filter(id__in=list(tied)).update(created_at=timezone.now())
+        self.client = APIClient()
+
+    def test_cursor_pages_cover_every_product(self):
+        """Test following next links visits each product exactly once."""
+        url = '/api/products/?pagination=cursor&page_size=7'
+        seen = []
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('count', response.data)
+                seen.extend(product['sku'] for product in response.data['results'])
+                url = response.data['next']
+
+        self.assertEqual(sorted(seen), sorted(Product.objects.values_list('sku', flat=True)))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+    def test_previous_link_returns_prior_page(self):
+        """Test paging back returns the same rows as the earlier page."""
+        first = self.client.get('/api/products/?pagination=cursor&page_size=10').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+
+        self.assertIsNone(first['previous'])
+        self.assertEqual(
+            [product['id'] for product in back['results']],
+            [product['id'] for product in first['results']]
+        )
+
+    def test_count_modes_and_invalid_cursor(self):
+        """Test the optional count and the error for a bad cursor."""
+        response = self.client.get('/api/products/?pagination=cursor&count=exact')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(self.client.get('/api/products/?cursor=bogus').status_code, 404)
+
+    def test_page_number_mode_unchanged(self):
+        """Test requests without a cursor keep page number pagination."""
+        response = self.client.get('/api/products/?page=2')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_product_list_view_pages(self):
+        """Test the product list page links to the next keyset page."""
+        response = Client().get('/products/?sku=K')
+        self.assertEqual(len(response.context['products']), 20)
+        self.assertIn('sku=K', response.context['next_query'])
+
+        response = Client().get(f"/products/?{response.context['next_query']}")
+        self.assertEqual(len(response.context['products']), 5)
+        self.assertIsNone(response.context['next_query'])
+
+
+class ProductSearchTestCase(TestCase):
+    """Test cases for indexed product search."""
+
+    def setUp(self):
+        """Create searchable products."""
+        Product.objects.create(sku='WID-100', name='Blue Widget', description='Small')
+        Product.objects.create(sku='GAD-200', name='Gadget', description='Works with widgets')
+        Product.objects.create(sku='TOOL-3', name='Hammer')
+        self.client = APIClient()
+
+    def skus(self, url):
+        return [product['sku'] for product in self.client.get(url).data['results']]
+
+    def test_field_filters_are_substring_matches(self):
+        """Test sku and name filters keep case-insensitive substring semantics."""
+        self.assertEqual(self.skus('/api/products/?sku=id-1'), ['WID-100'])
+        self.assertEqual(self.skus('/api/products/?name=WIDGET'), ['WID-100'])
+        self.assertEqual(sorted(self.skus('/api/products/?sku=-')), ['GAD-200', 'TOOL-3', 'WID-100'])
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 index is SQLite only')
+    def test_filters_use_search_index(self):
+        """Test substring filters go through the FTS index on SQLite."""
+        with CaptureQueriesContext(connection) as queries:
+            self.skus('/api/products/?name=widget')
+        self.assertTrue(any('MATCH' in query['sql'] for query in queries.captured_queries))
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 index is SQLite only')
+    def test_index_survives_rowid_renumbering(self):
+        """Test the index doesn't rely on product rowids, which VACUUM may renumber."""
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE importer_product SET rowid = rowid + 1000')
+        self.assertEqual(self.skus('/api/products/?name=widget'), ['WID-100'])
+        self.assertEqual(self.skus('/api/products/?q=hammer'), ['TOOL-3'])
+
+    def test_index_follows_bulk_writes(self):
+        """Test imports, updates and deletes keep the index in sync."""
+        upsert_products([{'sku': 'NEW-1', 'name': 'Sprocket', 'description': '', 'price': None, 'quantity': 0}])
+        self.assertEqual(self.skus('/api/products/?name=sprock'), ['NEW-1'])
+
+        upsert_products([{'sku': 'NEW-1', 'name': 'Flange', 'description': '', 'price': None, 'quantity': 0}])
+        self.assertEqual(self.skus('/api/products/?name=sprock'), [])
+        self.assertEqual(self.skus('/api/products/?name=flang'), ['NEW-1'])
+
+        Product.objects.filter(sku='NEW-1').delete()
+        self.assertEqual(self.skus('/api/products/?name=flang'), [])
+
+    def test_ranked_search_across_fields(self):
+        """Test q matches SKU, name and description and puts the best match first."""
+        skus = self.skus('/api/products/?q=widget')
+        self.assertEqual(sorted(skus), ['GAD-200', 'WID-100'])
+        self.assertEqual(skus[0], 'WID-100')
+
+
+class ProductExportTestCase(TestCase):
+    """Test cases for the streaming product export."""
+
+    def setUp(self):
+        """Create products to export."""
+        Product.objects.create(sku='EXP-1', name='First, "quoted"', price=1.5, quantity=2)
+        Product.objects.create(sku='EXP-2', name='Second', description='Line\nbreak', active=False)
+
+    async def export(self, query=''):
+        response = await self.async_client.get(f'/api/products/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join([block async for block in response.streaming_content])
+
+    async def test_csv_export_round_trips(self):
+        """Test the CSV export can be read back with the import pipeline."""
+        response, body = await self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+        rows = {row['sku']: row for _, row in CSVImportStream(io.BytesIO(body)).rows()}
+        self.assertEqual(rows['EXP-1']['name'], 'First, "quoted"')
+        self.assertEqual(rows['EXP-1']['price'], 1.5)
+        self.assertEqual(rows['EXP-2']['description'], 'Line\nbreak')
+
+    async def test_ndjson_export_with_filter(self):
+        """Test NDJSON output and the product list filters."""
+        _, body = await self.export('?format=ndjson&active=false')
+        lines = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([line['sku'] for line in lines], ['EXP-2'])
+        self.assertFalse(lines[0]['active'])
+
+    async def test_gzip_export(self):
+        """Test the compressed stream decompresses to the plain export."""
+        response, body = await self.export('?gzip=true&q=EXP')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        self.assertEqual(gzip.decompress(body).decode().count('EXP-'), 2)
+
+    async def test_first_block_sent_before_export_ends(self):
+        """Test the export streams under ASGI instead of being built in memory first."""
+        produced = []
+
+        def export_stream(queryset, export_format, compress):
+            for i in range(3):
+                produced.append(i)
+                yield f'block {i}\n'.encode()
+
+        with patch('importer.views.export_stream', export_stream):
+            response = await self.async_client.get('/api/products/export/')
+            self.assertTrue(response.is_async)
+            blocks = aiter(response.streaming_content)
+            self.assertEqual(await anext(blocks), b'block 0\n')
+            self.assertEqual(produced, [0])
+            self.assertEqual([block async for block in blocks], [b'block 1\n', b'block 2\n'])
+
+    def test_unknown_format(self):
+        """Test an unsupported format is rejected."""
+        self.assertEqual(self.client.get('/api/products/export/?format=xml').status_code, 400)
+
+
 class WebhookTestCase(TestCase):
     """Test cases for Webhook model."""
 
@@ -103,3 +566,1141 @@ class WebhookTestCase(TestCase):
         }
         response = self.client.post('/api/webhooks/', data, format='json')
         self.assertEqual(response.status_code, 201)
+
+
+class CSVPipelineTestCase(TestCase):
+    """Test cases for the streaming CSV pipeline."""
+
+    def test_rows_are_normalized(self):
+        """Test rows are normalized and invalid rows skipped."""
+        content = (
+            'sku,name,description,price,quantity\n'
+            ' abc1 , Widget ,Blue,9.50,3\n'
+            ',Missing SKU,,,\n'
+            'abc2,Gadget,,,\n'
+        ).encode('utf-8')
+        source = CSVImportStream(io.BytesIO(content))
+        rows = [row for _, row in source.rows()]
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0], {
+            'sku': 'ABC1', 'name': 'Widget', 'description': 'Blue',
+            'price': 9.5, 'quantity': 3,
+        })
+        self.assertIsNone(rows[1]['price'])
+        self.assertEqual(source.progress, 1.0)
+
+    def test_quoted_newlines_and_batches(self):
+        """Test multi-line quoted fields and batching."""
+        content = (
+            '\ufeffsku,name,description\n'
+            'A1,One,"line one\nline two"\n'
+            'A2,Two,\n'
+            'A3,Three,\n'
+        ).encode('utf-8')
+        source = CSVImportStream(io.BytesIO(content))
+        batches = list(source.batches(2))
+
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+        self.assertEqual(batches[0][0][1]['description'], 'line one\nline two')
+
+    def test_empty_file_rejected(self):
+        """Test empty file raises an error."""
+        with self.assertRaises(ValueError):
+            CSVImportStream(io.BytesIO(b''))
+
+
+class SyntheticCatalogTestCase(TestCase):
+    """Test cases for the benchmark catalog generator."""
+
+    def generate(self, **kwargs):
+        stream = io.StringIO()
+        summary = generate_catalog(stream, 500, seed=7, **kwargs)
+        return stream.getvalue(), summary
+
+    def test_catalog_is_deterministic(self):
+        """Test the same arguments produce the same file."""
+        first, _ = self.generate(existing_ratio=0.5)
+        second, _ = self.generate(existing_ratio=0.5)
+        self.assertEqual(first, second)
+        other = io.StringIO()
+        generate_catalog(other, 500, existing_ratio=0.5, seed=8)
+        self.assertNotEqual(first, other.getvalue())
+
+    def test_catalog_mix(self):
+        """Test existing SKUs come first and malformed rows are rejected by the import."""
+        data, summary = self.generate(existing_ratio=0.4, malformed_rate=0.1)
+        self.assertEqual(summary.existing + summary.new, 500)
+        self.assertTrue(150 < summary.existing < 250)
+        self.assertTrue(20 < summary.malformed < 80)
+
+        rows = [row for _, row in CSVImportStream(io.BytesIO(data.encode())).rows()]
+        self.assertEqual(len(rows), summary.valid)
+        self.assertEqual(len({row['sku'] for row in rows}), summary.valid)
+
+
+class AdaptiveBatchSizerTestCase(TestCase):
+    """Test cases for import chunk sizing."""
+
+    def sizer(self, **kwargs):
+        return AdaptiveBatchSizer(**{'initial': 1000, 'minimum': 100, 'maximum': 20000, **kwargs})
+
+    def test_grows_while_throughput_holds_and_turns_on_drop(self):
+        """Test the size climbs while rows/second holds and backs off when it falls."""
+        sizer = self.sizer()
+        sizer.record(1000, 0.1)
+        sizer.record(sizer.size, sizer.size / 10000)
+        self.assertEqual(sizer.size, 2250)
+
+        sizer.record(sizer.size, sizer.size / 5000)
+        self.assertEqual(sizer.size, 1500)
+
+    def test_limits(self):
+        """Test latency, row width and parameter limits cap the size."""
+        sizer = self.sizer(target_seconds=1.0)
+        sizer.record(1000, 2.0)
+        self.assertEqual(sizer.size, 500)
+
+        sizer = self.sizer(max_bytes=1024 * 1024)
+        sizer.record(1000, 0.01, nbytes=1000 * 2048)
+        self.assertEqual(sizer.size, 512)
+
+        self.assertLessEqual(self.sizer(maximum=10 ** 9).maximum, max_batch_rows())
+
+    @override_settings(CSV_CHUNK_SIZE=2, IMPORT_MIN_CHUNK_SIZE=1, IMPORT_ADAPTIVE_BATCHING=False)
+    def test_import_uses_configured_chunk_size(self):
+        """Test imports honor CSV_CHUNK_SIZE when adaptive batching is off."""
+        job = ImportJob.objects.create(filename='products.csv')
+        content = b'sku,name\n' + b''.join(b'C%d,Item\n' % i for i in range(5))
+        staged_file = stage_upload(ContentFile(content, name='products.csv'), job.id)
+        import_csv_task(staged_file, 'products.csv', str(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.metrics['write']['calls'], 3)
+
+
+class UpsertTestCase(TestCase):
+    """Test cases for set-based product upserts."""
+
+    def make_rows(self, prefix, count):
+        """Build normalized rows."""
+        return [
+            {'sku': f'{prefix}{i}', 'name': f'Item {i}', 'description': '', 'price': 1.0, 'quantity': i}
+            for i in range(count)
+        ]
+
+    def test_created_and_updated_counts(self):
+        """Test a chunk reports created and updated products."""
+        Product.objects.create(sku='A0', name='Old')
+        result = upsert_products(self.make_rows('A', 3))
+
+        self.assertEqual(result.created_count, 2)
+        self.assertEqual(result.updated_count, 1)
+        self.assertEqual(Product.objects.get(sku='A0').name, 'Item 0')
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_last_duplicate_wins(self):
+        """Test duplicate SKUs in a chunk resolve to the last row."""
+        rows = self.make_rows('D', 1) + [{**self.make_rows('D', 1)[0], 'name': 'Last'}]
+        result = upsert_products(rows)
+
+        self.assertEqual(result.created_count, 1)
+        self.assertEqual(Product.objects.get(sku='D0').name, 'Last')
+
+    def test_queries_do_not_scale_per_row(self):
+        """Test a chunk is written in a handful of queries, not per row."""
+        upsert_products(self.make_rows('L', 100))
+        with CaptureQueriesContext(connection) as queries:
+            upsert_products(self.make_rows('L', 200))
+
+        self.assertLessEqual(len(queries), 10)
+        self.assertEqual(Product.objects.count(), 200)
+
+    def test_unchanged_rows_not_written(self):
+        """Test rows matching their product's fingerprint are skipped without events."""
+        Webhook.objects.create(url='https://a.example.com/hook', event_type='product_updated')
+        upsert_products(self.make_rows('F', 3))
+        before = {p.sku: p.updated_at for p in Product.objects.all()}
+        rows = self.make_rows('F', 3)
+        rows[1]['name'] = 'Renamed'
+
+        result = upsert_products(rows)
+        self.assertEqual((result.updated_count, result.unchanged_count), (1, 2))
+        self.assertEqual(Product.objects.get(sku='F0').updated_at, before['F0'])
+        self.assertEqual(WebhookOutbox.objects.filter(event_type='product_updated').count(), 0)
+
+        # Writes outside imports keep the fingerprint current
+        product = Product.objects.get(sku='F2')
+        product.name = 'Edited'
+        product.save()
+        result = upsert_products(self.make_rows('F', 3)[2:])
+        self.assertEqual(result.updated_count, 1)
+        self.assertEqual(Product.objects.get(sku='F2').name, 'Item 2')
+
+    def test_fingerprint_backfill(self):
+        """Test products from before fingerprints are unchanged by the next import once migrated."""
+        backfill = import_module('importer.migrations.0014_backfill_product_fingerprint')
+        upsert_products(self.make_rows('M', 5))
+        Product.objects.update(fingerprint='')
+
+        with patch.object(backfill, 'BATCH_SIZE', 2):
+            backfill.backfill_fingerprints(django_apps, None)
+
+        result = upsert_products(self.make_rows('M', 5))
+        self.assertEqual((result.updated_count, result.unchanged_count), (0, 5))
+
+
+class SKUIndexTestCase(TestCase):
+    """Test cases for the SKU membership index."""
+
+    def test_bloom_filter_membership(self):
+        """Test added SKUs are always found and the error rate holds."""
+        index = SKUBloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            index.add(f'SKU{i}')
+
+        self.assertTrue(all(f'SKU{i}' in index for i in range(1000)))
+        false_positives = sum(1 for i in range(1000, 11000) if f'SKU{i}' in index)
+        self.assertLess(false_positives, 300)
+
+    def test_new_skus_skip_lookup(self):
+        """Test SKUs absent from the index are created without a lookup."""
+        index = SKUBloomFilter(100)
+        rows = [{'sku': 'N1', 'name': 'New', 'description': '', 'price': None, 'quantity': 0}]
+        with CaptureQueriesContext(connection) as queries:
+            result = upsert_products(rows, sku_index=index)
+
+        self.assertEqual(result.created_count, 1)
+        self.assertFalse(any('SELECT' in query['sql'] for query in queries))
+        self.assertIn('N1', index)
+
+    def test_stale_index_falls_back_to_lookup(self):
+        """Test a SKU missing from a stale index is updated, not duplicated."""
+        Product.objects.create(sku='S1', name='Old')
+        rows = [{'sku': 'S1', 'name': 'New', 'description': '', 'price': None, 'quantity': 0}]
+        result = upsert_products(rows, sku_index=SKUBloomFilter(100))
+
+        self.assertEqual(result.updated_count, 1)
+        self.assertEqual(Product.objects.get(sku='S1').name, 'New')
+
+    def test_save_after_invalidation_dropped(self):
+        """Test an import saving its index doesn't undo an invalidation made meanwhile."""
+        index = load_sku_index()
+        Product.objects.create(sku='S2', name='Created elsewhere')
+        index.add('S3')
+        save_sku_index(index)
+
+        current = load_sku_index()
+        self.assertNotEqual(current.generation, index.generation)
+        self.assertIn('S2', current)
+
+
+class ImportBackendTestsMixin:
+    """Behaviour shared by every import backend."""
+    backend_class = None
+
+    def test_write_batch_counts(self):
+        """Test a batch reports inserted and updated rows."""
+        Product.objects.create(sku='B1', name='Old', description='Keep')
+        rows = [
+            {'sku': 'B1', 'name': 'First', 'description': '', 'price': None, 'quantity': 1},
+            {'sku': 'B2', 'name': 'New', 'description': '', 'price': 2.5, 'quantity': 3},
+            {'sku': 'B1', 'name': 'Second', 'description': '', 'price': 1.0, 'quantity': 2},
+        ]
+        result = self.backend_class().write_batch(rows)
+
+        self.assertEqual(result.created_count, 1)
+        self.assertEqual(result.updated_count, 1)
+        self.assertEqual({p.sku for p in result.created}, {'B2'})
+        updated = Product.objects.get(sku='B1')
+        self.assertEqual((updated.name, updated.description, updated.price), ('Second', '', 1.0))
+        self.assertEqual(Product.objects.get(sku='B2').description, '')
+
+    def test_finish_refreshes_sku_index(self):
+        """Test products created by an import reach the cached SKU index."""
+        save_sku_index(SKUBloomFilter(100))
+        backend = self.backend_class()
+        backend.write_batch([{'sku': 'I1', 'name': 'New', 'description': '', 'price': None, 'quantity': 1}])
+        backend.finish()
+
+        self.assertIn('I1', load_sku_index())
+
+
+class ORMImportBackendTestCase(ImportBackendTestsMixin, TestCase):
+    """Test cases for the ORM import backend."""
+    backend_class = ORMImportBackend
+
+    def test_copy_falls_back_to_orm(self):
+        """Test the COPY backend falls back to the ORM off PostgreSQL."""
+        backend = get_import_backend('copy')
+        expected = 'copy' if connection.vendor == 'postgresql' else 'orm'
+        self.assertEqual(backend.name, expected)
+
+    def test_unknown_backend_rejected(self):
+        """Test unknown backend names raise an error."""
+        with self.assertRaises(ValueError):
+            get_import_backend('nope')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY backend requires PostgreSQL (DB_ENGINE=postgresql)')
+class PostgresCopyImportBackendTestCase(ImportBackendTestsMixin, TestCase):
+    """Test cases for the PostgreSQL COPY import backend."""
+    backend_class = PostgresCopyImportBackend
+
+
+@override_settings(STORAGES=STAGING_STORAGES)
+class ImportTaskTestCase(TestCase):
+    """Test cases for the CSV import task."""
+
+    def run_import(self, content):
+        """Stage content, run the import task synchronously and return the job."""
+        job = ImportJob.objects.create(filename='products.csv')
+        staged_file = stage_upload(ContentFile(content, name='products.csv'), job.id)
+        import_csv_task(staged_file, 'products.csv', str(job.id))
+        job.refresh_from_db()
+        return job
+
+    def test_import_creates_and_updates(self):
+        """Test import creates new products and updates existing ones."""
+        Product.objects.create(sku='OLD1', name='Old', quantity=1)
+        job = self.run_import(
+            b'sku,name,price,quantity\nold1,Renamed,5,7\nnew1,New,1.5,2\n'
+        )
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.created_records, 1)
+        self.assertEqual(job.updated_records, 1)
+        self.assertEqual(job.total_records, 2)
+        self.assertEqual(Product.objects.get(sku='OLD1').name, 'Renamed')
+        self.assertEqual(Product.objects.get(sku='NEW1').quantity, 2)
+
+    def test_reimport_counts_unchanged_rows(self):
+        """Test re-importing the same file leaves products untouched."""
+        content = b'sku,name,price,quantity\nA1,One,5,7\nB2,Two,,1\n'
+        self.run_import(content)
+        job = self.run_import(content.replace(b'Two', b'Deux'))
+
+        self.assertEqual((job.created_records, job.updated_records, job.unchanged_records), (0, 1, 1))
+        self.assertEqual(job.processed_records, 2)
+        self.assertEqual(Product.objects.get(sku='B2').name, 'Deux')
+
+    def test_import_records_stage_metrics(self):
+        """Test per-stage timings are saved on the job and exported."""
+        Product.objects.create(sku='OLD1', name='Old')
+        job = self.run_import(b'sku,name\nold1,Renamed\nnew1,New\nnew2,New\n')
+
+        stages = job.metrics
+        self.assertEqual(stages['parse']['rows'], 3)
+        self.assertEqual(stages['write']['rows'], 3)
+        self.assertEqual(stages['bulk_create']['rows'], 2)
+        self.assertEqual(stages['bulk_update']['rows'], 1)
+        self.assertEqual(stages['sku_lookup']['queries'], 1)
+        self.assertGreaterEqual(stages['write']['queries'], 3)
+        self.assertIn('metrics', APIClient().get(f'/api/import-jobs/{job.id}/').data)
+
+        response = self.client.get(f'/api/import/metrics/?job_id={job.id}')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('importer_import_stage_rows_total{stage="bulk_create"} 2', body)
+        self.assertIn('importer_import_jobs{status="completed"} 1', body)
+
+    def test_staged_file_removed_after_import(self):
+        """Test the staged upload is deleted once the import completes."""
+        job = self.run_import(b'sku,name\nA1,One\n')
+
+        self.assertEqual(job.status, 'completed')
+        self.assertFalse(get_staging_storage().listdir(str(job.id))[1])
+
+    def test_failed_import_resumes_from_checkpoint(self):
+        """Test a rerun continues after the last committed chunk without double counting."""
+        Webhook.objects.create(url='https://a.example.com/hook', event_type='product_created')
+        rows = ''.join(f'R{i},Item {i}\n' for i in range(2500))
+        job = ImportJob.objects.create(filename='products.csv')
+        staged_file = stage_upload(ContentFile(f'sku,name\n{rows}'.encode(), name='products.csv'), job.id)
+
+        write_batch = ORMImportBackend.write_batch
+        calls = []
+
+        def fail_second_chunk(backend, batch):
+            calls.append(len(batch))
+            if len(calls) == 2:
+                raise RuntimeError('worker lost')
+            return write_batch(backend, batch)
+
+        with patch.object(ORMImportBackend, 'write_batch', fail_second_chunk):
+            with self.assertRaises(RuntimeError):
+                import_csv_task(staged_file, 'products.csv', str(job.id))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.checkpoint_rows, 1000)
+        self.assertEqual(job.created_records, 1000)
+
+        import_csv_task(staged_file, 'products.csv', str(job.id))
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.processed_records, 2500)
+        self.assertEqual(job.created_records, 2500)
+        self.assertEqual(Product.objects.count(), 2500)
+        self.assertEqual(sum(entry.payload['count'] for entry in WebhookOutbox.objects.all()), 2500)
+
+    @patch('importer.views.import_csv_task.delay')
+    def test_resume_api(self, mock_delay):
+        """Test the resume action restarts failed jobs only."""
+        mock_delay.return_value.id = 'task-id'
+        job = ImportJob.objects.create(filename='products.csv', status='failed', checkpoint_rows=1000)
+        job.staged_file = stage_upload(ContentFile(b'sku,name\n', name='products.csv'), job.id)
+        job.save()
+
+        response = APIClient().post(f'/api/import-jobs/{job.id}/resume/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['resume_from_row'], 1001)
+        mock_delay.assert_called_once_with(job.staged_file, 'products.csv', str(job.id))
+
+        response = APIClient().post(f'/api/import-jobs/{job.id}/resume/')
+        self.assertEqual(response.status_code, 409)
+
+        ImportJob.objects.filter(id=job.id).update(status='completed')
+        response = APIClient().post(f'/api/import-jobs/{job.id}/resume/')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(STORAGES=STAGING_STORAGES)
+class ImportRejectsTestCase(TestCase):
+    """Test cases for rejected import rows."""
+
+    def run_import(self, content):
+        job = ImportJob.objects.create(filename='products.csv')
+        staged_file = stage_upload(ContentFile(content, name='products.csv'), job.id)
+        import_csv_task(staged_file, 'products.csv', str(job.id))
+        job.refresh_from_db()
+        return job
+
+    def download(self, job):
+        response = APIClient().get(f'/api/import-jobs/{job.id}/rejects/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        return list(csv.DictReader(io.StringIO(streamed_body(response).decode())))
+
+    def test_rejects_counted_and_downloadable(self):
+        """Test rejected rows are counted by reason and served as CSV."""
+        job = self.run_import(
+            b'sku,name,price,quantity\nA1,One,1,1\n,No SKU,1,1\nB2,,1,1\n'
+            b'C3,Three,n/a,1\nD4,Four,1,many\nE5,Five,2,2\n'
+        )
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.created_records, 2)
+        self.assertEqual(job.rejected_records, 4)
+        self.assertEqual(job.rejects, {
+            'missing_sku': 1, 'missing_name': 1, 'invalid_price': 1, 'invalid_quantity': 1
+        })
+        rejects = self.download(job)
+        self.assertEqual([(r['row'], r['reason']) for r in rejects], [
+            ('2', 'missing_sku'), ('3', 'missing_name'), ('4', 'invalid_price'), ('5', 'invalid_quantity')
+        ])
+        self.assertEqual(rejects[2]['price'], 'n/a')
+
+    def test_rejects_found_without_directories(self):
+        """Test reject parts are listed on storages with keys but no directories, like S3."""
+        job = self.run_import(b'sku,name\nA1,One\nB2,\n')
+        with patch.object(FileSystemStorage, 'exists', return_value=False):
+            self.assertEqual(len(list_reject_parts(job.id)), 1)
+        self.assertEqual(list_reject_parts('missing-job'), [])
+
+        clean = self.run_import(b'sku,name\nA1,One\n')
+        response = APIClient().get(f'/api/import-jobs/{clean.id}/rejects/')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(IMPORT_REJECTS_LOG_FIRST=2, IMPORT_REJECTS_LOG_EVERY=5)
+    def test_reject_logging_is_sampled(self):
+        """Test only the first rejects and then every Nth are logged."""
+        rows = b''.join(b'R%d,\n' % i for i in range(12))
+        with self.assertLogs('importer.rejects', 'WARNING') as logs:
+            job = self.run_import(b'sku,name\n' + rows)
+
+        self.assertEqual(job.rejected_records, 12)
+        self.assertEqual(len(logs.records), 4)
+
+    def test_resumed_import_reports_each_reject_once(self):
+        """Test rejects of a chunk replayed after a failure are not duplicated."""
+        rows = ''.join(f'R{i},{"" if i % 100 == 7 else "Item"}\n' for i in range(2500))
+        job = ImportJob.objects.create(filename='products.csv')
+        staged_file = stage_upload(ContentFile(f'sku,name\n{rows}'.encode(), name='products.csv'), job.id)
+
+        write_batch = ORMImportBackend.write_batch
+        calls = []
+
+        def fail_second_chunk(backend, batch):
+            calls.append(len(batch))
+            if len(calls) == 2:
+                raise RuntimeError('worker lost')
+            return write_batch(backend, batch)
+
+        with patch.object(ORMImportBackend, 'write_batch', fail_second_chunk):
+            with self.assertRaises(RuntimeError):
+                import_csv_task(staged_file, 'products.csv', str(job.id))
+        import_csv_task(staged_file, 'products.csv', str(job.id))
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.rejected_records, 25)
+        self.assertEqual([int(r['row']) for r in self.download(job)], list(range(8, 2500, 100)))
+
+
+@override_settings(STORAGES=STAGING_STORAGES, CACHES=LOCMEM_CACHES)
+class ImportPreviewTestCase(TestCase):
+    """Test cases for dry-run import previews."""
+
+    def setUp(self):
+        cache.clear()
+        Product.objects.create(sku='A1', name='Old name', description='', price=1.0, quantity=1)
+        Product.objects.create(sku='B2', name='Same', description='', price=2.0, quantity=2)
+
+    def run_preview(self, content=b'sku,name,price,quantity\nA1,New name,1,1\nB2,Same,2,2\nC3,New,3,3\nD4,,1,1\n'):
+        job = ImportJob.objects.create(filename='products.csv', preview={})
+        staged_file = stage_upload(ContentFile(content, name='products.csv'), job.id)
+        job.staged_file = staged_file
+        job.save()
+        preview_import_task(staged_file, 'products.csv', str(job.id))
+        job.refresh_from_db()
+        return job
+
+    @patch('importer.views.import_csv_task.delay')
+    def confirm(self, job, mock_delay):
+        mock_delay.return_value.id = 'task-id'
+        response = APIClient().post(f'/api/import-jobs/{job.id}/confirm/')
+        self.assertEqual(response.status_code, 202)
+        staged_file, filename, job_id = mock_delay.call_args.args
+        import_csv_task(staged_file, filename, job_id)
+        job.refresh_from_db()
+        return response.data, staged_file
+
+    def test_preview_counts_without_writing(self):
+        """Test a preview classifies rows and samples diffs but writes no products."""
+        job = self.run_preview()
+
+        self.assertEqual(job.status, 'previewed')
+        preview = job.preview
+        self.assertEqual(
+            [preview[key] for key in ('total', 'created', 'updated', 'unchanged', 'rejected')], [4, 1, 1, 1, 1]
+        )
+        self.assertEqual(preview['diffs']['updated'], [
+            {'row': 1, 'sku': 'A1', 'changes': {'name': ['Old name', 'New name']}}
+        ])
+        self.assertEqual(preview['diffs']['created'][0]['sku'], 'C3')
+        self.assertEqual(job.rejects, {'missing_name': 1})
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertEqual(Product.objects.get(sku='A1').name, 'Old name')
+
+    def test_confirm_imports_cached_changes(self):
+        """Test confirming imports only the changed rows and keeps the preview's rejects."""
+        job = self.run_preview()
+        upload = job.staged_file
+        data, staged_file = self.confirm(job)
+
+        self.assertTrue(data['reused_preview'])
+        self.assertNotEqual(staged_file, upload)
+        self.assertFalse(get_staging_storage().exists(upload))
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.processed_records, job.created_records, job.updated_records), (2, 1, 1))
+        self.assertEqual(job.rejects, {'missing_name': 1})
+        self.assertEqual(Product.objects.get(sku='A1').name, 'New name')
+        self.assertTrue(Product.objects.filter(sku='C3').exists())
+        response = APIClient().get(f'/api/import-jobs/{job.id}/rejects/')
+        self.assertIn(b'D4', streamed_body(response))
+
+    def test_confirm_reparses_after_products_change(self):
+        """Test a preview made stale by product writes is not reused."""
+        job = self.run_preview()
+        product = Product.objects.get(sku='B2')
+        product.name = 'Changed'
+        product.save()
+        data, staged_file = self.confirm(job)
+
+        self.assertFalse(data['reused_preview'])
+        self.assertEqual(staged_file, job.staged_file)
+        self.assertEqual((job.processed_records, job.updated_records, job.rejected_records), (3, 2, 1))
+        self.assertEqual(Product.objects.get(sku='B2').name, 'Same')
+
+    def test_previews_of_same_file_kept_apart(self):
+        """Test a second preview of a file leaves the first one's changes in place."""
+        first, second = self.run_preview(), self.run_preview()
+        self.assertNotEqual(first.preview['changes_file'], second.preview['changes_file'])
+        self.assertTrue(get_staging_storage().exists(first.preview['changes_file']))
+
+        data, staged_file = self.confirm(first)
+        self.assertTrue(data['reused_preview'])
+        self.assertEqual(staged_file, first.preview['changes_file'])
+
+    def test_changes_file_claimed_once(self):
+        """Test only one caller claims a preview's changes file."""
+        job = self.run_preview()
+        self.assertEqual(take_changes_file(job.id), job.preview['changes_file'])
+        self.assertIsNone(take_changes_file(job.id))
+
+    def test_confirm_requires_finished_preview(self):
+        """Test only previewed jobs can be confirmed, and they cannot be resumed."""
+        job = ImportJob.objects.create(filename='products.csv', status='completed')
+        response = APIClient().post(f'/api/import-jobs/{job.id}/confirm/')
+        self.assertEqual(response.status_code, 400)
+
+        previewed = self.run_preview()
+        response = APIClient().post(f'/api/import-jobs/{previewed.id}/resume/')
+        self.assertEqual(response.status_code, 400)
+
+    @patch('importer.views.preview_import_task.delay')
+    def test_upload_preview_flag(self, mock_delay):
+        """Test uploads with preview=true start a preview instead of an import."""
+        mock_delay.return_value.id = 'task-id'
+        upload = SimpleUploadedFile('products.csv', b'sku,name\nA1,One\n')
+        response = APIClient().post('/api/import/upload/', {'file': upload, 'preview': 'true'}, format='multipart')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.data['preview'])
+        job = ImportJob.objects.get(id=response.data['job_id'])
+        self.assertEqual(job.preview, {})
+        mock_delay.assert_called_once_with(job.staged_file, 'products.csv', str(job.id))
+
+
+@override_settings(STORAGES=STAGING_STORAGES)
+class UploadCSVTestCase(TestCase):
+    """Test cases for the CSV upload API."""
+
+    @patch('importer.views.import_csv_task.delay')
+    def test_upload_stages_file(self, mock_delay):
+        """Test uploads are staged and only the file name is queued."""
+        mock_delay.return_value.id = 'task-id'
+        upload = SimpleUploadedFile('products.csv', b'sku,name\nA1,One\n')
+        response = APIClient().post('/api/import/upload/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 202)
+        job = ImportJob.objects.get(id=response.data['job_id'])
+        mock_delay.assert_called_once_with(job.staged_file, 'products.csv', str(job.id))
+        with get_staging_storage().open(job.staged_file, 'rb') as staged:
+            self.assertEqual(staged.read(), b'sku,name\nA1,One\n')
+
+    @override_settings(IMPORT_STAGING_SHARED=False)
+    @patch('importer.views.import_csv_task.delay')
+    def test_upload_rejected_when_staging_not_shared(self, mock_delay):
+        """Test uploads fail up front when workers can't read local staging."""
+        upload = SimpleUploadedFile('products.csv', b'sku,name\nA1,One\n')
+        response = APIClient().post('/api/import/upload/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('IMPORT_STAGING_BUCKET', response.data['detail'])
+        self.assertFalse(ImportJob.objects.exists())
+        mock_delay.assert_not_called()
+
+
+@override_settings(STORAGES=STAGING_STORAGES)
+class CompressedUploadTestCase(TestCase):
+    """Test cases for gzip, zstd and zip uploads."""
+    content = b'sku,name,quantity\n' + b''.join(b'Z%d,Item %d,%d\n' % (i, i, i) for i in range(50))
+
+    def run_import(self, data, filename):
+        job = ImportJob.objects.create(filename=filename)
+        staged_file = stage_upload(ContentFile(data, name=filename), job.id)
+        import_csv_task(staged_file, filename, str(job.id))
+        job.refresh_from_db()
+        return job
+
+    def zipped(self, *names):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name in names:
+                archive.writestr(name, self.content)
+        return buffer.getvalue()
+
+    def assert_imported(self, job):
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.created_records, 50)
+        self.assertEqual(Product.objects.get(sku='Z49').quantity, 49)
+
+    def test_gzip_import(self):
+        """Test .csv.gz uploads are decompressed while importing."""
+        self.assert_imported(self.run_import(gzip.compress(self.content), 'products.csv.gz'))
+
+    @skipUnless(zstandard, 'zstandard is not installed')
+    def test_zstd_import(self):
+        """Test .csv.zst uploads are decompressed while importing."""
+        data = zstandard.ZstdCompressor().compress(self.content)
+        self.assert_imported(self.run_import(data, 'products.csv.zst'))
+
+    def test_zip_import(self):
+        """Test a zip holding one CSV is imported and one holding two is rejected."""
+        self.assert_imported(self.run_import(self.zipped('products.csv'), 'products.zip'))
+
+        with self.assertRaises(ValueError):
+            self.run_import(self.zipped('a.csv', 'b.csv'), 'products.zip')
+
+    def test_decompressed_size_limit(self):
+        """Test MAX_FILE_SIZE caps the decompressed size of an upload."""
+        data = gzip.compress(self.content)
+        with override_settings(MAX_FILE_SIZE=len(self.content) // 2):
+            with self.assertRaises(ValueError):
+                self.run_import(data, 'products.csv.gz')
+        self.assertEqual(ImportJob.objects.get().status, 'failed')
+
+    def test_stream_seeks_forward_and_rewinds(self):
+        """Test resumed imports can seek the decompressed stream forwards."""
+        stream = decompress(io.BytesIO(gzip.compress(self.content)), 'gzip')
+        header = stream.readline()
+        stream.seek(len(header) + len(b'Z0,Item 0,0\n'))
+        self.assertEqual(stream.readline(), b'Z1,Item 1,1\n')
+        stream.seek(0)
+        self.assertEqual(stream.readline(), header)
+        with self.assertRaises(io.UnsupportedOperation):
+            stream.seek(5)
+
+    @patch('importer.views.import_csv_task.delay')
+    def test_upload_api_accepts_compressed(self, mock_delay):
+        """Test the upload API accepts compressed CSVs and rejects other files."""
+        mock_delay.return_value.id = 'task-id'
+        upload = SimpleUploadedFile('products.csv.gz', gzip.compress(self.content))
+        response = APIClient().post('/api/import/upload/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+
+        upload = SimpleUploadedFile('products.txt', self.content)
+        response = APIClient().post('/api/import/upload/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(pa, 'pyarrow is not installed')
+@override_settings(STORAGES=STAGING_STORAGES)
+class ColumnarImportTestCase(TestCase):
+    """Test cases for NDJSON, Parquet and Arrow imports and vectorized normalization."""
+    rows = [
+        {'sku': ' a1 ', 'name': 'One', 'description': ' d ', 'price': '1.5', 'quantity': ' +3 '},
+        {'sku': 'b2', 'name': '', 'description': 'x', 'price': '1', 'quantity': '1'},
+        {'sku': 'c3', 'name': 'Three', 'description': 'multi\nline', 'price': 'n/a', 'quantity': '2'},
+        {'sku': 'd4', 'name': 'Four', 'description': '', 'price': '', 'quantity': ''},
+        {'sku': 'e5', 'name': 'Five', 'description': '', 'price': '2', 'quantity': '3.0'},
+    ]
+
+    def run_import(self, data, filename):
+        job = ImportJob.objects.create(filename=filename)
+        staged_file = stage_upload(ContentFile(data, name=filename), job.id)
+        import_csv_task(staged_file, filename, str(job.id))
+        job.refresh_from_db()
+        return job
+
+    def ndjson(self, rows):
+        return b''.join(json.dumps(row).encode() + b'\n' for row in rows)
+
+    def test_normalization_matches_csv_reader(self):
+        """Test vectorized normalization keeps and rejects the same rows as the csv module."""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(self.rows[0]))
+        writer.writeheader()
+        writer.writerows(self.rows)
+        data = buffer.getvalue().encode()
+
+        expected = list(CSVImportStream(io.BytesIO(data)).rows())
+        self.assertEqual([row_num for row_num, _ in expected], [1, 4])
+        self.assertEqual(list(ArrowCSVImportStream(io.BytesIO(data)).rows()), expected)
+        self.assertEqual(list(NDJSONImportStream(io.BytesIO(self.ndjson(self.rows))).rows()), expected)
+
+    def test_typed_columns(self):
+        """Test numeric columns are coerced and fractional quantities rejected."""
+        table = pa.table({
+            'sku': ['p1', 'p2', 'p3'],
+            'name': ['A', 'B', 'C'],
+            'price': [1.0, None, 3.0],
+            'quantity': [1.0, 2.5, None],
+        })
+        self.assertEqual(normalize_batch(table.to_batches()[0]), [
+            (1, {'sku': 'P1', 'name': 'A', 'description': '', 'price': 1.0, 'quantity': 1}),
+            (3, {'sku': 'P3', 'name': 'C', 'description': '', 'price': 3.0, 'quantity': 0}),
+        ])
+
+    def test_ndjson_parquet_and_arrow_imports(self):
+        """Test each columnar format imports through the task."""
+        import pyarrow.parquet as pq
+        table = pa.table({'sku': ['p1', 'p2'], 'name': ['A', 'B'], 'price': [1.5, 2.0], 'quantity': [1, 2]})
+        parquet = io.BytesIO()
+        pq.write_table(table, parquet)
+        arrow = io.BytesIO()
+        with pa.ipc.new_file(arrow, table.schema) as writer:
+            writer.write_table(table)
+
+        for data, filename in [
+            (gzip.compress(self.ndjson(table.to_pylist())), 'products.ndjson.gz'),
+            (parquet.getvalue(), 'products.parquet'),
+            (arrow.getvalue(), 'products.arrow'),
+        ]:
+            Product.objects.all().delete()
+            job = self.run_import(data, filename)
+            self.assertEqual(job.status, 'completed', filename)
+            self.assertEqual(job.created_records, 2, filename)
+            self.assertEqual(Product.objects.get(sku='P2').quantity, 2)
+
+    def test_resume_skips_imported_rows(self):
+        """Test a resumed NDJSON import skips the records already written."""
+        data = self.ndjson({'sku': f'R{i}', 'name': '' if i % 100 == 7 else 'Item'} for i in range(2500))
+        job = ImportJob.objects.create(filename='products.ndjson')
+        staged_file = stage_upload(ContentFile(data, name='products.ndjson'), job.id)
+
+        write_batch = ORMImportBackend.write_batch
+        calls = []
+
+        def fail_second_chunk(backend, batch):
+            calls.append(len(batch))
+            if len(calls) == 2:
+                raise RuntimeError('worker lost')
+            return write_batch(backend, batch)
+
+        with patch.object(ORMImportBackend, 'write_batch', fail_second_chunk):
+            with self.assertRaises(RuntimeError):
+                import_csv_task(staged_file, 'products.ndjson', str(job.id))
+
+        import_csv_task(staged_file, 'products.ndjson', str(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.created_records, 2475)
+        self.assertEqual(job.processed_records, 2475)
+        self.assertEqual(job.rejected_records, 25)
+        rows = b''.join(iter_rejects_csv(job.id)).decode().splitlines()[1:]
+        self.assertEqual([int(row.split(',')[0]) for row in rows], list(range(8, 2500, 100)))
+
+    @override_settings(IMPORT_CSV_READER='arrow')
+    def test_arrow_csv_reader(self):
+        """Test CSV imports can use the vectorized reader."""
+        job = self.run_import(b'sku,name,quantity\na1,One,2\nb2,,1\n', 'products.csv')
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.created_records, 1)
+        self.assertEqual(Product.objects.get(sku='A1').quantity, 2)
+
+    def test_upload_format(self):
+        """Test formats and codecs are validated from the file name."""
+        self.assertEqual(upload_format('Products.NDJSON.gz'), ('ndjson', 'gzip'))
+        self.assertEqual(upload_format('products.zip'), ('csv', 'zip'))
+        for filename in ['products.parquet.gz', 'products.txt', 'products.json']:
+            with self.assertRaises(ValueError):
+                upload_format(filename)
+
+@override_settings(STORAGES=STAGING_STORAGES)
+class SplitRangesTestCase(TestCase):
+    """Test cases for record-aligned range splitting."""
+
+    def catalog(self):
+        lines = ['sku,name,description\n']
+        for i in range(50):
+            lines.append(f'S{i},Name {i},"multi\nline ""quoted"" {i}"\n')
+        return ''.join(lines).encode('utf-8')
+
+    def test_ranges_respect_quoted_newlines(self):
+        """Test ranges never end inside a quoted field."""
+        data = self.catalog()
+        name = get_staging_storage().save('ranges/products.csv', ContentFile(data))
+        with open_staged_range(name, 0, len(data)) as stream:
+            fieldnames, header_end = read_header(stream)
+            ranges = split_ranges(stream, header_end, 64, block_size=100, size=len(data))
+        skus = []
+        for start, end in ranges:
+            with open_staged_range(name, start, end) as stream:
+                source = CSVImportStream(stream, fieldnames=fieldnames)
+                skus.extend(row['sku'] for _, row in source.rows())
+
+        self.assertGreater(len(ranges), 5)
+        self.assertEqual(ranges[0][0], header_end)
+        self.assertEqual(ranges[-1][1], len(data))
+        self.assertEqual(skus, [f'S{i}' for i in range(50)])
+
+    def test_object_storage_range_fetched_alone(self):
+        """Test a range on S3 staging is read with a ranged GET, not a full download."""
+        data = self.catalog()
+
+        def get(Range):
+            start, end = map(int, Range.removeprefix('bytes=').split('-'))
+            return {'Body': io.BytesIO(data[start:end + 1])}
+
+        storage = Mock(bucket_name='staging')
+        storage._normalize_name.side_effect = lambda name: f'imports/{name}'
+        storage.bucket.Object.return_value.get.side_effect = get
+        fieldnames, header_end = read_header(io.BytesIO(data))
+        start, end = split_ranges(io.BytesIO(data), header_end, 64)[1]
+
+        with patch('importer.parallel.get_staging_storage', return_value=storage):
+            with open_staged_range('job/products.csv', start, end) as stream:
+                rows = [row for _, row in CSVImportStream(stream, fieldnames=fieldnames).rows()]
+
+        storage.open.assert_not_called()
+        storage.bucket.Object.assert_called_once_with('imports/job/products.csv')
+        storage.bucket.Object.return_value.get.assert_called_once_with(Range=f'bytes={start}-{end - 1}')
+        expected = CSVImportStream(io.BytesIO(data[start:end]), fieldnames=fieldnames).rows()
+        self.assertEqual(rows, [row for _, row in expected])
+        self.assertTrue(rows)
+
+
+@override_settings(
+    STORAGES=STAGING_STORAGES,
+    IMPORT_PARALLEL_MIN_SIZE=1,
+    IMPORT_PARALLEL_CHUNK_SIZE=40,
+    IMPORT_PARALLEL_PARTITIONS=3,
+)
+class ParallelImportTestCase(TestCase):
+    """Test cases for parallel chunked imports."""
+
+    def setUp(self):
+        """Run Celery canvases inline."""
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+
+    def test_parallel_import_last_row_wins(self):
+        """Test a fanned-out import merges counters and keeps the last duplicate."""
+        Product.objects.create(sku='P0', name='Existing')
+        rows = ''.join(f'p{i},Item {i},{i}\n' for i in range(30))
+        content = f'sku,name,quantity\n{rows}p5,Last Five,99\n'.encode('utf-8')
+
+        job = ImportJob.objects.create(filename='products.csv')
+        staged_file = stage_upload(ContentFile(content, name='products.csv'), job.id)
+        import_csv_task(staged_file, 'products.csv', str(job.id))
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.processed_records, 31)
+        self.assertEqual(job.created_records, 29)
+        self.assertEqual(job.updated_records, 2)
+        self.assertEqual(Product.objects.count(), 30)
+        self.assertEqual(Product.objects.get(sku='P5').name, 'Last Five')
+        self.assertFalse(get_staging_storage().exists(staged_file))
+
+    def test_parallel_rejects_numbered_across_ranges(self):
+        """Test rejects found by range workers get row numbers for the whole file."""
+        rows = ''.join(f'p{i},{"" if i % 10 == 3 else "Item"}\n' for i in range(30))
+        job = ImportJob.objects.create(filename='products.csv')
+        staged_file = stage_upload(ContentFile(f'sku,name\n{rows}'.encode(), name='products.csv'), job.id)
+        import_csv_task(staged_file, 'products.csv', str(job.id))
+        job.refresh_from_db()
+
+        self.assertEqual(job.processed_records, 27)
+        self.assertEqual(job.rejects, {'missing_name': 3})
+        response = APIClient().get(f'/api/import-jobs/{job.id}/rejects/')
+        rejects = list(csv.DictReader(io.StringIO(streamed_body(response).decode())))
+        self.assertEqual([(r['row'], r['sku']) for r in rejects], [('4', 'p3'), ('14', 'p13'), ('24', 'p23')])
+
+    @patch('importer.tasks.chord')
+    def test_redelivered_partitions_task_counts_rejects_once(self, mock_chord):
+        """Test running import_partitions_task twice for a job doesn't add its rejects twice."""
+        job = ImportJob.objects.create(filename='products.csv', status='processing')
+        range_counts = [{'rows': 9, 'rejects': {'missing_name': 1}}, {'rows': 10, 'rejects': {}}]
+        for _ in range(2):
+            import_partitions_task(range_counts, str(job.id), f'{job.id}/products.csv', 2)
+        job.refresh_from_db()
+
+        self.assertEqual(job.rejects, {'missing_name': 1})
+        self.assertEqual((job.total_records, job.rejected_records), (19, 1))
+
+
+@override_settings(IMPORT_PROGRESS_CHECKPOINT_INTERVAL=3600)
+class ImportProgressTestCase(TestCase):
+    """Test cases for cache-backed import progress."""
+
+    def test_updates_published_without_db_writes(self):
+        """Test progress updates reach readers without touching the job row."""
+        job = ImportJob.objects.create(filename='products.csv', status='processing')
+        progress = ProgressReporter(job)
+
+        with self.assertNumQueries(0):
+            progress.update(total_records=10, processed_records=4)
+            state = get_progress(job.id)
+
+        self.assertEqual(state['processed_records'], 4)
+        job.refresh_from_db()
+        self.assertEqual(job.processed_records, 0)
+
+        progress.finish('completed', processed_records=10)
+        job.refresh_from_db()
+        self.assertEqual(job.processed_records, 10)
+        self.assertEqual(get_progress(job.id)['status'], 'completed')
+
+    @override_settings(IMPORT_PROGRESS_FALLBACK_TTL=0)
+    def test_fallback_follows_job_row(self):
+        """Test progress read from the job row isn't cached past its fallback TTL."""
+        job = ImportJob.objects.create(filename='products.csv', status='processing')
+        cache.delete(f'importer:progress:{job.id}')
+        self.assertEqual(get_progress(job.id)['processed_records'], 0)
+
+        ImportJob.objects.filter(id=job.id).update(processed_records=5)
+        self.assertEqual(get_progress(job.id)['processed_records'], 5)
+
+    def test_partition_counters_summed(self):
+        """Test a parallel import reports the sum of its partitions."""
+        job = ImportJob.objects.create(filename='products.csv', status='processing')
+        start_parallel_progress(job.id, 10, 2)
+        PartitionProgressReporter(job.id, 0).update(3, 2, 1)
+        PartitionProgressReporter(job.id, 1).update(4, 4, 0)
+
+        state = get_progress(job.id)
+        self.assertEqual(state['processed_records'], 7)
+        self.assertEqual(state['created_records'], 6)
+        self.assertNotIn('partitions', state)
+
+    def test_progress_api(self):
+        """Test the progress endpoint serves published progress."""
+        job = ImportJob.objects.create(filename='products.csv', status='processing')
+        ProgressReporter(job).update(total_records=8, processed_records=2)
+
+        response = APIClient().get(f'/api/import/progress/{job.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['processed'], 2)
+        self.assertEqual(response.data['total'], 8)
+        self.assertEqual(APIClient().get('/api/import/progress/missing/').status_code, 404)
+
+    async def test_progress_stream_ends_with_job(self):
+        """Test the event stream sends the final state and closes."""
+        job = await ImportJob.objects.acreate(filename='products.csv', status='completed', processed_records=3)
+
+        response = await self.async_client.get(f'/api/import/progress/{job.id}/stream/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(response.is_async)
+        events = b''.join([chunk async for chunk in response.streaming_content]).decode().split('\n\n')
+        data = [json.loads(event[len('data: '):]) for event in events if event.startswith('data: ')]
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]['status'], 'completed')
+        self.assertEqual(data[0]['processed'], 3)
+
+
+class WebhookBatchTestCase(TestCase):
+    """Test cases for batched webhook events."""
+
+    def test_split_by_items_and_bytes(self):
+        """Test batches respect both the item and byte limits."""
+        items = [{'sku': f'S{i}'} for i in range(5)]
+        self.assertEqual([len(b) for b in split_event_batches(items, 2, 10000)], [2, 2, 1])
+        self.assertEqual([len(b) for b in split_event_batches(items, 100, 30)], [2, 2, 1])
+
+    @override_settings(WEBHOOK_BATCH_MAX_ITEMS=2)
+    def test_batch_posts_per_webhook(self):
+        """Test a batch is split into POSTs sent to every subscriber."""
+        with StubWebhookServer() as stub:
+            Webhook.objects.create(url=f'{stub.url}/a', event_type='product_created')
+            Webhook.objects.create(url=f'{stub.url}/b', event_type='product_created')
+            Webhook.objects.create(url=f'{stub.url}/c', event_type='product_updated')
+
+            enqueue_event_batch('product_created', [{'sku': f'S{i}'} for i in range(3)])
+            dispatch_webhook_outbox()
+
+        self.assertEqual(len(stub.requests), 4)
+        self.assertEqual({path for path, _ in stub.requests}, {'/a', '/b'})
+        self.assertEqual(sorted(body['count'] for _, body in stub.requests), [1, 1, 2, 2])
+        self.assertEqual(WebhookLog.objects.filter(status_code=200).count(), 4)
+
+    @override_settings(STORAGES=STAGING_STORAGES)
+    def test_import_emits_one_batch_per_chunk(self):
+        """Test an import queues one event batch per chunk and event type."""
+        Webhook.objects.create(url='https://a.example.com/hook', event_type='product_created')
+        rows = ''.join(f'W{i},Item {i}\n' for i in range(250))
+        job = ImportJob.objects.create(filename='products.csv')
+        staged_file = stage_upload(ContentFile(f'sku,name\n{rows}'.encode(), name='products.csv'), job.id)
+        import_csv_task(staged_file, 'products.csv', str(job.id))
+
+        entry = WebhookOutbox.objects.get()
+        self.assertEqual(entry.event_type, 'product_created')
+        self.assertEqual(entry.payload['count'], 250)
+        self.assertEqual(entry.status, 'pending')
+
+
+@override_settings(WEBHOOK_MAX_ATTEMPTS=2, WEBHOOK_CIRCUIT_FAILURE_THRESHOLD=2)
+class WebhookOutboxTestCase(TestCase):
+    """Test cases for the transactional webhook outbox."""
+
+    def test_event_rolled_back_with_write(self):
+        """Test no event is stored when the product write is rolled back."""
+        Webhook.objects.create(url='https://a.example.com/hook', event_type='product_created')
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Product.objects.create(sku='R1', name='Rolled back')
+                enqueue_event('product_created', {'sku': 'R1'})
+                raise RuntimeError
+
+        self.assertFalse(WebhookOutbox.objects.exists())
+
+    def test_api_create_enqueues_event(self):
+        """Test the product API stores its event instead of calling out."""
+        Webhook.objects.create(url='https://a.example.com/hook', event_type='product_created')
+        response = APIClient().post('/api/products/', {'sku': 'api1', 'name': 'API'}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        entry = WebhookOutbox.objects.get()
+        self.assertEqual(entry.payload['data']['sku'], 'API1')
+
+    def test_failed_delivery_retried_then_dead_lettered(self):
+        """Test failures back off and are dead-lettered after the last attempt."""
+        with StubWebhookServer() as stub:
+            webhook = Webhook.objects.create(url=f'{stub.url}/error', event_type='test')
+            enqueue_event('test', {'n': 1})
+            dispatch_webhook_outbox()
+
+            entry = WebhookOutbox.objects.get()
+            self.assertEqual(entry.status, 'pending')
+            self.assertEqual(entry.attempts, 1)
+            self.assertGreater(entry.next_attempt_at, timezone.now())
+
+            # Not due yet: a second run leaves it alone
+            self.assertEqual(dispatch_webhook_outbox(), 0)
+
+            WebhookOutbox.objects.update(next_attempt_at=timezone.now())
+            cache.delete(CIRCUIT_CACHE_KEY.format(webhook.id))
+            dispatch_webhook_outbox()
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'dead')
+        self.assertEqual(entry.attempts, 2)
+        self.assertEqual(len(stub.requests), 2)
+
+    def test_circuit_breaker_skips_failing_webhook(self):
+        """Test a webhook is paused after consecutive failures."""
+        with StubWebhookServer() as stub:
+            Webhook.objects.create(url=f'{stub.url}/error', event_type='test')
+            for n in range(3):
+                enqueue_event('test', {'n': n})
+            with self.settings(WEBHOOK_OUTBOX_BATCH_SIZE=2, WEBHOOK_MAX_ATTEMPTS=5):
+                dispatch_webhook_outbox()
+
+        self.assertEqual(len(stub.requests), 2)
+        skipped = WebhookOutbox.objects.get(attempts=0)
+        self.assertEqual(skipped.status, 'pending')
+        self.assertGreater(skipped.next_attempt_at, timezone.now())
+
+    def test_backoff_grows_exponentially(self):
+        """Test retry delays double up to the configured maximum."""
+        with self.settings(WEBHOOK_RETRY_BASE_DELAY=10, WEBHOOK_RETRY_MAX_DELAY=50):
+            self.assertAlmostEqual(backoff_delay(1).total_seconds(), 10, delta=1)
+            self.assertAlmostEqual(backoff_delay(2).total_seconds(), 20, delta=2)
+            self.assertAlmostEqual(backoff_delay(10).total_seconds(), 50, delta=5)
+
+
+class WebhookDeliveryTestCase(TestCase):
+    """Test cases for concurrent webhook delivery."""
+
+    def test_deliveries_run_concurrently(self):
+        """Test slow endpoints are called in parallel, not one after another."""
+        with StubWebhookServer(delay=0.3) as stub:
+            deliveries = [
+                Delivery(Webhook(url=f'{stub.url}/slow/{i}'), 'test', {'i': i})
+                for i in range(4)
+            ]
+            started = time.monotonic()
+            results = deliver(deliveries)
+            elapsed = time.monotonic() - started
+
+        self.assertTrue(all(result.status_code == 200 for result in results))
+        self.assertLess(elapsed, 0.9)
+
+    def test_shared_deadline(self):
+        """Test requests still running at the deadline fail instead of blocking."""
+        with StubWebhookServer(delay=0.5) as stub:
+            results = deliver([Delivery(Webhook(url=f'{stub.url}/slow'), 'test', {})], deadline_seconds=0.1)
+
+        self.assertFalse(results[0].ok)
+        self.assertIsNone(results[0].status_code)
+
+    def test_error_status_recorded(self):
+        """Test error responses are reported with their status code."""
+        with StubWebhookServer() as stub:
+            results = deliver([Delivery(Webhook(url=f'{stub.url}/error'), 'test', {})])
+
+        self.assertEqual(results[0].status_code, 500)
+        self.assertFalse(results[0].ok)
@@ -0,0 +1,112 @@
+"""Set-based product upserts used by imports."""
+from dataclasses import dataclass, field
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .fingerprint import fingerprint
+from .metrics import stage
+from .models import Product
+
+UPSERT_FIELDS = ['name', 'description', 'price', 'quantity']
+
+
+@dataclass
+class UpsertResult:
+    """Products written by one upsert call, and the number left as they were."""
+    created: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    unchanged_count: int = 0
+
+    @property
+    def created_count(self):
+        return len(self.created)
+
+    @property
+    def updated_count(self):
+        return len(self.updated)
+
+
+def dedupe_rows(rows):
+    """Collapse rows sharing a SKU, keeping the last occurrence."""
+    by_sku = {}
+    for row in rows:
+        by_sku[row['sku']] = row
+    return by_sku
+
+
+def upsert_products(rows, sku_index=None, fields=UPSERT_FIELDS, skip_unchanged=True):
+    """
+    Create or update a chunk of products in a constant number of queries.
+
+    Existing products are resolved with one ``sku IN (...)`` lookup, then
+    written with one ``bulk_update`` and new ones with one ``bulk_create``,
+    all inside a single transaction. When a SKU appears more than once in
+    ``rows`` the last row wins. Products whose fingerprint already matches
+    their row are not written (see ``fingerprint.py``).
+
+    Args:
+        rows: Normalized row dicts (sku, name, description, price, quantity)
+        sku_index: Optional SKU membership filter (see ``sku_index.py``).
+            Only SKUs it may contain are looked up; created SKUs are added
+            to it. If it turns out to be stale the chunk is retried with a
+            full lookup.
+        fields: Fields written to existing products; every row must hold them
+        skip_unchanged: Skip products whose fingerprint matches their row;
+            only correct when ``fields`` are the fingerprinted ones
+
+    Returns:
+        UpsertResult with the created and updated products and the number
+        of unchanged ones
+    """
+    by_sku = dedupe_rows(rows)
+    if not by_sku:
+        return UpsertResult()
+
+    if sku_index is None:
+        candidates = list(by_sku)
+    else:
+        candidates = [sku for sku in by_sku if sku in sku_index]
+
+    existing = {}
+    if candidates:
+        with stage('sku_lookup', rows=len(candidates)):
+            existing = {
+                product.sku: product
+                for product in Product.objects.filter(sku__in=candidates).only('id', 'sku', 'fingerprint')
+            }
+
+    result = UpsertResult()
+    now = timezone.now()
+    for sku, row in by_sku.items():
+        product = existing.get(sku)
+        row_fingerprint = fingerprint(row)
+        if product is None:
+            result.created.append(Product(**{'active': True, **row, 'fingerprint': row_fingerprint}))
+            continue
+        if skip_unchanged and product.fingerprint == row_fingerprint:
+            result.unchanged_count += 1
+            continue
+        for name in fields:
+            setattr(product, name, row[name])
+        product.fingerprint = row_fingerprint
+        product.updated_at = now
+        result.updated.append(product)
+
+    try:
+        with transaction.atomic():
+            if result.updated:
+                with stage('bulk_update', rows=len(result.updated)):
+                    Product.objects.bulk_update(result.updated, [*fields, 'fingerprint', 'updated_at'])
+            if result.created:
+                with stage('bulk_create', rows=len(result.created)):
+                    Product.objects.bulk_create(result.created)
+    except IntegrityError:
+        if sku_index is None:
+            raise
+        # A SKU was created since the index was built; resolve every row
+        return upsert_products(by_sku.values(), fields=fields, skip_unchanged=skip_unchanged)
+
+    if sku_index is not None:
+        for product in result.created:
+            sku_index.add(product.sku)
+
+    return result
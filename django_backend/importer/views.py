@@ -1,22 +1,47 @@
 """Django REST Framework views and Web UI views."""
+import asyncio
+import json
+import time
 import uuid
+from datetime import timedelta
 import logging
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.views import View
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DeleteView
 from django.contrib.messages.views import SuccessMessageMixin
 from django.urls import reverse_lazy
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.core.exceptions import ImproperlyConfigured
 from django.core.paginator import Paginator
 from django.shortcuts import redirect
-from django.http import JsonResponse
-from .models import Product, ImportJob, Webhook, WebhookLog
-from .serializers import ProductSerializer, ImportJobSerializer, WebhookSerializer, WebhookLogSerializer
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from .models import Product, ImportJob, DeleteJob, Webhook, WebhookLog
+from .serializers import (
+    ProductSerializer, ImportJobSerializer, DeleteJobSerializer, WebhookSerializer, WebhookLogSerializer
+)
 from .forms import ProductForm, WebhookForm, CSVUploadForm
-from .tasks import import_csv_task, trigger_webhook
+from .deletion import clean_filters
+from .formats import upload_format
+from .preview import changes_file_name, is_changes_file, take_changes_file
+from .rejects import iter_rejects_csv
+from .bulk import bulk_delete_products, bulk_update_products, bulk_upsert_products
+from .export import EXPORT_FORMATS, export_stream
+from .search import filter_products
+from .pagination import ProductPagination, keyset_page, keyset_query
+from .storage import delete_staged, get_staging_storage, stage_upload
+from .streaming import aiter_blocks
+from .outbox import enqueue_event
+from .stats import get_stats, record_product_changes
+from .metrics import prometheus_metrics
+from .progress import TERMINAL_STATUSES, get_progress, progress_payload, publish_job_progress
+from .tasks import delete_products_task, import_csv_task, preview_import_task, trigger_webhook
 
 logger = logging.getLogger(__name__)
 
@@ -31,10 +56,7 @@ class DashboardView(TemplateView):
     def get_context_data(self, **kwargs):
         """Get context data."""
         context = super().get_context_data(**kwargs)
-        context['total_products'] = Product.objects.count()
-        context['active_products'] = Product.objects.filter(active=True).count()
-        context['inactive_products'] = Product.objects.filter(active=False).count()
-        context['total_webhooks'] = Webhook.objects.count()
+        context.update(get_stats())
         context['recent_imports'] = ImportJob.objects.all()[:5]
         return context
 
@@ -44,35 +66,60 @@ class ProductListView(ListView):
     model = Product
     template_name = 'importer/product_list.html'
     context_object_name = 'products'
-    paginate_by = 20
+    page_size = 20
 
     def get_queryset(self):
         """Filter products based on query parameters."""
-        queryset = Product.objects.all()
-
-        sku = self.request.GET.get('sku')
-        if sku:
-            queryset = queryset.filter(sku__icontains=sku.upper())
-
-        name = self.request.GET.get('name')
-        if name:
-            queryset = queryset.filter(name__icontains=name)
-
-        active = self.request.GET.get('active')
-        if active:
-            queryset = queryset.filter(active=active.lower() == 'true')
-
-        return queryset.order_by('-created_at')
+        return filter_products(Product.objects.all(), self.request.GET)
 
     def get_context_data(self, **kwargs):
-        """Get context data."""
+        """Get context data with one keyset page of products."""
         context = super().get_context_data(**kwargs)
+        try:
+            page = keyset_page(self.object_list, self.request.GET.get('cursor'), self.page_size)
+        except ValueError:
+            page = keyset_page(self.object_list, None, self.page_size)
+        context['products'] = page.items
+        context['next_query'] = page.next_cursor and keyset_query(self.request.GET, page.next_cursor)
+        context['previous_query'] = page.previous_cursor and keyset_query(self.request.GET, page.previous_cursor)
+        context['first_query'] = keyset_query(self.request.GET, None)
         context['sku_filter'] = self.request.GET.get('sku', '')
         context['name_filter'] = self.request.GET.get('name', '')
         context['active_filter'] = self.request.GET.get('active', '')
         return context
 
 
+class ProductExportView(View):
+    """Stream the (optionally filtered) product catalog as CSV or NDJSON."""
+
+    def get(self, request):
+        """
+        Export products.
+
+        Accepts the product list filters plus ``format`` (``csv`` or
+        ``ndjson``) and ``gzip=true`` to compress the stream.
+        """
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return JsonResponse({'error': f'Unknown export format: {export_format}'}, status=400)
+
+        compress = request.GET.get('gzip', '').lower() == 'true'
+        content_type, extension = EXPORT_FORMATS[export_format]
+        filename = f"products-{timezone.now():%Y%m%d-%H%M%S}.{extension}"
+        if compress:
+            content_type = 'application/gzip'
+            filename += '.gz'
+
+        queryset = filter_products(Product.objects.all(), request.GET)
+        response = StreamingHttpResponse(
+            aiter_blocks(export_stream(queryset, export_format, compress)),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 class ProductCreateView(SuccessMessageMixin, CreateView):
     """Create product view."""
     model = Product
@@ -83,11 +130,13 @@ class ProductCreateView(SuccessMessageMixin, CreateView):
 
     def form_valid(self, form):
         """Handle valid form."""
-        response = super().form_valid(form)
-        trigger_webhook.delay('product_created', {
-            'product_id': str(self.object.id),
-            'sku': self.object.sku
-        })
+        with transaction.atomic():
+            response = super().form_valid(form)
+            enqueue_event('product_created', {
+                'product_id': str(self.object.id),
+                'sku': self.object.sku
+            })
+            record_product_changes(created=1, created_active=int(self.object.active))
         return response
 
 
@@ -101,11 +150,12 @@ class ProductUpdateView(SuccessMessageMixin, UpdateView):
 
     def form_valid(self, form):
         """Handle valid form."""
-        response = super().form_valid(form)
-        trigger_webhook.delay('product_updated', {
-            'product_id': str(self.object.id),
-            'sku': self.object.sku
-        })
+        with transaction.atomic():
+            response = super().form_valid(form)
+            enqueue_event('product_updated', {
+                'product_id': str(self.object.id),
+                'sku': self.object.sku
+            })
         return response
 
 
@@ -116,16 +166,18 @@ class ProductDeleteView(SuccessMessageMixin, DeleteView):
     success_url = reverse_lazy('importer:product_list')
     success_message = 'Product deleted successfully'
 
-    def delete(self, request, *args, **kwargs):
-        """Handle delete."""
-        self.object = self.get_object()
+    def form_valid(self, form):
+        """Delete the product and queue its webhook event."""
         product_id = str(self.object.id)
         sku = self.object.sku
-        response = super().delete(request, *args, **kwargs)
-        trigger_webhook.delay('product_deleted', {
-            'product_id': product_id,
-            'sku': sku
-        })
+        active = int(self.object.active)
+        with transaction.atomic():
+            response = super().form_valid(form)
+            enqueue_event('product_deleted', {
+                'product_id': product_id,
+                'sku': sku
+            })
+            record_product_changes(deleted=1, deleted_active=active)
         return response
 
 
@@ -150,33 +202,47 @@ class ImportView(TemplateView):
         file = request.FILES['file']
         
         # Validate file
-        if not file.name.endswith('.csv'):
+        try:
+            upload_format(file.name)
+        except ValueError as e:
             logger.error(f"Invalid file type: {file.name}")
-            return JsonResponse({'error': 'File must be CSV'}, status=400)
+            return JsonResponse({'error': str(e)}, status=400)
 
-        if file.size > 500 * 1024 * 1024:
+        if file.size > settings.MAX_FILE_SIZE:
             logger.error(f"File too large: {file.size} bytes")
             return JsonResponse({'error': 'File too large (max 500MB)'}, status=400)
 
+        backend = request.POST.get('backend', '')
+        if backend and backend not in dict(ImportJob.BACKEND_CHOICES):
+            return JsonResponse({'error': f'Unknown import backend: {backend}'}, status=400)
+        preview = request.POST.get('preview', '').lower() == 'true'
+
         try:
             job_id = str(uuid.uuid4())
+            staged_file = stage_upload(file, job_id)
             job = ImportJob.objects.create(
                 id=job_id,
                 filename=file.name,
-                status='pending'
+                staged_file=staged_file,
+                backend=backend,
+                status='pending',
+                preview={} if preview else None
             )
 
-            content = file.read()
-            task = import_csv_task.delay(content, file.name, job_id)
+            task = (preview_import_task if preview else import_csv_task).delay(staged_file, file.name, job_id)
 
             logger.info(f"Import job created: {job_id}")
             return JsonResponse({
                 'job_id': job_id,
                 'task_id': task.id,
                 'status': 'pending',
-                'message': 'Import started'
+                'preview': preview,
+                'message': 'Preview started' if preview else 'Import started'
             })
 
+        except ImproperlyConfigured as e:
+            logger.error(f"Upload rejected: {str(e)}")
+            return JsonResponse({'error': str(e)}, status=503)
         except Exception as e:
             logger.error(f"Error uploading file: {str(e)}")
             return JsonResponse({'error': str(e)}, status=400)
@@ -232,27 +298,15 @@ class ProductViewSet(viewsets.ModelViewSet):
     """Product viewset with CRUD operations."""
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = ProductPagination
 
     def get_queryset(self):
-        """Filter products based on query parameters."""
-        queryset = Product.objects.all()
-
-        # Filter by SKU
-        sku = self.request.query_params.get('sku')
-        if sku:
-            queryset = queryset.filter(sku__icontains=sku.upper())
+        """
+        Filter products based on query parameters.
 
-        # Filter by name
-        name = self.request.query_params.get('name')
-        if name:
-            queryset = queryset.filter(name__icontains=name)
-
-        # Filter by active status
-        active = self.request.query_params.get('active')
-        if active is not None:
-            queryset = queryset.filter(active=active.lower() == 'true')
-
-        return queryset.order_by('-created_at')
+        ``q`` searches SKU, name and description and orders by relevance.
+        """
+        return filter_products(Product.objects.all(), self.request.query_params)
 
     def create(self, request, *args, **kwargs):
         """Create a new product."""
@@ -267,13 +321,13 @@ class ProductViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        self.perform_create(serializer)
-
-        # Trigger webhook
-        trigger_webhook.delay('product_created', {
-            'product_id': str(serializer.instance.id),
-            'sku': serializer.instance.sku
-        })
+        with transaction.atomic():
+            self.perform_create(serializer)
+            enqueue_event('product_created', {
+                'product_id': str(serializer.instance.id),
+                'sku': serializer.instance.sku
+            })
+            record_product_changes(created=1, created_active=int(serializer.instance.active))
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -283,13 +337,12 @@ class ProductViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
-
-        # Trigger webhook
-        trigger_webhook.delay('product_updated', {
-            'product_id': str(instance.id),
-            'sku': instance.sku
-        })
+        with transaction.atomic():
+            self.perform_update(serializer)
+            enqueue_event('product_updated', {
+                'product_id': str(instance.id),
+                'sku': instance.sku
+            })
 
         return Response(serializer.data)
 
@@ -298,22 +351,78 @@ class ProductViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         sku = instance.sku
         product_id = str(instance.id)
-        self.perform_destroy(instance)
-
-        # Trigger webhook
-        trigger_webhook.delay('product_deleted', {
-            'product_id': product_id,
-            'sku': sku
-        })
+        active = int(instance.active)
+        with transaction.atomic():
+            self.perform_destroy(instance)
+            enqueue_event('product_deleted', {
+                'product_id': product_id,
+                'sku': sku
+            })
+            record_product_changes(deleted=1, deleted_active=active)
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        """
+        Create/update (POST), partially update (PATCH) or delete (DELETE)
+        many products in one request.
+
+        The body is a list of up to ``PRODUCT_BULK_MAX_ITEMS`` items. POST
+        upserts by SKU; PATCH and DELETE items name their product by ``id``
+        or ``sku``. Nothing is written unless every item is valid.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'detail': 'Expected a non-empty list of items'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > settings.PRODUCT_BULK_MAX_ITEMS:
+            return Response(
+                {'detail': f'Too many items (max {settings.PRODUCT_BULK_MAX_ITEMS})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        operation = {
+            'POST': bulk_upsert_products,
+            'PATCH': bulk_update_products,
+            'DELETE': bulk_delete_products,
+        }[request.method]
+        try:
+            result = operation(items)
+        except IntegrityError as e:
+            logger.warning(f"Bulk product write conflicted: {str(e)}")
+            return Response(
+                {'detail': 'Conflicting concurrent change or duplicate SKU, retry the request'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        if result.errors:
+            return Response(
+                {'detail': 'Invalid items', 'errors': result.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({**result.counts(), 'results': result.results})
+
     @action(detail=False, methods=['delete'])
     def delete_all(self, request):
-        """Delete all products."""
-        count = Product.objects.count()
-        Product.objects.all().delete()
-        return Response({'message': f'Deleted {count} products'})
+        """
+        Start a background job deleting all products.
+
+        The product list filters (``sku``, ``name``, ``active``, ``q``)
+        restrict the deletion to matching products. Track the job at
+        ``/api/delete-jobs/<id>/``.
+        """
+        job = DeleteJob.objects.create(filters=clean_filters(request.query_params))
+        transaction.on_commit(lambda: delete_products_task.delay(str(job.id)))
+
+        logger.info(f"Delete job created: {job.id} filters={job.filters}")
+        return Response({
+            'job_id': str(job.id),
+            'status': 'pending',
+            'message': 'Deletion started'
+        }, status=status.HTTP_202_ACCEPTED)
 
 
 class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
@@ -321,6 +430,120 @@ class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ImportJob.objects.all()
     serializer_class = ImportJobSerializer
 
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """Continue a failed or stalled import from its last checkpoint."""
+        job = self.get_object()
+        stale_before = timezone.now() - timedelta(seconds=settings.IMPORT_STALE_AFTER)
+        if job.status == 'completed':
+            return Response(
+                {'detail': 'Import job already completed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if job.status == 'previewed':
+            return Response(
+                {'detail': 'Import job is a finished preview; confirm it to import'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if job.status in ('pending', 'processing') and job.updated_at > stale_before:
+            return Response(
+                {'detail': 'Import job is still running'},
+                status=status.HTTP_409_CONFLICT
+            )
+        if not job.staged_file or not get_staging_storage().exists(job.staged_file):
+            return Response(
+                {'detail': 'Uploaded file is no longer available'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        job.status = 'pending'
+        job.error_message = None
+        job.save(update_fields=['status', 'error_message', 'updated_at'])
+        publish_job_progress(job.id)
+        # A preview that did not finish is run again from the start
+        task = (preview_import_task if job.preview == {} else import_csv_task).delay(
+            job.staged_file, job.filename, str(job.id)
+        )
+
+        logger.info(f"Import job resumed: {job.id} at row {job.checkpoint_rows + 1}")
+        return Response({
+            'job_id': str(job.id),
+            'task_id': task.id,
+            'status': 'pending',
+            'resume_from_row': job.checkpoint_rows + 1
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'])
+    def confirm(self, request, pk=None):
+        """
+        Import a previewed file.
+
+        Only the rows the preview found to change are imported, unless the
+        cached preview expired or the products changed since; then the
+        whole upload is.
+        """
+        job = self.get_object()
+        # Claim the preview, so concurrent confirmations import it only once
+        if not ImportJob.objects.filter(id=job.id, status='previewed').update(status='pending'):
+            return Response(
+                {'detail': 'Import job is not a finished preview'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        staged_file = take_changes_file(job.id)
+        if staged_file is not None:
+            delete_staged(job.staged_file)
+            job.total_records = job.preview['created'] + job.preview['updated']
+        else:
+            if not job.staged_file or not get_staging_storage().exists(job.staged_file):
+                ImportJob.objects.filter(id=job.id).update(status='previewed')
+                return Response(
+                    {'detail': 'Uploaded file is no longer available'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            delete_staged(changes_file_name(job.id))
+            staged_file = job.staged_file
+            # The import rejects the same rows again
+            job.rejected_records = 0
+            job.rejects = {}
+
+        job.staged_file = staged_file
+        job.status = 'pending'
+        job.error_message = None
+        job.save()
+        publish_job_progress(job.id)
+        task = import_csv_task.delay(staged_file, job.filename, str(job.id))
+
+        reused = is_changes_file(staged_file)
+        logger.info(f"Import preview confirmed: {job.id}" + (' (reusing its changes)' if reused else ''))
+        return Response({
+            'job_id': str(job.id),
+            'task_id': task.id,
+            'status': 'pending',
+            'reused_preview': reused
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def rejects(self, request, pk=None):
+        """Download the rows the import rejected, as CSV with row number and reason."""
+        job = self.get_object()
+        if not job.rejected_records:
+            return Response(
+                {'detail': 'Import job has no rejected rows'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        stem = job.filename.split('.', 1)[0] or 'import'
+        response = StreamingHttpResponse(aiter_blocks(iter_rejects_csv(job.id)), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{stem}-rejects.csv"'
+        return response
+
+
+class DeleteJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Delete job viewset (read-only)."""
+    queryset = DeleteJob.objects.all()
+    serializer_class = DeleteJobSerializer
+
 
 class WebhookViewSet(viewsets.ModelViewSet):
     """Webhook viewset with CRUD operations."""
@@ -358,40 +581,60 @@ class UploadCSVView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if not file.name.endswith('.csv'):
+        try:
+            upload_format(file.name)
+        except ValueError as e:
             return Response(
-                {'detail': 'File must be CSV'},
+                {'detail': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if file.size > 500 * 1024 * 1024:  # 500 MB
+        if file.size > settings.MAX_FILE_SIZE:
             return Response(
                 {'detail': 'File too large'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        backend = request.data.get('backend', '')
+        if backend and backend not in dict(ImportJob.BACKEND_CHOICES):
+            return Response(
+                {'detail': f'Unknown import backend: {backend}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # A preview only reports what the import would change; it is
+        # imported once confirmed
+        preview = request.data.get('preview', '').lower() == 'true'
+
         try:
-            # Create import job
+            # Stage the upload and create import job
             job_id = str(uuid.uuid4())
+            staged_file = stage_upload(file, job_id)
             job = ImportJob.objects.create(
                 id=job_id,
                 filename=file.name,
-                status='pending'
+                staged_file=staged_file,
+                backend=backend,
+                status='pending',
+                preview={} if preview else None
             )
 
-            # Read file content
-            content = file.read()
-
-            # Start async import task
-            task = import_csv_task.delay(content, file.name, job_id)
+            # Start async import task with a reference to the staged file
+            task = (preview_import_task if preview else import_csv_task).delay(staged_file, file.name, job_id)
 
             return Response({
                 'job_id': job_id,
                 'task_id': task.id,
                 'status': 'pending',
-                'message': 'Import started'
+                'preview': preview,
+                'message': 'Preview started' if preview else 'Import started'
             }, status=status.HTTP_202_ACCEPTED)
 
+        except ImproperlyConfigured as e:
+            logger.error(f"Upload rejected: {str(e)}")
+            return Response(
+                {'detail': str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
         except Exception as e:
             logger.error(f"Error uploading file: {str(e)}")
             return Response(
@@ -404,16 +647,71 @@ class ImportProgressView(APIView):
     """Get import job progress."""
 
     def get(self, request, job_id):
-        """Get import job status."""
-        try:
-            job = ImportJob.objects.get(id=job_id)
-            serializer = ImportJobSerializer(job)
-            return Response(serializer.data)
-        except ImportJob.DoesNotExist:
+        """Get import job status from the progress cache."""
+        state = get_progress(job_id)
+        if state is None:
             return Response(
                 {'detail': 'Import job not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        return Response(progress_payload(job_id, state))
+
+
+class ImportMetricsView(View):
+    """Per-stage import metrics in the Prometheus text format."""
+
+    def get(self, request):
+        """Export stage totals over all imports, or one import with ``job_id``."""
+        jobs = ImportJob.objects.all()
+        job_id = request.GET.get('job_id')
+        if job_id:
+            try:
+                jobs = jobs.filter(id=uuid.UUID(job_id))
+            except ValueError:
+                return JsonResponse({'error': f'Invalid job_id: {job_id}'}, status=400)
+        return HttpResponse(prometheus_metrics(jobs), content_type='text/plain; version=0.0.4')
+
+
+class ImportProgressStreamView(View):
+    """
+    Stream import job progress as Server-Sent Events.
+
+    The view is async, so under ASGI a stream waits between polls without
+    holding a worker thread for up to ``IMPORT_PROGRESS_STREAM_TIMEOUT``.
+    """
+
+    async def get(self, request, job_id):
+        """Open the event stream."""
+        state = await sync_to_async(get_progress)(job_id)
+        if state is None:
+            return JsonResponse({'detail': 'Import job not found'}, status=404)
+
+        response = StreamingHttpResponse(self.events(job_id, state), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def events(self, job_id, state):
+        """Yield an event whenever the progress changes, until the job ends."""
+        deadline = time.monotonic() + settings.IMPORT_PROGRESS_STREAM_TIMEOUT
+        last_sent = time.monotonic()
+        last_payload = None
+        yield 'retry: 2000\n\n'
+
+        while state is not None:
+            payload = progress_payload(job_id, state)
+            if payload != last_payload:
+                yield f'data: {json.dumps(payload)}\n\n'
+                last_payload = payload
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= 15:
+                yield ': keep-alive\n\n'
+                last_sent = time.monotonic()
+
+            if state['status'] in TERMINAL_STATUSES or time.monotonic() >= deadline:
+                return
+            await asyncio.sleep(settings.IMPORT_PROGRESS_STREAM_INTERVAL)
+            state = await sync_to_async(get_progress)(job_id)
 
 
 class TestWebhookView(APIView):
@@ -1,15 +1,23 @@
 """Web UI views for Django templates."""
 import uuid
 import logging
+from django.conf import settings
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DeleteView
 from django.contrib.messages.views import SuccessMessageMixin
 from django.urls import reverse_lazy
-from django.db.models import Q
+from django.db import transaction
+from django.core.exceptions import ImproperlyConfigured
 from django.shortcuts import redirect, get_object_or_404
 from django.http import JsonResponse
 from .models import Product, ImportJob, Webhook, WebhookLog
+from .formats import upload_format
 from .forms import ProductForm, WebhookForm, CSVUploadForm
-from .tasks import import_csv_task, trigger_webhook
+from .search import filter_products
+from .pagination import keyset_page, keyset_query
+from .storage import stage_upload
+from .outbox import enqueue_event
+from .stats import get_stats, record_product_changes
+from .tasks import import_csv_task, preview_import_task
 
 logger = logging.getLogger(__name__)
 
@@ -21,10 +29,7 @@ class DashboardView(TemplateView):
     def get_context_data(self, **kwargs):
         """Get context data."""
         context = super().get_context_data(**kwargs)
-        context['total_products'] = Product.objects.count()
-        context['active_products'] = Product.objects.filter(active=True).count()
-        context['inactive_products'] = Product.objects.filter(active=False).count()
-        context['total_webhooks'] = Webhook.objects.count()
+        context.update(get_stats())
         context['recent_imports'] = ImportJob.objects.all()[:5]
         return context
 
@@ -34,32 +39,23 @@ class ProductListView(ListView):
     model = Product
     template_name = 'importer/product_list.html'
     context_object_name = 'products'
-    paginate_by = 20
+    page_size = 20
 
     def get_queryset(self):
         """Filter products based on query parameters."""
-        queryset = Product.objects.all()
-
-        # Filter by SKU
-        sku = self.request.GET.get('sku')
-        if sku:
-            queryset = queryset.filter(sku__icontains=sku.upper())
-
-        # Filter by name
-        name = self.request.GET.get('name')
-        if name:
-            queryset = queryset.filter(name__icontains=name)
-
-        # Filter by active status
-        active = self.request.GET.get('active')
-        if active:
-            queryset = queryset.filter(active=active.lower() == 'true')
-
-        return queryset.order_by('-created_at')
+        return filter_products(Product.objects.all(), self.request.GET)
 
     def get_context_data(self, **kwargs):
-        """Get context data."""
+        """Get context data with one keyset page of products."""
         context = super().get_context_data(**kwargs)
+        try:
+            page = keyset_page(self.object_list, self.request.GET.get('cursor'), self.page_size)
+        except ValueError:
+            page = keyset_page(self.object_list, None, self.page_size)
+        context['products'] = page.items
+        context['next_query'] = page.next_cursor and keyset_query(self.request.GET, page.next_cursor)
+        context['previous_query'] = page.previous_cursor and keyset_query(self.request.GET, page.previous_cursor)
+        context['first_query'] = keyset_query(self.request.GET, None)
         context['sku_filter'] = self.request.GET.get('sku', '')
         context['name_filter'] = self.request.GET.get('name', '')
         context['active_filter'] = self.request.GET.get('active', '')
@@ -76,14 +72,13 @@ class ProductCreateView(SuccessMessageMixin, CreateView):
 
     def form_valid(self, form):
         """Handle valid form."""
-        response = super().form_valid(form)
-        
-        # Trigger webhook
-        trigger_webhook.delay('product_created', {
-            'product_id': str(self.object.id),
-            'sku': self.object.sku
-        })
-        
+        with transaction.atomic():
+            response = super().form_valid(form)
+            enqueue_event('product_created', {
+                'product_id': str(self.object.id),
+                'sku': self.object.sku
+            })
+            record_product_changes(created=1, created_active=int(self.object.active))
         return response
 
 
@@ -97,14 +92,12 @@ class ProductUpdateView(SuccessMessageMixin, UpdateView):
 
     def form_valid(self, form):
         """Handle valid form."""
-        response = super().form_valid(form)
-        
-        # Trigger webhook
-        trigger_webhook.delay('product_updated', {
-            'product_id': str(self.object.id),
-            'sku': self.object.sku
-        })
-        
+        with transaction.atomic():
+            response = super().form_valid(form)
+            enqueue_event('product_updated', {
+                'product_id': str(self.object.id),
+                'sku': self.object.sku
+            })
         return response
 
 
@@ -115,20 +108,18 @@ class ProductDeleteView(SuccessMessageMixin, DeleteView):
     success_url = reverse_lazy('importer:product_list')
     success_message = 'Product deleted successfully'
 
-    def delete(self, request, *args, **kwargs):
-        """Handle delete."""
-        self.object = self.get_object()
+    def form_valid(self, form):
+        """Delete the product and queue its webhook event."""
         product_id = str(self.object.id)
         sku = self.object.sku
-        
-        response = super().delete(request, *args, **kwargs)
-        
-        # Trigger webhook
-        trigger_webhook.delay('product_deleted', {
-            'product_id': product_id,
-            'sku': sku
-        })
-        
+        active = int(self.object.active)
+        with transaction.atomic():
+            response = super().form_valid(form)
+            enqueue_event('product_deleted', {
+                'product_id': product_id,
+                'sku': sku
+            })
+            record_product_changes(deleted=1, deleted_active=active)
         return response
 
 
@@ -150,38 +141,56 @@ class ImportView(TemplateView):
         if form.is_valid():
             file = form.cleaned_data['file']
             
-            if not file.name.endswith('.csv'):
+            try:
+                upload_format(file.name)
+            except ValueError as e:
                 return JsonResponse({
-                    'error': 'File must be CSV'
+                    'error': str(e)
                 }, status=400)
 
-            if file.size > 500 * 1024 * 1024:  # 500 MB
+            if file.size > settings.MAX_FILE_SIZE:
                 return JsonResponse({
                     'error': 'File too large'
                 }, status=400)
 
+            backend = request.POST.get('backend', '')
+            if backend and backend not in dict(ImportJob.BACKEND_CHOICES):
+                return JsonResponse({
+                    'error': f'Unknown import backend: {backend}'
+                }, status=400)
+            preview = request.POST.get('preview', '').lower() == 'true'
+
             try:
-                # Create import job
+                # Stage the upload and create import job
                 job_id = str(uuid.uuid4())
+                staged_file = stage_upload(file, job_id)
                 job = ImportJob.objects.create(
                     id=job_id,
                     filename=file.name,
-                    status='pending'
+                    staged_file=staged_file,
+                    backend=backend,
+                    status='pending',
+                    preview={} if preview else None
                 )
 
-                # Read file content
-                content = file.read()
-
-                # Start async import task
-                task = import_csv_task.delay(content, file.name, job_id)
+                # Start async import task with a reference to the staged file
+                task = (preview_import_task if preview else import_csv_task).delay(
+                    staged_file, file.name, job_id
+                )
 
                 return JsonResponse({
                     'job_id': job_id,
                     'task_id': task.id,
                     'status': 'pending',
-                    'message': 'Import started'
+                    'preview': preview,
+                    'message': 'Preview started' if preview else 'Import started'
                 })
 
+            except ImproperlyConfigured as e:
+                logger.error(f"Upload rejected: {str(e)}")
+                return JsonResponse({
+                    'error': str(e)
+                }, status=503)
             except Exception as e:
                 logger.error(f"Error uploading file: {str(e)}")
                 return JsonResponse({
@@ -0,0 +1,31 @@
+"""Helpers for building webhook event payloads."""
+import json
+
+
+def product_event(product):
+    """Event data for a single product."""
+    return {'product_id': str(product.id), 'sku': product.sku}
+
+
+def split_event_batches(items, max_items, max_bytes):
+    """
+    Split event items into batches for delivery.
+
+    A batch holds at most ``max_items`` items and roughly ``max_bytes`` of
+    JSON; an item larger than ``max_bytes`` is sent on its own.
+
+    Yields:
+        lists of items
+    """
+    batch = []
+    batch_bytes = 0
+    for item in items:
+        item_bytes = len(json.dumps(item, default=str)) + 1
+        if batch and (len(batch) >= max_items or batch_bytes + item_bytes > max_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(item)
+        batch_bytes += item_bytes
+    if batch:
+        yield batch
@@ -1,5 +1,5 @@
 @echo off
 REM Start Celery worker for Windows
 echo Starting Celery worker...
-celery -A config worker --loglevel=info --pool=solo
+celery -A config worker -Q celery,webhooks -B --loglevel=info --pool=solo
 pause